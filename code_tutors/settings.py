@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+from datetime import date
 from pathlib import Path
 from django.contrib.messages import constants as messages
 import os
@@ -143,6 +144,14 @@ REDIRECT_URL_WHEN_LOGGED_IN = 'dashboard'
 #Cost of lessons per hour 
 HOURLY_RATE = 10.00
 
+# The terms students are invoiced for, with their first and last days. Roll these forward
+# for each academic year; lessons dated outside every term go on a student's running invoice.
+TERMS = {
+    'autumn': (date(2024, 9, 1), date(2024, 12, 31)),
+    'spring': (date(2025, 1, 1), date(2025, 5, 31)),
+    'summer': (date(2025, 6, 1), date(2025, 8, 31)),
+}
+
 # Convert Django ERROR messages to Bootstrap DANGER messages
 MESSAGE_TAGS = {
     messages.ERROR: 'danger',
@@ -49,6 +49,8 @@ urlpatterns = [
     path('invoice_page/<str:term_name>/', views.invoice_page, name='invoice_page_term'),
     path('manage_invoices/', views.manage_invoices, name='manage_invoices'),
     path('admin_invoice_view/<str:invoice_num>/', views.admin_invoice_view, name='admin_invoice_view'), 
+    path('export_invoices/', views.export_invoices, name='export_invoices'),
+    path('reconcile_payments/', views.reconcile_payments, name='reconcile_payments'),
     path('request_lesson/', views.request_lesson, name='request_lesson'),
     path('contact_admin/',views.contact_admin,name='contact_admin'),
     path('my_tutor_profile/',views.see_my_tutor,name='my_tutor_profile'),
@@ -56,6 +58,10 @@ urlpatterns = [
     path('request_success/', views.lesson_request_success, name='lesson_request_success'),
     path('response_submitted/',views.response_submitted_success,name='response_success'),
     path('student_requests/', views.student_requests, name='student_requests'),
+    path('match_requests/', views.match_requests, name='match_requests'),
+    path('bulk_request_action/', views.bulk_request_action, name='bulk_request_action'),
+    path('tutor_candidates/', views.tutor_candidates, name='tutor_search'),
+    path('tutor_candidates/<int:lesson_request_id>/', views.tutor_candidates, name='tutor_candidates'),
     path('assign_tutor/<int:lesson_request_id>/', views.assign_tutor, name='assign_tutor'),
     path('unassign_tutor/<int:lesson_request_id>/', views.unassign_tutor, name='unassign_tutor'),
     path('cancel_request/<int:lesson_request_id>/', views.cancel_request, name='cancel_request'),
@@ -74,6 +80,7 @@ urlpatterns = [
     path('student_messages/', views.student_messages, name='student_messages'),
     path('tutor/my_profile/', views.tutor_profile, name='tutor_profile'),
     path('tutor/edit_profile/', views.edit_profile, name='edit_profile'),
+    path('tutor/availability/', views.edit_availability, name='edit_availability'),
     path('student/my_profile/', views.student_profile, name='student_profile'),
     path('admin/my_profile/', views.admin_profile, name='admin_profile'),
 
@@ -83,6 +90,8 @@ urlpatterns = [
     #AMINA
     path('tutor/timetable/', views.see_my_tutor_timetable, name='tutor_timetable'),
     path('student/timetable/', views.see_my_student_timetable, name='student_timetable'), 
+    path('timetable/lessons/', views.timetable_lessons, name='timetable_lessons'),
+    path('calendar/<str:token>/lessons.ics', views.calendar_feed, name='calendar_feed'),
     
     
 ]
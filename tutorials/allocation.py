@@ -0,0 +1,201 @@
+"""Race-safe booking of lesson requests, one at a time or in batches, serialised per tutor with lock rows."""
+from operator import attrgetter
+from random import uniform
+from time import sleep
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils.timezone import now
+from tutorials.invoicing import post_allocations, remove_allocations
+from tutorials.models import InvoiceLine, LessonRequest, TutorBookingLock
+from tutorials.scheduling import cancel_stale_lessons, first_overlap, occurrences
+
+RETRIES = 20
+MAX_BACKOFF = 0.2
+
+
+def lock_tutors(tutor_ids):
+    """
+    Take the booking locks of tutors until the end of the current transaction.
+    The UPDATE holds each tutor's row until commit, so a concurrent booking of the same tutor
+    waits for this one before it checks for clashes. Missing rows are inserted, then locked.
+    """
+    tutor_ids = set(tutor_ids)
+    if not tutor_ids:
+        return
+    locks = TutorBookingLock.objects.filter(tutor__in=tutor_ids)
+    if locks.update(version=F('version') + 1) < len(tutor_ids):
+        TutorBookingLock.objects.bulk_create(
+            [TutorBookingLock(tutor_id=tutor_id) for tutor_id in tutor_ids], ignore_conflicts=True
+        )
+        locks.update(version=F('version') + 1)
+
+
+def with_retries(func, *args, **kwargs):
+    """
+    Call `func` in a transaction of its own and return its result, retrying the whole call with
+    jittered exponential backoff, capped at MAX_BACKOFF seconds, if the database reports
+    contention, so concurrent writers queue up instead of failing.
+    """
+    for attempt in range(RETRIES):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError:
+            if attempt == RETRIES - 1:
+                raise
+            sleep(uniform(0, min(0.005 * 2 ** attempt, MAX_BACKOFF)))
+
+
+def save_request(lesson_request, full_clean=False):
+    """
+    Check a lesson request against its tutor's bookings and save it, under the tutor's lock
+    and with_retries.
+    Raises ValidationError if the tutor is already booked for any lesson of the series.
+    - full_clean: Validate every field as well, not just the schedule.
+    """
+    return with_retries(_save_request, lesson_request, full_clean)
+
+
+def _save_request(lesson_request, full_clean):
+    if lesson_request.tutor_id:
+        lock_tutors([lesson_request.tutor_id])
+    if full_clean:
+        lesson_request.full_clean()
+    else:
+        lesson_request.clean()
+    lesson_request.save()
+    return lesson_request
+
+
+def allocate(lesson_request, tutor):
+    """
+    Allocate a lesson request to `tutor` with save_request, leaving it unchanged on a clash.
+    Raises ValidationError if the tutor is already booked for any lesson of the series.
+    """
+    previous = lesson_request.tutor_id, lesson_request.status
+    lesson_request.tutor_id, lesson_request.status = tutor.id, 'Allocated'
+    try:
+        return save_request(lesson_request)
+    except Exception:
+        lesson_request.tutor_id, lesson_request.status = previous
+        raise
+
+
+def batch_clashes(assignments):
+    """
+    Return an error for each of `assignments` that clashes with its tutor's bookings or with an
+    earlier assignment of the batch. The tutors' allocated series over the batch's dates are read
+    in one query, excluding the batch's own requests, and each tutor's lessons are kept sorted so
+    every request is checked with first_overlap.
+    - assignments: (lesson_request, tutor_id) pairs.
+    """
+    errors = []
+    wanted = []
+    for lesson_request, tutor_id in assignments:
+        lessons = occurrences(lesson_request) if lesson_request.requested_date else []
+        if lessons:
+            wanted.append((lesson_request, tutor_id, lessons))
+        else:
+            errors.append(f"Request {lesson_request.id} has no lessons to book.")
+    if not wanted:
+        return errors
+
+    first = min(lessons[0].start.date() for _, _, lessons in wanted)
+    last = max(lessons[-1].start.date() for _, _, lessons in wanted)
+    booked = LessonRequest.objects.touching(first, last).filter(
+        tutor__in={tutor_id for _, tutor_id, _ in wanted},
+        status='Allocated',
+    ).exclude(id__in=[lesson_request.id for lesson_request, _, _ in wanted]).only(
+        'tutor', 'requested_date', 'requested_time', 'requested_duration', 'requested_frequency', 'end_time',
+        'recurrence_count', 'recurrence_until', 'recurrence_exceptions',
+    )
+    taken = {}
+    for lesson_request in booked:
+        taken.setdefault(lesson_request.tutor_id, []).extend(occurrences(lesson_request, first, last))
+    for lessons in taken.values():
+        lessons.sort(key=attrgetter('start'))
+
+    for lesson_request, tutor_id, lessons in wanted:
+        tutor_lessons = taken.setdefault(tutor_id, [])
+        clash = first_overlap(lessons, tutor_lessons)
+        if clash:
+            booked_lesson = clash[1]
+            errors.append(
+                f"Request {lesson_request.id}: the tutor is already booked for {booked_lesson.start.date()} "
+                f"from {booked_lesson.start.time()} to {booked_lesson.end.time()}."
+            )
+        else:
+            tutor_lessons.extend(lessons)
+            tutor_lessons.sort(key=attrgetter('start'))
+    return errors
+
+
+def assign_requests(assignments):
+    """
+    Allocate many lesson requests to tutors in one transaction, all or nothing, under the
+    tutors' locks and with_retries. Requests are written with one UPDATE per tutor and billed
+    with post_allocations; requests moving between tutors keep their lines, which follow them,
+    and their generated lessons with the previous tutor are cancelled.
+    Raises ValidationError listing every clash or unknown request, changing nothing, if any.
+    - assignments: A mapping of lesson request ids to tutor ids.
+    Returns the number of requests allocated.
+    """
+    return with_retries(_assign_requests, assignments)
+
+
+def _assign_requests(assignments):
+    lock_tutors(assignments.values())
+    lesson_requests = list(
+        LessonRequest.objects.filter(id__in=list(assignments)).exclude(status='Cancelled').select_for_update()
+    )
+    found = {lesson_request.id for lesson_request in lesson_requests}
+    errors = [f"Request {pk} does not exist or is cancelled." for pk in sorted(set(assignments) - found)]
+    errors += batch_clashes([(lesson_request, assignments[lesson_request.id]) for lesson_request in lesson_requests])
+    if errors:
+        raise ValidationError(errors)
+
+    moved = {}
+    by_tutor = {}
+    for lesson_request in lesson_requests:
+        tutor_id = assignments[lesson_request.id]
+        if lesson_request.status == 'Allocated' and lesson_request.tutor_id != tutor_id:
+            moved.setdefault(tutor_id, []).append(lesson_request.id)
+        by_tutor.setdefault(tutor_id, []).append(lesson_request.id)
+        lesson_request.tutor_id = tutor_id
+        lesson_request.status = 'Allocated'
+
+    updated_at = now()
+    for tutor_id, ids in by_tutor.items():
+        LessonRequest.objects.filter(id__in=ids).update(tutor=tutor_id, status='Allocated', updated_at=updated_at)
+    for tutor_id, ids in moved.items():
+        InvoiceLine.objects.filter(lesson_request__in=ids).update(tutor=tutor_id)
+    if moved:
+        cancel_stale_lessons([pk for ids in moved.values() for pk in ids])
+    post_allocations(lesson_requests)
+    return len(lesson_requests)
+
+
+def release_requests(lesson_request_ids, status='Unallocated'):
+    """
+    Unassign or cancel many lesson requests with one UPDATE, in one transaction, then remove
+    their invoice lines with remove_allocations and cancel their generated lessons and
+    bookings with cancel_stale_lessons. Cancelled requests are left alone, and only
+    requests with a tutor are unassigned.
+    - status: 'Unallocated' to unassign the requests' tutors, or 'Cancelled' to cancel them.
+    Returns the number of requests changed.
+    """
+    return with_retries(_release_requests, lesson_request_ids, status)
+
+
+def _release_requests(lesson_request_ids, status):
+    lesson_requests = LessonRequest.objects.filter(id__in=list(lesson_request_ids)).exclude(status='Cancelled')
+    if status == 'Unallocated':
+        lesson_requests = lesson_requests.filter(tutor__isnull=False)
+    ids = list(lesson_requests.order_by().values_list('id', flat=True))
+    if not ids:
+        return 0
+    LessonRequest.objects.filter(id__in=ids).update(tutor=None, status=status, updated_at=now())
+    remove_allocations(ids)
+    cancel_stale_lessons(ids)
+    return len(ids)
@@ -0,0 +1,138 @@
+"""Tutor free/busy checks on weekly availability and bookings held as slot bitmasks."""
+from datetime import time
+from tutorials.models import LessonRequest, TutorAvailability
+
+SLOT_MINUTES = TutorAvailability.SLOT_MINUTES
+SLOTS_PER_DAY = TutorAvailability.SLOTS_PER_DAY
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+FULL_WEEK = (1 << SLOTS_PER_DAY * 7) - 1
+
+
+def minutes_of(moment):
+    """Return the minutes from midnight to a time of day."""
+    return moment.hour * 60 + moment.minute
+
+
+def day_mask(start_time, duration):
+    """
+    Return the slots of a day a lesson at `start_time` lasting `duration` minutes touches.
+    Partly covered slots count as taken, and lessons running past midnight stop there.
+    """
+    start = minutes_of(start_time)
+    first = start // SLOT_MINUTES
+    last = min(-(-(start + duration) // SLOT_MINUTES), SLOTS_PER_DAY)
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def week_mask(weekday, start_time, end_time):
+    """Return the week's slots between two times of day on `weekday`, Monday being 0."""
+    return day_mask(start_time, minutes_of(end_time) - minutes_of(start_time)) << weekday * SLOTS_PER_DAY
+
+
+def slot_ranges(mask, weekday):
+    """Yield the (start, end) times of each run of set slots on `weekday` of a weekly mask."""
+    day = (mask >> weekday * SLOTS_PER_DAY) & FULL_DAY
+    slot = 0
+    while day:
+        gap = (day & -day).bit_length() - 1
+        day >>= gap
+        run = (~day & (day + 1)).bit_length() - 1
+        day >>= run
+        start, slot = slot + gap, slot + gap + run
+        yield slot_time(start), slot_time(slot)
+
+
+def slot_time(slot):
+    """Return the time of day a slot starts, with the end of the day as time.max."""
+    if slot >= SLOTS_PER_DAY:
+        return time.max
+    return time(*divmod(slot * SLOT_MINUTES, 60))
+
+
+class FreeBusy:
+    """
+    Tutors' weekly availability and their bookings between `start` and `end`, as bitmasks.
+    Built from two queries, after which any check of a tutor and slot is a few integer
+    operations, so every tutor can be scored against every open request in memory.
+    - tutors: Optional tutor ids to load; every tutor with recorded availability otherwise.
+    - default_slots: Weekly slots for those of `tutors` with no availability recorded, who
+      are otherwise left out.
+    """
+
+    def __init__(self, start, end, tutors=None, default_slots=None):
+        self.start = start
+        self.end = end
+
+        availability = TutorAvailability.objects.all()
+        if tutors is not None:
+            availability = availability.filter(tutor__in=tutors)
+        self.available = {
+            tutor_id: int.from_bytes(bytes(slots), 'little')
+            for tutor_id, slots in availability.values_list('tutor_id', 'weekly_slots')
+        }
+        if tutors is not None and default_slots is not None:
+            for tutor_id in tutors:
+                self.available.setdefault(tutor_id, default_slots)
+
+        self.booked = {}
+        booked = LessonRequest.objects.touching(start, end).filter(
+            tutor__in=list(self.available),
+            status='Allocated',
+        ).only(
+            'tutor', 'requested_date', 'requested_time', 'requested_duration', 'requested_frequency',
+            'recurrence_count', 'recurrence_until', 'recurrence_exceptions',
+        ).order_by()
+        for lesson_request in booked:
+            mask = day_mask(lesson_request.get_start_time(), lesson_request.requested_duration)
+            for day in lesson_request.occurrence_dates(start, end):
+                self.book_mask(lesson_request.tutor_id, day, mask)
+
+    def book_mask(self, tutor_id, day, mask):
+        key = (tutor_id, day)
+        self.booked[key] = self.booked.get(key, 0) | mask
+
+    def book(self, tutor_id, lesson_request):
+        """Mark every lesson of a request's series in the window as booked for `tutor_id`."""
+        mask = day_mask(lesson_request.get_start_time(), lesson_request.requested_duration)
+        for day in lesson_request.occurrence_dates(self.start, self.end):
+            self.book_mask(tutor_id, day, mask)
+
+    def clashes(self, tutor_id, days, mask):
+        """Return whether a tutor has a booking in the slots of `mask` on any of `days`."""
+        booked = self.booked
+        return any(booked.get((tutor_id, day), 0) & mask for day in days)
+
+    def free_mask(self, tutor_id, day):
+        """Return the slots of `day` in which a tutor is available and not yet booked."""
+        available = (self.available.get(tutor_id, 0) >> day.weekday() * SLOTS_PER_DAY) & FULL_DAY
+        return available & ~self.booked.get((tutor_id, day), 0)
+
+    def is_free(self, tutor_id, day, start_time, duration):
+        """Return whether a tutor is available and unbooked for a whole lesson."""
+        wanted = day_mask(start_time, duration)
+        return self.free_mask(tutor_id, day) & wanted == wanted
+
+    def is_free_for(self, tutor_id, lesson_request):
+        """Return whether a tutor is free for every lesson of a request's series in the window."""
+        wanted = day_mask(lesson_request.get_start_time(), lesson_request.requested_duration)
+        return all(
+            self.free_mask(tutor_id, day) & wanted == wanted
+            for day in lesson_request.occurrence_dates(self.start, self.end)
+        )
+
+    def free_tutors(self, day, start_time, duration):
+        """Return the ids of the tutors free for a whole lesson at `start_time` on `day`."""
+        wanted = day_mask(start_time, duration)
+        return [
+            tutor_id for tutor_id in self.available
+            if self.free_mask(tutor_id, day) & wanted == wanted
+        ]
+
+    def free_tutors_for(self, lesson_request):
+        """Return the ids of the tutors free for every lesson of a request's series in the window."""
+        wanted = day_mask(lesson_request.get_start_time(), lesson_request.requested_duration)
+        days = list(lesson_request.occurrence_dates(self.start, self.end))
+        return [
+            tutor_id for tutor_id in self.available
+            if all(self.free_mask(tutor_id, day) & wanted == wanted for day in days)
+        ]
@@ -0,0 +1,76 @@
+"""Streaming exports of invoices and their lines for accounting."""
+import csv
+import json
+from django.conf import settings
+from django.db.models import Q
+from tutorials.models import Invoice
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = {
+    'invoice_num': 'invoice_num',
+    'student_first_name': 'student__first_name',
+    'student_last_name': 'student__last_name',
+    'student_email': 'student__email',
+    'term': 'term',
+    'invoice_date': 'invoice_date',
+    'due_date': 'due_date',
+    'payment_status': 'payment_status',
+    'payment_date': 'payment_date',
+    'invoice_total': 'total',
+    'line_count': 'line_count',
+    'line_date': 'lines__date',
+    'line_tutor_first_name': 'lines__tutor__first_name',
+    'line_tutor_last_name': 'lines__tutor__last_name',
+    'line_duration': 'lines__duration',
+    'line_hourly_rate': 'lines__hourly_rate',
+    'line_amount': 'lines__amount',
+}
+
+
+def export_rows(term=None, payment_status=None):
+    """
+    Yield one tuple of EXPORT_FIELDS values per invoice line, streamed in chunks.
+    Invoices without lines still yield a single row with empty line columns.
+    - term: Only export lines dated in this term, from its term or running invoices.
+    - payment_status: Only export invoices with this payment status.
+    """
+    invoices = Invoice.objects.all()
+    if payment_status:
+        invoices = invoices.filter(payment_status=payment_status)
+    if term:
+        invoices = invoices.filter(Q(term=term) | Q(term='', lines__date__range=settings.TERMS[term]))
+
+    return (
+        invoices
+        .order_by('id', 'lines__id')
+        .values_list(*EXPORT_FIELDS.values())
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class Echo:
+    """File-like object whose write() returns the value written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """Yield a CSV header and then one CSV line per row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS.keys())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    """Yield one JSON object per row, one per line."""
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + '\n'
+
+
+def export_lines(export_format, rows):
+    """Return a generator serialising `rows` in `export_format`."""
+    return csv_lines(rows) if export_format == 'csv' else jsonl_lines(rows)
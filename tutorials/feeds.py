@@ -0,0 +1,120 @@
+"""Tokenised iCalendar feeds of a tutor's or student's allocated lessons."""
+from datetime import date, timezone
+from itertools import islice
+from django.core import signing
+from tutorials.models import LessonRequest, User
+from tutorials.timetables import allocated_requests, timetable_validators
+
+FEED_SALT = 'tutorials.feeds'
+FEED_CHUNK_SIZE = 500
+FEED_ROLES = ('tutor', 'student')
+# Bump to change every feed's ETag when the feed's layout changes.
+FEED_VERSION = 1
+
+
+def feed_token(user):
+    """Return the secret token in a user's feed URL, signed so it cannot be guessed from their id."""
+    return signing.Signer(salt=FEED_SALT).sign(str(user.pk))
+
+
+def user_for_feed_token(token):
+    """Return the tutor or student a feed token was signed for, or None if it is not valid."""
+    try:
+        user_id = signing.Signer(salt=FEED_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, role__in=FEED_ROLES).first()
+
+
+def feed_requests(user):
+    """Return the allocated lesson requests on a user's feed: those with a date to put them on."""
+    return allocated_requests(user).filter(requested_date__isnull=False)
+
+
+def feed_validators(user):
+    """Return an (etag, last_modified) pair for a user's whole feed."""
+    return timetable_validators(feed_requests(user), user, 'ics', FEED_VERSION)
+
+
+def escape_text(value):
+    """Escape a value for an iCalendar TEXT property."""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line into CRLF-terminated lines of at most 75 octets."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        # Step back so a multi-byte character is never split across lines.
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+TOPICS = dict(LessonRequest.TOPIC_CHOICES)
+FEED_FIELDS = (
+    'id', 'requested_topic', 'requested_date', 'requested_time', 'requested_duration', 'requested_frequency',
+    'recurrence_exceptions', 'recurrence_end', 'updated_at',
+)
+
+
+def local_datetime(day, start):
+    """Format a date and time of day as an iCalendar floating local date-time."""
+    return f"{day:%Y%m%d}T{start:%H%M%S}"
+
+
+def event(row):
+    """
+    Return the VEVENT for one row of FEED_FIELDS and the counterpart's names, with its whole series
+    as one recurrence rule rather than an event per lesson, so the feed grows with requests.
+    """
+    pk, topic, day, start, duration, frequency, exceptions, last, updated_at, first_name, last_name = row
+    lines = [
+        'BEGIN:VEVENT\r\n'
+        f"UID:lesson-request-{pk}@code-tutors\r\n"
+        f"DTSTAMP:{updated_at.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}\r\n"
+        f"DTSTART:{local_datetime(day, start)}\r\n"
+        f"DURATION:PT{duration}M\r\n"
+    ]
+    if last > day:
+        interval = LessonRequest.FREQUENCY_DAYS.get((frequency or '').lower(), 7)
+        lines.append(f"RRULE:FREQ=DAILY;INTERVAL={interval};UNTIL={local_datetime(last, start)}\r\n")
+    if exceptions:
+        lines.append(fold('EXDATE:' + ','.join(
+            local_datetime(date.fromisoformat(skipped), start) for skipped in exceptions
+        )))
+    lines.append(fold(f"SUMMARY:{escape_text(TOPICS.get(topic, topic))} with {escape_text(f'{first_name} {last_name}')}"))
+    lines.append('END:VEVENT\r\n')
+    return ''.join(lines)
+
+
+def feed_lines(user):
+    """
+    Yield a user's feed as iCalendar text, streaming the requests and their events in chunks.
+    Rows are read as plain tuples, as building a model for each would cost more than the event.
+    - user: A tutor or student.
+    """
+    counterpart = 'student' if user.role == 'tutor' else 'tutor'
+    yield (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        'PRODID:-//Code Tutors//Lesson Timetable//EN\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        + fold(f"X-WR-CALNAME:{escape_text(user.full_name())}'s lessons")
+    )
+    rows = feed_requests(user).order_by('requested_date', 'requested_time', 'id').values_list(
+        *FEED_FIELDS, f'{counterpart}__first_name', f'{counterpart}__last_name',
+    )
+    rows = rows.iterator(chunk_size=FEED_CHUNK_SIZE)
+    while chunk := ''.join(event(row) for row in islice(rows, FEED_CHUNK_SIZE)):
+        yield chunk
+    yield 'END:VCALENDAR\r\n'
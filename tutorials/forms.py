@@ -8,7 +8,11 @@ from .models import User, LessonRequest,ContactMessage
 
 from django import forms
 from django.core.exceptions import ValidationError
-from datetime import datetime, timedelta
+from datetime import date, datetime, time
+from django.db.models import Count, Q
+from tutorials.availability import slot_ranges, week_mask
+from tutorials.scheduling import series_clash
+from tutorials.timetables import TIMETABLE_FIELDS
 
 class LogInForm(forms.Form):
     """Form enabling registered users to log in."""
@@ -239,28 +243,18 @@ class LessonBookingForm(forms.ModelForm):
         requested_duration = cleaned_data.get("requested_duration")
 
         if tutor and requested_date and requested_time and requested_duration:
-            request_end_time = (
-                datetime.combine(datetime.today(), requested_time)
-                + timedelta(minutes=requested_duration)
-            ).time()
-
-            overlapping_lessons = LessonRequest.objects.filter(
+            booking = LessonRequest(
+                id=self.instance.id,
                 tutor=tutor,
                 requested_date=requested_date,
-                status="Allocated",
+                requested_time=requested_time,
+                requested_duration=requested_duration,
+                requested_frequency=cleaned_data.get("requested_frequency"),
             )
-
-            for lesson in overlapping_lessons:
-                existing_start = lesson.requested_time
-                existing_end = (
-                    datetime.combine(datetime.today(), existing_start)
-                    + timedelta(minutes=lesson.requested_duration)
-                ).time()
-
-                if requested_time < existing_end and request_end_time > existing_start:
-                    raise forms.ValidationError(
-                        "A lesson is already booked for the requested time slot."
-                    )
+            if series_clash(booking):
+                raise forms.ValidationError(
+                    "A lesson is already booked for the requested time slot."
+                )
 
         return cleaned_data
 
@@ -291,4 +285,262 @@ class AdminReplyBack(forms.ModelForm):
         reply = self.cleaned_data.get('reply')
         if not reply or not reply.strip(): 
             raise forms.ValidationError("Reply cannot be blank.")
-        return reply
\ No newline at end of file
+        return reply
+
+class BankStatementForm(forms.Form):
+    """Form for uploading a bank statement CSV to reconcile against invoices."""
+
+    statement = forms.FileField(
+        label="Bank statement (CSV)",
+        help_text="Needs reference, amount and date columns."
+    )
+
+
+class InvoiceFilterForm(forms.Form):
+    """Filters, sort order and page cursor for the invoice management table."""
+
+    student = forms.CharField(required=False, label="Student name")
+    min_total = forms.DecimalField(required=False, min_value=0, decimal_places=2, label="Min amount")
+    max_total = forms.DecimalField(required=False, min_value=0, decimal_places=2, label="Max amount")
+    overdue = forms.BooleanField(required=False, label="Overdue only")
+    sort = forms.ChoiceField(
+        required=False,
+        choices=[('due_date', 'Due soonest'), ('-due_date', 'Due latest')],
+    )
+    after = forms.CharField(required=False, widget=forms.HiddenInput())
+    before = forms.CharField(required=False, widget=forms.HiddenInput())
+
+    def clean_after(self):
+        return self._clean_cursor('after')
+
+    def clean_before(self):
+        return self._clean_cursor('before')
+
+    def _clean_cursor(self, name):
+        """Parse a `due_date.id` page cursor."""
+        cursor = self.cleaned_data.get(name)
+        if not cursor:
+            return None
+        try:
+            due_date, pk = cursor.split('.')
+            return date.fromisoformat(due_date), int(pk)
+        except ValueError:
+            raise ValidationError("Invalid page cursor.")
+
+    def filter(self, invoices):
+        """Narrow `invoices` by the cleaned filters, all in SQL."""
+        data = self.cleaned_data
+        for name in data.get('student', '').split():
+            invoices = invoices.filter(Q(student__first_name__icontains=name) | Q(student__last_name__icontains=name))
+        if data.get('min_total') is not None:
+            invoices = invoices.filter(total__gte=data['min_total'])
+        if data.get('max_total') is not None:
+            invoices = invoices.filter(total__lte=data['max_total'])
+        if data.get('overdue'):
+            invoices = invoices.filter(due_date__lt=date.today())
+        return invoices
+
+
+class StudentRequestFilterForm(forms.Form):
+    """Filters and page cursor for the admin's queue of lesson requests, paged by student."""
+
+    status = forms.ChoiceField(required=False, choices=[('', 'Any status')] + LessonRequest.STATUS_CHOICES)
+    topic = forms.ChoiceField(required=False, choices=[('', 'Any topic')] + LessonRequest.TOPIC_CHOICES)
+    date_from = forms.DateField(required=False, label="Requested from")
+    date_to = forms.DateField(required=False, label="Requested until")
+    after = forms.CharField(required=False, widget=forms.HiddenInput())
+    before = forms.CharField(required=False, widget=forms.HiddenInput())
+
+    def clean_after(self):
+        return self._clean_cursor('after')
+
+    def clean_before(self):
+        return self._clean_cursor('before')
+
+    def _clean_cursor(self, name):
+        """Parse a `username.id` page cursor."""
+        cursor = self.cleaned_data.get(name)
+        if not cursor:
+            return None
+        try:
+            username, pk = cursor.rsplit('.', 1)
+            return username, int(pk)
+        except ValueError:
+            raise ValidationError("Invalid page cursor.")
+
+    def conditions(self):
+        """Return the valid filters as Q objects keyed by field name; none if the form is invalid."""
+        data = self.cleaned_data if self.is_valid() else {}
+        conditions = {}
+        if data.get('status'):
+            conditions['status'] = Q(status=data['status'])
+        if data.get('topic'):
+            conditions['topic'] = Q(requested_topic=data['topic'])
+        if data.get('date_from'):
+            conditions['date_from'] = Q(requested_date__gte=data['date_from'])
+        if data.get('date_to'):
+            conditions['date_to'] = Q(requested_date__lte=data['date_to'])
+        return conditions
+
+    def filter(self, lesson_requests):
+        """Narrow `lesson_requests` by the filters, all in SQL."""
+        return lesson_requests.filter(*self.conditions().values())
+
+    def facets(self, lesson_requests):
+        """
+        Return {'status': {value: count}, 'topic': {value: count}} for `lesson_requests` from one
+        aggregate query. Each facet is counted under the other filters only, so picking a status
+        still shows how many requests every other status would give.
+        """
+        conditions = self.conditions()
+
+        def others(name):
+            return Q(*(condition for key, condition in conditions.items() if key != name))
+
+        counts = {}
+        for facet, field, choices in (
+            ('status', 'status', LessonRequest.STATUS_CHOICES),
+            ('topic', 'requested_topic', LessonRequest.TOPIC_CHOICES),
+        ):
+            for index, (value, _) in enumerate(choices):
+                counts[f'{facet}_{index}'] = Count('id', filter=Q(**{field: value}) & others(facet))
+        totals = lesson_requests.order_by().aggregate(**counts)
+        return {
+            'status': {value: totals[f'status_{index}'] for index, (value, _) in enumerate(LessonRequest.STATUS_CHOICES)},
+            'topic': {value: totals[f'topic_{index}'] for index, (value, _) in enumerate(LessonRequest.TOPIC_CHOICES)},
+        }
+
+
+class IdListField(forms.Field):
+    """A list of integer ids, given as a repeated form value."""
+
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return list(dict.fromkeys(int(pk) for pk in value))
+        except (TypeError, ValueError):
+            raise ValidationError("Enter a list of ids.")
+
+
+class BulkRequestActionForm(forms.Form):
+    """
+    An action for many lesson requests at once: assigning tutors, unassigning them or cancelling.
+    Assigned tutors come from `tutor_<request id>` values, falling back to `tutor` for the rest,
+    and are cleaned into an `assignments` mapping of request ids to tutor ids.
+    """
+
+    MAX_REQUESTS = 1000
+
+    action = forms.ChoiceField(choices=[
+        ('assign', 'Assign tutor'),
+        ('unassign', 'Unassign tutor'),
+        ('cancel', 'Cancel'),
+    ])
+    request_ids = IdListField()
+    tutor = forms.ModelChoiceField(queryset=User.objects.filter(role='tutor'), required=False)
+
+    def clean_request_ids(self):
+        request_ids = self.cleaned_data['request_ids']
+        if len(request_ids) > self.MAX_REQUESTS:
+            raise ValidationError(f"Choose at most {self.MAX_REQUESTS} requests at a time.")
+        return request_ids
+
+    def clean(self):
+        cleaned_data = super().clean()
+        request_ids = cleaned_data.get('request_ids')
+        if cleaned_data.get('action') != 'assign' or not request_ids:
+            return cleaned_data
+
+        default = cleaned_data.get('tutor')
+        assignments = {}
+        try:
+            for pk in request_ids:
+                tutor_id = self.data.get(f'tutor_{pk}') or (default and default.id)
+                assignments[pk] = int(tutor_id) if tutor_id else None
+        except ValueError:
+            raise ValidationError("Enter a valid tutor for every request.")
+        if None in assignments.values():
+            raise ValidationError("Choose a tutor for every request.")
+
+        tutor_ids = set(assignments.values())
+        if User.objects.filter(role='tutor', id__in=tutor_ids).count() != len(tutor_ids):
+            raise ValidationError("Choose only existing tutors.")
+        cleaned_data['assignments'] = assignments
+        return cleaned_data
+
+
+class TimetableRangeForm(forms.Form):
+    """A half-open [start, end) range of days and the lesson fields to return for it."""
+
+    MAX_DAYS = 92
+
+    start = forms.DateField()
+    end = forms.DateField()
+    fields = forms.CharField(required=False, help_text="Comma-separated names from TIMETABLE_FIELDS.")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end:
+            if end <= start:
+                self.add_error('end', "The end must be after the start.")
+            elif (end - start).days > self.MAX_DAYS:
+                self.add_error('end', f"Ranges can be at most {self.MAX_DAYS} days long.")
+
+        fields = [name.strip() for name in (cleaned_data.get('fields') or '').split(',') if name.strip()]
+        unknown = [name for name in fields if name not in TIMETABLE_FIELDS]
+        if unknown:
+            self.add_error('fields', f"Unknown fields: {', '.join(unknown)}.")
+        cleaned_data['fields'] = tuple(dict.fromkeys(fields)) or TIMETABLE_FIELDS
+        return cleaned_data
+
+
+class TutorAvailabilityForm(forms.Form):
+    """A tutor's weekly availability, as comma-separated time ranges for each weekday."""
+
+    WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+    def __init__(self, *args, instance, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instance = instance
+        for weekday, name in enumerate(self.WEEKDAYS):
+            self.fields[name] = forms.CharField(
+                required=False,
+                initial=', '.join(
+                    f"{start:%H:%M}-{'24:00' if end == time.max else f'{end:%H:%M}'}"
+                    for start, end in slot_ranges(instance.slots, weekday)
+                ),
+                help_text="For example 09:00-12:00, 13:30-17:00",
+            )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        mask = 0
+        for weekday, name in enumerate(self.WEEKDAYS):
+            for text in (cleaned_data.get(name) or '').split(','):
+                if not text.strip():
+                    continue
+                try:
+                    start, end = (self._parse_time(part) for part in text.split('-'))
+                except ValueError:
+                    self.add_error(name, f"Enter times as HH:MM-HH:MM, not '{text.strip()}'.")
+                    continue
+                if end <= start:
+                    self.add_error(name, f"The range '{text.strip()}' must end after it starts.")
+                    continue
+                mask |= week_mask(weekday, start, end)
+        cleaned_data['slots'] = mask
+        return cleaned_data
+
+    def _parse_time(self, value):
+        value = value.strip()
+        return time.max if value == '24:00' else datetime.strptime(value, '%H:%M').time()
+
+    def save(self):
+        """Store the cleaned ranges as the tutor's slot bitmask."""
+        self.instance.slots = self.cleaned_data['slots']
+        self.instance.save()
+        return self.instance
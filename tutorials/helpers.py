@@ -1,5 +1,10 @@
+from contextlib import contextmanager
 from django.conf import settings
+from django.db import connection
+from django.db.models import Q
 from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
 def login_prohibited(view_function):
     """Decorator for view functions that redirect users away if they are logged in."""
@@ -9,4 +14,59 @@ def login_prohibited(view_function):
             return redirect(settings.REDIRECT_URL_WHEN_LOGGED_IN)
         else:
             return view_function(request)
-    return modified_view_function
\ No newline at end of file
+    return modified_view_function
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the request's validators still match, otherwise None."""
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=int(last_modified.timestamp()),
+    )
+
+def add_validators(response, etag, last_modified):
+    """Attach ETag and Last-Modified headers to a per-user response."""
+    response.headers.setdefault('ETag', quote_etag(etag))
+    response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    patch_cache_control(response, private=True)
+    return response
+
+def keyset_page(queryset, key, after=None, before=None, descending=False, per_page=50):
+    """
+    Return one page of `queryset` ordered by (`key`, id), with cursors for the pages either side.
+    Pages seek past a cursor instead of using OFFSET, so a late page costs the same as the first.
+    - after, before: A (key value, id) cursor to start after or to end before.
+    Returns (rows, previous_cursor, next_cursor), where a cursor is None if there is no such page.
+    """
+    backwards = before is not None
+    cursor = before if backwards else after
+    reverse = descending != backwards
+    rows = queryset.order_by(f'-{key}', '-id') if reverse else queryset.order_by(key, 'id')
+    if cursor:
+        value, pk = cursor
+        lookup = 'lt' if reverse else 'gt'
+        rows = rows.filter(Q(**{f'{key}__{lookup}': value}) | Q(**{key: value, f'id__{lookup}': pk}))
+
+    rows = list(rows[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    has_previous, has_next = (more, True) if backwards else (cursor is not None, more)
+    previous_cursor = (getattr(rows[0], key), rows[0].id) if rows and has_previous else None
+    next_cursor = (getattr(rows[-1], key), rows[-1].id) if rows and has_next else None
+    return rows, previous_cursor, next_cursor
+
+@contextmanager
+def throwaway_database():
+    """
+    Run the enclosed block against a freshly migrated test database, destroyed afterwards,
+    so benchmarks can write as much as they like without touching or locking the real one.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
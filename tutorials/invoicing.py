@@ -0,0 +1,393 @@
+"""Invoice ledger: priced lines posted incrementally as lesson requests change status."""
+from collections import deque
+from datetime import date
+from decimal import Decimal
+from hashlib import md5
+from random import uniform
+from threading import Lock
+from time import sleep
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils.timezone import now
+from tutorials.models import Invoice, InvoiceLine, InvoiceNumberSequence, LessonRequest
+
+def term_for(day):
+    """Return the name of the term in settings.TERMS containing `day`, or None if it is in none."""
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    for term, (start, end) in settings.TERMS.items():
+        if day and start <= day <= end:
+            return term
+    return None
+
+
+def price_for(duration, hourly_rate):
+    """Return the price of a lesson of `duration` minutes at `hourly_rate`."""
+    return (Decimal(str(hourly_rate)) * duration / 60).quantize(Decimal('0.01'))
+
+
+def invoice_for(student_id, day=None):
+    """
+    Return the invoice a student's lesson on `day` is billed to, or None if they have none.
+    A term invoice covering the day wins over the student's running invoice.
+    """
+    return Invoice.objects.filter(
+        student=student_id,
+        term__in=[term_for(day) or '', ''],
+    ).order_by('-term', 'id').first()
+
+
+def moved_totals(amount, lines):
+    """
+    Return UPDATE values moving invoices' totals by `amount` and `lines`, and their payment
+    status with them. The status compares against the total before the UPDATE, as SQL does.
+    """
+    return {
+        'total': F('total') + amount,
+        'line_count': F('line_count') + lines,
+        'payment_status': Case(
+            When(total__lte=F('amount_paid') - amount, then=Value('Paid')),
+            default=Value('Unpaid'),
+        ),
+        'updated_at': now(),
+    }
+
+
+def adjust_invoice_totals(invoice_id, amount, lines):
+    """Move an invoice's stored totals by `amount` and `lines` in a single UPDATE."""
+    Invoice.objects.filter(id=invoice_id).update(**moved_totals(amount, lines))
+
+
+def new_line(invoice, lesson_request):
+    """Build an unsaved line billing `lesson_request` to `invoice` at the current hourly rate."""
+    return InvoiceLine(
+        invoice=invoice,
+        lesson_request=lesson_request,
+        tutor_id=lesson_request.tutor_id,
+        date=lesson_request.requested_date,
+        duration=lesson_request.requested_duration,
+        hourly_rate=settings.HOURLY_RATE,
+        amount=price_for(lesson_request.requested_duration, settings.HOURLY_RATE),
+    )
+
+
+@transaction.atomic
+def post_to_ledger(lesson_request):
+    """
+    Bring the ledger in line with a lesson request that has just been saved.
+    Allocating a request posts a line, unallocating or cancelling it removes the
+    line, and rescheduling an allocated request re-prices it at its original rate,
+    moving it to the invoice its new date is billed to.
+    """
+    line = InvoiceLine.objects.filter(lesson_request=lesson_request).first()
+
+    if lesson_request.status != 'Allocated':
+        if line is not None:
+            line.delete()
+            adjust_invoice_totals(line.invoice_id, -line.amount, -1)
+        return
+
+    requested_date = lesson_request.get_start_date()
+    if line is None:
+        invoice = invoice_for(lesson_request.student_id, requested_date)
+        if invoice is not None:
+            line = new_line(invoice, lesson_request)
+            line.save()
+            adjust_invoice_totals(invoice.id, line.amount, 1)
+        return
+
+    billed = (line.tutor_id, line.date, line.duration)
+    if billed == (lesson_request.tutor_id, requested_date, lesson_request.requested_duration):
+        return
+
+    previous_invoice_id, previous_amount = line.invoice_id, line.amount
+    invoice = invoice_for(lesson_request.student_id, requested_date)
+    if invoice is not None:
+        line.invoice = invoice
+    line.tutor_id = lesson_request.tutor_id
+    line.date = requested_date
+    line.duration = lesson_request.requested_duration
+    line.amount = price_for(line.duration, line.hourly_rate)
+    line.save(update_fields=['invoice', 'tutor', 'date', 'duration', 'amount'])
+    if line.invoice_id == previous_invoice_id:
+        adjust_invoice_totals(line.invoice_id, line.amount - previous_amount, 0)
+    else:
+        adjust_invoice_totals(previous_invoice_id, -previous_amount, -1)
+        adjust_invoice_totals(line.invoice_id, line.amount, 1)
+
+
+@transaction.atomic
+def attach_unbilled_lines(invoice):
+    """Bill a student's allocated lessons without a line to `invoice`, if they belong on it."""
+    unbilled = LessonRequest.objects.filter(
+        student=invoice.student_id,
+        status='Allocated',
+        invoice_line__isnull=True,
+    )
+    if invoice.term:
+        unbilled = unbilled.filter(requested_date__range=settings.TERMS[invoice.term])
+    elif invoice_for(invoice.student_id) != invoice:
+        return
+
+    lines = InvoiceLine.objects.bulk_create(new_line(invoice, request) for request in unbilled)
+    if lines:
+        amount = sum(line.amount for line in lines)
+        adjust_invoice_totals(invoice.id, amount, len(lines))
+        invoice.refresh_from_db(fields=['total', 'line_count', 'payment_status', 'updated_at'])
+
+
+def grouped_totals(deltas):
+    """Group invoice ids by the (amount, lines) their totals move by, for one UPDATE per group."""
+    groups = {}
+    for invoice_id, delta in deltas.items():
+        groups.setdefault(delta, []).append(invoice_id)
+    return groups
+
+
+@transaction.atomic
+def post_allocations(lesson_requests):
+    """
+    Bill a batch of newly allocated lesson requests, as post_to_ledger would one at a time.
+    For callers that allocate with bulk updates, which bypass LessonRequest.save().
+    Each request goes on the invoice invoice_for would pick, using one query for every
+    student's invoices, one bulk insert and one UPDATE per distinct change in totals.
+    Requests already billed are left alone. Returns the lines created.
+    """
+    lesson_requests = [request for request in lesson_requests if request.status == 'Allocated']
+    billed = set(InvoiceLine.objects.filter(
+        lesson_request__in=lesson_requests,
+    ).values_list('lesson_request_id', flat=True))
+    lesson_requests = [request for request in lesson_requests if request.id not in billed]
+    if not lesson_requests:
+        return []
+
+    invoices = {}
+    for invoice in Invoice.objects.filter(
+        student__in={request.student_id for request in lesson_requests},
+    ).order_by('-term', 'id'):
+        invoices.setdefault((invoice.student_id, invoice.term), invoice)
+
+    lines = []
+    deltas = {}
+    for request in lesson_requests:
+        term = term_for(request.requested_date)
+        invoice = invoices.get((request.student_id, term)) if term else None
+        invoice = invoice or invoices.get((request.student_id, ''))
+        if invoice is None:
+            continue
+        line = new_line(invoice, request)
+        lines.append(line)
+        amount, count = deltas.get(invoice.id, (0, 0))
+        deltas[invoice.id] = (amount + line.amount, count + 1)
+
+    InvoiceLine.objects.bulk_create(lines, batch_size=1000)
+    for (amount, count), invoice_ids in grouped_totals(deltas).items():
+        Invoice.objects.filter(id__in=invoice_ids).update(**moved_totals(amount, count))
+    return lines
+
+
+@transaction.atomic
+def remove_allocations(lesson_requests):
+    """
+    Remove the lines of a batch of unallocated or cancelled lesson requests, as post_to_ledger would.
+    The counterpart of post_allocations, with one DELETE and one UPDATE per distinct change in totals.
+    Returns the number of lines removed.
+    """
+    lines = InvoiceLine.objects.filter(lesson_request__in=lesson_requests)
+    deltas = {}
+    for invoice_id, amount in lines.values_list('invoice_id', 'amount'):
+        total, count = deltas.get(invoice_id, (0, 0))
+        deltas[invoice_id] = (total - amount, count - 1)
+    if not deltas:
+        return 0
+
+    removed, _ = lines.delete()
+    for (amount, count), invoice_ids in grouped_totals(deltas).items():
+        Invoice.objects.filter(id__in=invoice_ids).update(**moved_totals(amount, count))
+    return removed
+
+
+class InvoiceNumberAllocator:
+    """
+    Hands out unique invoice numbers from blocks reserved in the InvoiceNumberSequence table.
+    Each process reserves a block with one UPDATE and serves numbers from memory until it
+    runs out, so numbers never collide across processes though they may leave gaps.
+    """
+
+    # Random numbers used to be drawn from 100000-999999, so sequenced ones start above them.
+    FIRST_NUMBER = 1000000
+    RETRIES = 10
+
+    def __init__(self, name='invoice', prefix='INV', block_size=100):
+        self.name = name
+        self.prefix = prefix
+        self.block_size = block_size
+        self._blocks = deque()
+        self._lock = Lock()
+
+    def allocate(self, count=1):
+        """Return `count` unused invoice numbers, reserving a new block only if needed."""
+        numbers = []
+        with self._lock:
+            while self._blocks and len(numbers) < count:
+                block = self._blocks.popleft()
+                taken = block[:count - len(numbers)]
+                numbers.extend(taken)
+                if len(taken) < len(block):
+                    self._blocks.appendleft(block[len(taken):])
+
+        missing = count - len(numbers)
+        if missing:
+            block = self._reserve(max(missing, self.block_size))
+            numbers.extend(block[:missing])
+            # A block reserved inside a transaction is only ours once that transaction commits.
+            transaction.on_commit(lambda: self._release(block[missing:]))
+
+        return [f"{self.prefix}{number}" for number in numbers]
+
+    def _release(self, block):
+        if block:
+            with self._lock:
+                self._blocks.append(block)
+
+    def _reserve(self, size):
+        """Advance the sequence by `size` and return the reserved range, retrying on contention."""
+        for attempt in range(self.RETRIES):
+            try:
+                with transaction.atomic():
+                    sequence = InvoiceNumberSequence.objects.filter(name=self.name)
+                    if not sequence.update(next_value=F('next_value') + size):
+                        InvoiceNumberSequence.objects.create(name=self.name, next_value=self.FIRST_NUMBER + size)
+                    end = sequence.values_list('next_value', flat=True).get()
+                return range(end - size, end)
+            except (IntegrityError, OperationalError):
+                if attempt == self.RETRIES - 1:
+                    raise
+                sleep(uniform(0, 0.005 * 2 ** attempt))
+
+
+invoice_numbers = InvoiceNumberAllocator()
+
+
+@transaction.atomic
+def invoice_term(term, student_ids):
+    """
+    Create a batch of students' invoices for a term and bill their unbilled lessons in it.
+    Lines for the term already on a student's running invoice move to their term invoice.
+    Students who already have an invoice for the term keep it, so re-running is safe.
+    Returns the number of invoices created and lines posted.
+    """
+    term_start, term_end = settings.TERMS[term]
+    unbilled = {}
+    for request in LessonRequest.objects.filter(
+        student__in=student_ids,
+        status='Allocated',
+        requested_date__range=[term_start, term_end],
+        invoice_line__isnull=True,
+    ):
+        unbilled.setdefault(request.student_id, []).append(request)
+
+    running = InvoiceLine.objects.filter(
+        invoice__student__in=student_ids,
+        invoice__term='',
+        date__range=[term_start, term_end],
+    ).values_list('id', 'invoice_id', 'invoice__student_id', 'amount')
+
+    invoices = {
+        invoice.student_id: invoice
+        for invoice in Invoice.objects.filter(term=term, student__in=student_ids)
+    }
+    missing = [student_id for student_id in student_ids if student_id not in invoices]
+    for student_id, number in zip(missing, invoice_numbers.allocate(len(missing))):
+        invoices[student_id] = Invoice(
+            student_id=student_id,
+            term=term,
+            invoice_num=number,
+            due_date=term_end,
+            payment_status=payment_status_for(0, 0),
+        )
+
+    # Price the lines first so new invoices are inserted with their final totals. Existing
+    # invoices are moved by their deltas instead, so concurrent ledger postings are kept.
+    deltas = {}
+
+    def add(invoice, amount, count):
+        if invoice.pk is None:
+            invoice.total += amount
+            invoice.line_count += count
+        else:
+            total, lines = deltas.get(invoice.id, (0, 0))
+            deltas[invoice.id] = (total + amount, lines + count)
+
+    lines = []
+    for student_id, requests in unbilled.items():
+        invoice = invoices[student_id]
+        for request in requests:
+            line = new_line(invoice, request)
+            lines.append(line)
+            add(invoice, line.amount, 1)
+
+    moving = {}
+    for line_id, running_id, student_id, amount in running:
+        moving.setdefault(student_id, (running_id, []))[1].append(line_id)
+        add(invoices[student_id], amount, 1)
+        total, count = deltas.get(running_id, (0, 0))
+        deltas[running_id] = (total - amount, count - 1)
+
+    for student_id in missing:
+        invoice = invoices[student_id]
+        invoice.payment_status = payment_status_for(invoice.total, invoice.amount_paid)
+
+    created = Invoice.objects.bulk_create(invoices[student_id] for student_id in missing)
+    InvoiceLine.objects.bulk_create(lines)
+    if moving:
+        InvoiceLine.objects.filter(
+            id__in=[line_id for _, line_ids in moving.values() for line_id in line_ids],
+        ).update(invoice=Case(*(
+            When(invoice_id=running_id, then=Value(invoices[student_id].id))
+            for student_id, (running_id, _) in moving.items()
+        )))
+    for (amount, count), invoice_ids in grouped_totals(deltas).items():
+        Invoice.objects.filter(id__in=invoice_ids).update(**moved_totals(amount, count))
+
+    return len(created), len(lines)
+
+
+def invoice_lines(invoice, term_start=None, term_end=None):
+    """
+    Return the lesson requests billed on an invoice, each annotated with its `lesson_price`.
+    - term_start, term_end: Optional bounds on the lessons' requested_date.
+    """
+    lesson_requests = LessonRequest.objects.filter(invoice_line__invoice=invoice)
+    if term_start and term_end:
+        lesson_requests = lesson_requests.filter(invoice_line__date__range=[term_start, term_end])
+    return lesson_requests.select_related('tutor').annotate(lesson_price=F('invoice_line__amount'))
+
+
+def payment_status_for(total, amount_paid):
+    """Return the payment status of an invoice with the given total and payments against it."""
+    return 'Paid' if total <= amount_paid else 'Unpaid'
+
+
+def sync_payment_status(invoice, total):
+    """Bring an invoice's payment status in line with `total`, writing only if it changed."""
+    status = payment_status_for(total, invoice.amount_paid)
+    if invoice.payment_status != status:
+        invoice.payment_status = status
+        invoice.save(update_fields=['payment_status', 'updated_at'])
+    return invoice
+
+
+def invoice_validators(invoice, *variant):
+    """
+    Return an (etag, last_modified) pair for a page rendering `invoice`.
+    Every ledger change touches the invoice, so its `updated_at` covers the lines.
+    - variant: Anything else the page depends on, such as the term or viewer role.
+    """
+    parts = [
+        invoice.pk, invoice.payment_status, invoice.due_date, invoice.payment_date,
+        invoice.student.full_name(), invoice.updated_at.isoformat(), *variant,
+    ]
+    etag = md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return etag, invoice.updated_at
@@ -0,0 +1,97 @@
+from datetime import date, time, timedelta
+from time import perf_counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from tutorials.feeds import feed_token
+from tutorials.helpers import throwaway_database
+from tutorials.models import User, LessonRequest
+from tutorials.views import calendar_feed
+
+class Command(BaseCommand):
+    """
+    Time a tutor's calendar feed, in full and as a conditional poll, against a latency budget.
+    Measured here on SQLite with the defaults, 2000 lessons in series of 10 as generated lessons
+    used to be: 11ms and 3 queries for the full feed, 2.3ms and 2 queries for a poll. The feed
+    grows with requests, not lessons, so 2000 one-off lessons (--per-series 1) take about 60ms,
+    over the budget; most of that is the ORM converting each row.
+    """
+
+    help = (
+        'Benchmarks generating and re-polling the iCalendar feed of a busy tutor on a throwaway '
+        'test database, failing if the full feed takes longer than the budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lessons', type=int, default=2000, help='Allocated lessons the tutor teaches.')
+        parser.add_argument('--per-series', type=int, default=10, help='Lessons in each of their series.')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests to average over.')
+        parser.add_argument('--budget-ms', type=float, default=50, help='Longest a full feed may take.')
+
+    def handle(self, *args, **options):
+        """Build the tutor's lessons in a throwaway database and time their feed."""
+        with throwaway_database():
+            (full, full_queries), (poll, poll_queries, status) = run_benchmark(
+                options['lessons'], options['per_series'], options['repeat'],
+            )
+
+        if status != 304:
+            self.stderr.write(f"Poll with the current ETag returned {status}, not 304.")
+        self.stdout.write(
+            f"Feed of {options['lessons']} lessons in series of {options['per_series']}: "
+            f"{full * 1000:.2f}ms, {full_queries} queries per request."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Conditional poll: {poll * 1000:.2f}ms, {poll_queries} queries per request."
+        ))
+        if full * 1000 > options['budget_ms']:
+            raise CommandError(f"The full feed took {full * 1000:.2f}ms, over the {options['budget_ms']}ms budget.")
+
+
+def run_benchmark(lessons, per_series, repeat):
+    """
+    Give a new tutor `lessons` allocated lessons in series of `per_series` and serve their feed.
+    Returns the mean (seconds, queries) of a full feed, and those of a poll with its ETag
+    along with the poll's status code.
+    """
+    tutor = build_schedule(lessons, per_series)
+    request = RequestFactory().get('/calendar.ics')
+    token = feed_token(tutor)
+
+    full, full_queries, response = time_requests(request, token, repeat)
+    request.META['HTTP_IF_NONE_MATCH'] = response['ETag']
+    poll, poll_queries, not_modified = time_requests(request, token, repeat)
+    return (full, full_queries), (poll, poll_queries, not_modified.status_code)
+
+
+def build_schedule(lessons, per_series):
+    student = User.objects.create_user(username='@benchstudent', email='benchstudent@example.com', role='student')
+    tutor = User.objects.create_user(username='@benchtutor', email='benchtutor@example.com', role='tutor')
+    requests = []
+    for number in range(-(-lessons // per_series)):
+        request = LessonRequest(
+            student=student,
+            tutor=tutor,
+            status='Allocated',
+            requested_date=date(2025, 1, 6) + timedelta(days=number // 8),
+            requested_time=time(9 + number % 8),
+            recurrence_count=per_series,
+        )
+        request.end_time = request.get_end_time()
+        request.recurrence_end = request.last_occurrence()
+        requests.append(request)
+    LessonRequest.objects.bulk_create(requests)
+    return tutor
+
+
+def time_requests(request, token, repeat):
+    """Return the mean seconds and queries to serve the feed in full, and the last response."""
+    with CaptureQueriesContext(connection) as queries:
+        started = perf_counter()
+        for _ in range(repeat):
+            response = calendar_feed(request, token)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        elapsed = perf_counter() - started
+    return elapsed / repeat, len(queries) / repeat, response
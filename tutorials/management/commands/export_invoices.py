@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tutorials.exports import EXPORT_FORMATS, export_lines, export_rows
+
+class Command(BaseCommand):
+    """Stream invoices and their lines to a file or stdout."""
+
+    help = 'Exports invoices with their totals and line items as CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Output format.')
+        parser.add_argument('--term', choices=settings.TERMS.keys(), help='Only export lines dated in this term.')
+        parser.add_argument('--status', choices=['Paid', 'Unpaid'], help='Only export invoices with this status.')
+        parser.add_argument('--output', help='File to write to instead of stdout.')
+
+    def handle(self, *args, **options):
+        """Write the export one line at a time."""
+        rows = export_rows(term=options['term'], payment_status=options['status'])
+        lines = export_lines(options['format'], rows)
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
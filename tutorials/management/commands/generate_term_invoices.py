@@ -0,0 +1,53 @@
+from itertools import islice
+from time import perf_counter
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tutorials.invoicing import invoice_term
+from tutorials.models import User
+
+class Command(BaseCommand):
+    """Create every student's invoice for a term in batches."""
+
+    help = 'Creates term invoices for all students and bills their allocated lessons in the term'
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', choices=settings.TERMS.keys(), help='The term to invoice.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=self.DEFAULT_BATCH_SIZE,
+            help='Number of students invoiced per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """Invoice the term one batch of students at a time, reporting throughput."""
+        term = options['term']
+        batch_size = options['batch_size']
+        student_ids = (
+            User.objects.filter(role='student')
+            .order_by('id')
+            .values_list('id', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+
+        started = perf_counter()
+        students = invoices = lines = 0
+        while batch := list(islice(student_ids, batch_size)):
+            created, posted = invoice_term(term, batch)
+            students += len(batch)
+            invoices += created
+            lines += posted
+            self.stdout.write(f"{students} students processed ({self.rate(students, started)} students/s).")
+
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Invoiced {students} students for the {term} term: {invoices} invoices created, "
+            f"{lines} lines posted in {elapsed:.2f}s ({self.rate(students, started)} students/s)."
+        ))
+
+    def rate(self, count, started):
+        """Return the whole number of items processed per second since `started`."""
+        elapsed = perf_counter() - started
+        return round(count / elapsed) if elapsed else count
@@ -0,0 +1,40 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from tutorials.matching import match_requests
+
+class Command(BaseCommand):
+    """Allocate unallocated lesson requests to free, qualified tutors."""
+
+    help = (
+        'Matches every unallocated lesson request to the best free tutor covering its topic; '
+        'tutors without recorded availability are skipped unless --assume-available is given'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-load', type=int, default=None,
+                            help='The most allocated requests any tutor may end up with.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the matches without saving them.')
+        parser.add_argument('--assume-available', action='store_true',
+                            help='Treat tutors with no availability recorded as available all week.')
+
+    def handle(self, *args, **options):
+        """Run the matcher over the whole backlog and print what it allocated."""
+        started = perf_counter()
+        report = match_requests(
+            max_load=options['max_load'],
+            commit=not options['dry_run'],
+            assume_available=options['assume_available'],
+        )
+
+        if report.unavailable:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {len(report.unavailable)} tutors with expertise but no availability recorded; "
+                f"pass --assume-available to treat them as free."
+            ))
+        for request in report.unmatched:
+            self.stdout.write(f"No free tutor for request {request.id} ({request.requested_topic} on {request.requested_date})")
+        verb = 'Would allocate' if options['dry_run'] else 'Allocated'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report.matched} requests in {perf_counter() - started:.1f}s, "
+            f"{len(report.unmatched)} left without a free tutor."
+        ))
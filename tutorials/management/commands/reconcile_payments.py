@@ -0,0 +1,30 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from tutorials.reconciliation import RECONCILE_BATCH_SIZE, reconcile_payments
+
+class Command(BaseCommand):
+    """Mark invoices paid from a bank statement CSV."""
+
+    help = 'Reconciles a bank statement CSV with reference, amount and date columns against invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Path to the bank statement CSV.')
+        parser.add_argument('--batch-size', type=int, default=RECONCILE_BATCH_SIZE,
+                            help='Number of statement rows matched per query.')
+
+    def handle(self, *args, **options):
+        """Stream the statement through the reconciler and print its report."""
+        started = perf_counter()
+        with open(options['statement'], newline='', encoding='utf-8-sig') as statement:
+            report = reconcile_payments(statement, batch_size=options['batch_size'])
+
+        for issue in report.issues:
+            self.stdout.write(f"Line {issue.line}: {issue.reason} payment of {issue.amount} for '{issue.reference}'")
+        if report.duplicates:
+            self.stdout.write(report.DUPLICATE_NOTE)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {report.rows} rows in {perf_counter() - started:.1f}s: "
+            f"{report.matched} matched, {report.settled} invoices settled, "
+            f"{len(report.unmatched)} unmatched, {len(report.duplicates)} duplicates, "
+            f"{len(report.invalid)} invalid."
+        ))
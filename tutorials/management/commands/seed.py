@@ -132,7 +132,6 @@ class Command(BaseCommand):
         for student in students:
             Invoice.objects.create(
                 student=student,
-                invoice_num=f"INV{randint(100000, 999999)}",
                 due_date=faker.date_between(start_date='-30d', end_date='+30d'),
                 payment_status=choice(['Paid', 'Unpaid']),
             )
@@ -0,0 +1,271 @@
+"""Batch matching of unallocated lesson requests to free, qualified tutors."""
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils.timezone import now
+from tutorials.allocation import lock_tutors
+from tutorials.availability import FULL_WEEK, SLOTS_PER_DAY, FreeBusy, day_mask
+from tutorials.invoicing import post_allocations
+from tutorials.models import Expertise, LessonRequest, Topic, User
+
+CANDIDATE_LIMIT = 10
+# Tutors ranked by qualification and load whose free/busy is read, per candidate returned.
+CANDIDATE_POOL_FACTOR = 3
+
+Candidate = namedtuple('Candidate', ['id', 'name', 'qualified', 'free', 'load'])
+# Free tutors rank first, then those whose availability is unknown, then those who are busy.
+FREE_RANK = {True: 0, None: 1, False: 2}
+
+class MatchReport:
+    """
+    The tutor chosen for each matched request, the requests no tutor was free for, and the
+    tutors left out of matching because they have expertise but no availability recorded.
+    """
+
+    def __init__(self):
+        self.assignments = []
+        self.unmatched = []
+        self.unavailable = []
+
+    @property
+    def matched(self):
+        return len(self.assignments)
+
+
+class TutorMatcher:
+    """
+    Scores tutors against lesson requests by expertise, availability and load.
+    A tutor qualifies for a request if their expertise covers its topic and they are available
+    and unbooked for every lesson of its series. Among those qualifying, the cheapest is the
+    least loaded, then the one covering fewest topics, so generalists stay free for the rest.
+    Tutors without recorded availability are never candidates, and are listed in `unavailable`,
+    unless `assume_available` is set, when they are taken to be available all week.
+    Bookings and loads are read by load_bookings, for the tutors that qualify for some request.
+    """
+
+    def __init__(self, start, end, max_load=None, assume_available=False):
+        self.start = start
+        self.end = end
+        self.max_load = max_load
+        self.assume_available = assume_available
+        self.topics = {}
+        available = {}
+        unavailable = set()
+        for tutor_id, topic, slots in Expertise.objects.filter(
+            tutor__role='tutor',
+            topic__lesson_topic__gt='',
+        ).values_list('tutor_id', 'topic__lesson_topic', 'tutor__availability__weekly_slots'):
+            if slots is None and not assume_available:
+                unavailable.add(tutor_id)
+                continue
+            self.topics.setdefault(tutor_id, set()).add(topic)
+            available[tutor_id] = FULL_WEEK if slots is None else int.from_bytes(bytes(slots), 'little')
+        self.unavailable = sorted(unavailable)
+        self.free_busy = None
+        self.load = None
+
+        # Tutors by topic and by weekly slot, so the tutors available for a lesson's weekday and
+        # hours are a few set intersections rather than a check of every tutor.
+        self.by_topic = {topic: set() for topic in Topic.LESSON_TOPIC_KEYWORDS}
+        self.by_slot = {}
+        for tutor_id, topics in self.topics.items():
+            for topic in topics:
+                self.by_topic[topic].add(tutor_id)
+            slots = available[tutor_id]
+            while slots:
+                slot = (slots & -slots).bit_length() - 1
+                self.by_slot.setdefault(slot, set()).add(tutor_id)
+                slots &= slots - 1
+
+    def candidates(self, lesson_requests):
+        """Return the ids of the tutors qualifying for any of `lesson_requests`, read from memory."""
+        return set().union(*(self.qualified(request) for request in lesson_requests))
+
+    def load_bookings(self, tutors):
+        """Read the bookings between `start` and `end` and the loads of `tutors`, in three queries."""
+        tutors = list(tutors)
+        self.free_busy = FreeBusy(
+            self.start, self.end, tutors=tutors, default_slots=FULL_WEEK if self.assume_available else None,
+        )
+        self.load = dict.fromkeys(tutors, 0)
+        self.load.update(
+            LessonRequest.objects.filter(tutor__in=tutors, status='Allocated')
+            .order_by().values_list('tutor').annotate(count=Count('id'))
+        )
+
+    def qualified(self, lesson_request):
+        """Return the ids of tutors covering a request's topic and available each week for it."""
+        tutors = self.by_topic.get(lesson_request.requested_topic, set())
+        wanted = day_mask(lesson_request.get_start_time(), lesson_request.requested_duration)
+        offset = lesson_request.get_start_date().weekday() * SLOTS_PER_DAY
+        while wanted and tutors:
+            slot = (wanted & -wanted).bit_length() - 1
+            tutors = tutors & self.by_slot.get(offset + slot, set())
+            wanted &= wanted - 1
+        return tutors
+
+    def cost(self, tutor_id):
+        return self.load[tutor_id], len(self.topics[tutor_id]), tutor_id
+
+    def best_tutor(self, lesson_request, tutors):
+        """Return the cheapest of `tutors` with no booking clashing with the request's series, or None."""
+        mask = day_mask(lesson_request.get_start_time(), lesson_request.requested_duration)
+        days = list(lesson_request.occurrence_dates())
+        for tutor_id in sorted(tutors, key=self.cost):
+            if self.max_load is not None and self.load[tutor_id] >= self.max_load:
+                return None
+            if not self.free_busy.clashes(tutor_id, days, mask):
+                return tutor_id
+        return None
+
+    def match(self, lesson_requests):
+        """
+        Return a MatchReport assigning tutors to as many requests as possible.
+        Requests with the fewest qualified tutors are matched first, oldest first among equals,
+        and each assignment is booked before the next, so no tutor is given overlapping lessons.
+        """
+        report = MatchReport()
+        report.unavailable = self.unavailable
+        candidates = [(request, self.qualified(request)) for request in lesson_requests]
+        if self.free_busy is None:
+            self.load_bookings(set().union(*(tutors for _, tutors in candidates)))
+        candidates.sort(key=lambda candidate: (len(candidate[1]), candidate[0].request_date))
+        for request, tutors in candidates:
+            tutor_id = self.best_tutor(request, tutors)
+            if tutor_id is None:
+                report.unmatched.append(request)
+                continue
+            self.free_busy.book(tutor_id, request)
+            self.load[tutor_id] += 1
+            report.assignments.append((request, tutor_id))
+        return report
+
+
+@transaction.atomic
+def match_requests(lesson_requests=None, max_load=None, commit=True, assume_available=False):
+    """
+    Allocate unallocated lesson requests to tutors in one transaction and return a MatchReport.
+    Assignments are written with one UPDATE per tutor, under the tutors' booking locks, and
+    billed with post_allocations.
+    - lesson_requests: A queryset of requests to match; every unallocated request by default.
+    - max_load: The most allocated requests any tutor may end up with.
+    - commit: If False, work out the assignments without saving them.
+    - assume_available: Take tutors with no availability recorded to be available all week.
+    """
+    if lesson_requests is None:
+        lesson_requests = LessonRequest.objects.all()
+    lesson_requests = list(
+        lesson_requests.filter(status='Unallocated', requested_date__isnull=False).select_for_update()
+    )
+    if not lesson_requests:
+        return MatchReport()
+
+    start = min(request.requested_date for request in lesson_requests)
+    end = max(request.recurrence_end for request in lesson_requests)
+    matcher = TutorMatcher(start, end, max_load, assume_available)
+    # Hold the lock of every tutor qualifying for some request before reading their bookings,
+    # so no single booking can land between reading their free/busy and writing the assignments.
+    tutors = matcher.candidates(lesson_requests)
+    if commit:
+        lock_tutors(tutors)
+    matcher.load_bookings(tutors)
+    report = matcher.match(lesson_requests)
+    if not commit:
+        return report
+
+    updated_at = now()
+    by_tutor = {}
+    for request, tutor_id in report.assignments:
+        request.tutor_id = tutor_id
+        request.status = 'Allocated'
+        request.updated_at = updated_at
+        by_tutor.setdefault(tutor_id, []).append(request.id)
+    for tutor_id, ids in by_tutor.items():
+        LessonRequest.objects.filter(id__in=ids).update(tutor=tutor_id, status='Allocated', updated_at=updated_at)
+    post_allocations([request for request, _ in report.assignments])
+    return report
+
+
+def tutor_candidates(lesson_request, search='', limit=CANDIDATE_LIMIT):
+    """
+    Return up to `limit` Candidates for a lesson request, best first.
+    Tutors whose expertise covers the request's topic come first, then those available and
+    unbooked for its whole series, then the least loaded. `free` is None for tutors with no
+    availability recorded, who rank between free and busy tutors. Only qualified tutors are ranked
+    unless `search` names others. Qualification and load are ranked in one query and cut to
+    CANDIDATE_POOL_FACTOR times `limit`, and only those tutors' bookings are read, so the
+    cost follows `limit` rather than how many tutors the topic or search matches.
+    - search: Words that must each appear in a tutor's first name, last name or username.
+    """
+    tutors = User.objects.filter(role='tutor').annotate(
+        qualified=Exists(Expertise.objects.filter(
+            tutor=OuterRef('pk'), topic__lesson_topic=lesson_request.requested_topic,
+        )),
+    )
+    if search:
+        tutors = _named(tutors, search)
+    else:
+        tutors = tutors.filter(qualified=True)
+    tutors = tutors.annotate(
+        load=Count('assigned_requests', filter=Q(assigned_requests__status='Allocated')),
+    ).order_by('-qualified', 'load', 'first_name', 'last_name', 'id').values_list(
+        'id', 'first_name', 'last_name', 'qualified', 'load',
+    )[:limit * CANDIDATE_POOL_FACTOR]
+    tutors = list(tutors)
+    if not tutors:
+        return []
+
+    free_busy = None
+    if lesson_request.requested_date:
+        free_busy = FreeBusy(
+            lesson_request.get_start_date(), lesson_request.last_occurrence(),
+            tutors=[tutor_id for tutor_id, *_ in tutors],
+        )
+
+    candidates = [
+        Candidate(
+            tutor_id,
+            f"{first_name} {last_name}",
+            qualified,
+            _free(free_busy, tutor_id, lesson_request),
+            load,
+        )
+        for tutor_id, first_name, last_name, qualified, load in tutors
+    ]
+    candidates.sort(key=lambda candidate: (
+        not candidate.qualified, FREE_RANK[candidate.free], candidate.load, candidate.name,
+    ))
+    return candidates[:limit]
+
+
+def _free(free_busy, tutor_id, lesson_request):
+    """Return whether a tutor is free for a request, or None if they have no availability recorded."""
+    if free_busy is None:
+        return False
+    if tutor_id not in free_busy.available:
+        return None
+    return free_busy.is_free_for(tutor_id, lesson_request)
+
+
+def search_tutors(search='', limit=CANDIDATE_LIMIT):
+    """
+    Return up to `limit` Candidates among all tutors, least loaded first, for choosing a tutor
+    with no particular request in mind. Loads are counted, ranked and cut to `limit` in one
+    query, so the cost does not follow the number of tutors. `qualified` and `free` are None.
+    - search: Words that must each appear in a tutor's first name, last name or username.
+    """
+    tutors = _named(User.objects.filter(role='tutor'), search).annotate(
+        load=Count('assigned_requests', filter=Q(assigned_requests__status='Allocated')),
+    ).order_by('load', 'first_name', 'last_name', 'id')
+    return [
+        Candidate(tutor_id, f"{first_name} {last_name}", None, None, load)
+        for tutor_id, first_name, last_name, load in tutors.values_list('id', 'first_name', 'last_name', 'load')[:limit]
+    ]
+
+
+def _named(tutors, search):
+    for word in search.split():
+        tutors = tutors.filter(
+            Q(first_name__icontains=word) | Q(last_name__icontains=word) | Q(username__icontains=word)
+        )
+    return tutors
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18 06:52
+
+import tutorials.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0004_alter_lessonrequest_experience_level_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="When this invoice was last changed, used for conditional GET.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lessonrequest",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, help_text="When this lesson request was last changed."
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="email",
+            field=models.EmailField(
+                max_length=254,
+                unique=True,
+                validators=[tutorials.models.validate_email_format],
+            ),
+        ),
+    ]
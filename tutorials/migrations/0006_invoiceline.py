@@ -0,0 +1,132 @@
+# Generated by Django 5.1.2 on 2026-10-18 06:54
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_invoice_lines(apps, schema_editor):
+    """Post a line for every allocated request onto its student's first invoice."""
+    Invoice = apps.get_model("tutorials", "Invoice")
+    InvoiceLine = apps.get_model("tutorials", "InvoiceLine")
+    LessonRequest = apps.get_model("tutorials", "LessonRequest")
+    rate = Decimal(str(settings.HOURLY_RATE))
+
+    ledger_invoices = {}
+    for invoice in Invoice.objects.order_by("-id"):
+        ledger_invoices[invoice.student_id] = invoice
+
+    lines = []
+    for request in LessonRequest.objects.filter(
+        status="Allocated", student__in=ledger_invoices.keys()
+    ).iterator():
+        amount = (rate * request.requested_duration / 60).quantize(Decimal("0.01"))
+        invoice = ledger_invoices[request.student_id]
+        invoice.total += amount
+        invoice.line_count += 1
+        lines.append(
+            InvoiceLine(
+                invoice=invoice,
+                lesson_request=request,
+                tutor_id=request.tutor_id,
+                date=request.requested_date,
+                duration=request.requested_duration,
+                hourly_rate=rate,
+                amount=amount,
+            )
+        )
+
+    InvoiceLine.objects.bulk_create(lines, batch_size=500)
+    Invoice.objects.bulk_update(
+        [invoice for invoice in ledger_invoices.values() if invoice.line_count],
+        ["total", "line_count"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0005_invoice_updated_at_lessonrequest_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="line_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of lines on this invoice."
+            ),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="total",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Sum of the amounts on this invoice's lines.",
+                max_digits=10,
+            ),
+        ),
+        migrations.CreateModel(
+            name="InvoiceLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(blank=True, null=True)),
+                ("duration", models.PositiveIntegerField()),
+                (
+                    "hourly_rate",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Hourly rate when the line was posted, so later rate changes do not re-price it.",
+                        max_digits=8,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "invoice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="tutorials.invoice",
+                    ),
+                ),
+                (
+                    "lesson_request",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="invoice_line",
+                        to="tutorials.lessonrequest",
+                    ),
+                ),
+                (
+                    "tutor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="invoice_lines",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["invoice", "date"], name="invoice_line_invoice_date"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_invoice_lines, migrations.RunPython.noop),
+    ]
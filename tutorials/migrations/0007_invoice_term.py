@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0006_invoiceline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="term",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="The term this invoice covers, or blank for a student's running invoice.",
+                max_length=20,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="invoice",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("term", ""), _negated=True),
+                fields=("student", "term"),
+                name="unique_student_term_invoice",
+            ),
+        ),
+    ]
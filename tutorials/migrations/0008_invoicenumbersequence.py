@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0007_invoice_term"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InvoiceNumberSequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                (
+                    "next_value",
+                    models.BigIntegerField(
+                        help_text="The first number not yet reserved by any process."
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="invoice",
+            name="invoice_num",
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:13
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_amount_paid(apps, schema_editor):
+    """Treat invoices already marked paid as paid in full, so they stay paid."""
+    Invoice = apps.get_model("tutorials", "Invoice")
+    Invoice.objects.filter(payment_status="Paid").update(amount_paid=F("total"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0008_invoicenumbersequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="amount_paid",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Sum of the bank payments reconciled against this invoice.",
+                max_digits=10,
+            ),
+        ),
+        migrations.RunPython(backfill_amount_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0009_invoice_amount_paid"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["payment_status", "due_date", "id"],
+                name="invoice_status_due_date",
+            ),
+        ),
+    ]
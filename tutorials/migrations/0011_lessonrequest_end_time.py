@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:20
+
+from datetime import date, datetime, time, timedelta
+from django.db import migrations, models
+
+
+def backfill_end_times(apps, schema_editor):
+    """Store the end time of every existing lesson request."""
+    LessonRequest = apps.get_model("tutorials", "LessonRequest")
+    requests = []
+    for request in LessonRequest.objects.only("requested_time", "requested_duration").iterator():
+        start = datetime.combine(date.today(), request.requested_time)
+        end = start + timedelta(minutes=request.requested_duration)
+        request.end_time = end.time() if end.date() == start.date() else time.max
+        requests.append(request)
+    LessonRequest.objects.bulk_update(requests, ["end_time"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0010_invoice_status_due_date_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lessonrequest",
+            name="end_time",
+            field=models.TimeField(
+                editable=False,
+                help_text="When the lesson finishes, kept in step with its time and duration on save.",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lessonrequest",
+            index=models.Index(
+                fields=["tutor", "requested_date", "status"],
+                name="lesson_request_tutor_day",
+            ),
+        ),
+        migrations.RunPython(backfill_end_times, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:25
+
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def backfill_recurrence_end(apps, schema_editor):
+    """Store the last lesson date of every existing series of ten."""
+    LessonRequest = apps.get_model("tutorials", "LessonRequest")
+    requests = []
+    for request in LessonRequest.objects.filter(requested_date__isnull=False).only(
+        "requested_date", "requested_frequency"
+    ).iterator():
+        interval = 14 if request.requested_frequency.lower() == "fortnightly" else 7
+        request.recurrence_end = request.requested_date + timedelta(days=interval * 9)
+        requests.append(request)
+    LessonRequest.objects.bulk_update(requests, ["recurrence_end"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0011_lessonrequest_end_time"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lessonrequest",
+            name="recurrence_count",
+            field=models.PositiveSmallIntegerField(
+                default=10,
+                help_text="Number of lessons in the series, starting on requested_date.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lessonrequest",
+            name="recurrence_end",
+            field=models.DateField(
+                editable=False,
+                help_text="Date of the last lesson in the series, kept in step on save for range queries.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="lessonrequest",
+            name="recurrence_exceptions",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="ISO dates of lessons in the series that will not take place.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lessonrequest",
+            name="recurrence_until",
+            field=models.DateField(
+                blank=True,
+                help_text="Optional last date of the series, if before its final counted lesson.",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_recurrence_end, migrations.RunPython.noop),
+    ]
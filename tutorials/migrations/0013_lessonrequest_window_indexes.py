@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0012_lessonrequest_recurrence"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="lessonrequest",
+            name="lesson_request_tutor_day",
+        ),
+        migrations.AddIndex(
+            model_name="lessonrequest",
+            index=models.Index(
+                fields=["tutor", "status", "recurrence_end", "requested_date"],
+                name="lesson_request_tutor_window",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lessonrequest",
+            index=models.Index(
+                fields=["student", "status", "recurrence_end", "requested_date"],
+                name="lesson_request_student_window",
+            ),
+        ),
+    ]
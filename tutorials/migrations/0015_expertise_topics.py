@@ -0,0 +1,152 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+LESSON_TOPIC_KEYWORDS = {
+    "python_programming": {"python"},
+    "web_development_with_js": {"javascript", "js", "web development"},
+    "ruby_on_rails": {"ruby", "rails", "ruby on rails"},
+    "ai_and_ml": {"ai", "ml", "machine learning", "artificial intelligence"},
+}
+
+
+def parse_expertise(apps, schema_editor):
+    """Split every user's comma-separated expertise into normalised topics."""
+    User = apps.get_model("tutorials", "User")
+    Topic = apps.get_model("tutorials", "Topic")
+    Expertise = apps.get_model("tutorials", "Expertise")
+
+    names_by_user = {}
+    for user_id, expertise in User.objects.exclude(expertise__isnull=True).exclude(expertise="").values_list(
+        "id", "expertise"
+    ).iterator():
+        names = (" ".join(tag.split()).lower()[:50] for tag in expertise.split(","))
+        names_by_user[user_id] = list(dict.fromkeys(name for name in names if name))
+
+    lesson_topics = {
+        keyword: lesson_topic for lesson_topic, keywords in LESSON_TOPIC_KEYWORDS.items() for keyword in keywords
+    }
+    all_names = {name for names in names_by_user.values() for name in names}
+    Topic.objects.bulk_create(
+        [Topic(name=name, lesson_topic=lesson_topics.get(name, "")) for name in sorted(all_names)],
+        batch_size=500,
+    )
+    topic_ids = dict(Topic.objects.values_list("name", "id"))
+    Expertise.objects.bulk_create(
+        [
+            Expertise(tutor_id=user_id, topic_id=topic_ids[name])
+            for user_id, names in names_by_user.items()
+            for name in names
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0014_tutoravailability"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Topic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="The tag in lower case with its spaces collapsed, such as 'ruby on rails'.",
+                        max_length=50,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "lesson_topic",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("python_programming", "Python Programming"),
+                            (
+                                "web_development_with_js",
+                                "Web Development with JavaScript",
+                            ),
+                            ("ruby_on_rails", "Ruby on Rails"),
+                            ("ai_and_ml", "AI and Machine Learning"),
+                        ],
+                        db_index=True,
+                        help_text="The requestable topic this tag qualifies a tutor for, if any.",
+                        max_length=50,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Expertise",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tutor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="expertise_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "topic",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="expertise_entries",
+                        to="tutorials.topic",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Expertise",
+            },
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="topics",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="The normalised tags parsed from expertise, kept in step on save.",
+                related_name="tutors",
+                through="tutorials.Expertise",
+                to="tutorials.topic",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="expertise",
+            index=models.Index(fields=["topic", "tutor"], name="expertise_topic_tutor"),
+        ),
+        migrations.AddConstraint(
+            model_name="expertise",
+            constraint=models.UniqueConstraint(
+                fields=("tutor", "topic"), name="unique_tutor_topic"
+            ),
+        ),
+        migrations.RunPython(parse_expertise, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0015_expertise_topics"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lessonrequest",
+            index=models.Index(
+                fields=["status", "requested_topic", "requested_date"],
+                name="lesson_request_facets",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0016_lesson_request_facets"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TutorBookingLock",
+            fields=[
+                (
+                    "tutor",
+                    models.OneToOneField(
+                        help_text="The tutor whose bookings this row serialises.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="booking_lock",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(
+                        default=0, help_text="How many times the lock has been taken."
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_lessons(apps, schema_editor):
+    """
+    Link existing lessons to the request of the same student, tutor, topic and start time whose
+    series spans their date, the latest such request winning. Lessons matching none stay unlinked.
+    """
+    Lesson = apps.get_model("tutorials", "Lesson")
+    LessonRequest = apps.get_model("tutorials", "LessonRequest")
+
+    candidates = {}
+    for pk, student_id, tutor_id, topic, start, first, last in LessonRequest.objects.filter(
+        tutor__isnull=False, requested_date__isnull=False, requested_time__isnull=False,
+    ).order_by("-requested_date", "-id").values_list(
+        "id", "student_id", "tutor_id", "requested_topic", "requested_time", "requested_date", "recurrence_end",
+    ).iterator():
+        candidates.setdefault((student_id, tutor_id, topic, start), []).append((pk, first, last or first))
+
+    linked = {}
+    for pk, student_id, tutor_id, topic, start, day in Lesson.objects.filter(lesson_request__isnull=True).values_list(
+        "id", "student_id", "tutor_id", "topic", "time", "date",
+    ).iterator():
+        for request_id, first, last in candidates.get((student_id, tutor_id, topic, start), []):
+            if first <= day <= last:
+                linked.setdefault(request_id, []).append(pk)
+                break
+    for request_id, lesson_ids in linked.items():
+        Lesson.objects.filter(id__in=lesson_ids).update(lesson_request=request_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tutorials", "0017_tutorbookinglock"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="lesson",
+            name="unique_tutor_schedule",
+        ),
+        migrations.RemoveConstraint(
+            model_name="lessonbooking",
+            name="unique_booking_schedule",
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="lesson_request",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The request this lesson was generated from, if any.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lessons",
+                to="tutorials.lessonrequest",
+            ),
+        ),
+        migrations.RunPython(link_lessons, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="lesson",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "Scheduled")),
+                fields=("tutor", "date", "time"),
+                name="unique_tutor_schedule",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="lessonbooking",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "Cancelled"), _negated=True),
+                fields=("tutor", "date", "time"),
+                name="unique_booking_schedule",
+            ),
+        ),
+    ]
@@ -1,11 +1,11 @@
 from django.core.validators import RegexValidator, validate_email
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from libgravatar import Gravatar
 from django.conf import settings
-from datetime import date, datetime, timedelta
-from django.utils.dateparse import parse_time
+from datetime import date, datetime, time, timedelta
+from django.utils.dateparse import parse_date, parse_time
 
 def validate_email_format(value):
     if value.startswith("@"):
@@ -49,9 +49,36 @@ class User(AbstractUser):
         blank=True
     )
 
+    topics = models.ManyToManyField(
+        'Topic',
+        through='Expertise',
+        related_name='tutors',
+        blank=True,
+        help_text="The normalised tags parsed from expertise, kept in step on save."
+    )
+
     class Meta:
         ordering = ['last_name', 'first_name']
 
+    def save(self, *args, **kwargs):
+        """Save the user, re-parsing their expertise into topics if it may have changed."""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'expertise' in update_fields:
+            if not (adding and not self.expertise):
+                self.sync_topics()
+
+    def sync_topics(self):
+        """Bring the user's Expertise rows in line with the tags in their expertise text."""
+        names = Topic.parse(self.expertise)
+        topics = Topic.objects.for_names(names)
+        current = set(self.expertise_entries.values_list('topic_id', flat=True))
+        wanted = {topic.id for topic in topics}
+        if current - wanted:
+            self.expertise_entries.filter(topic__in=current - wanted).delete()
+        Expertise.objects.bulk_create(Expertise(tutor=self, topic_id=topic_id) for topic_id in wanted - current)
+
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
 
@@ -72,7 +99,7 @@ class Invoice(models.Model):
         related_name="invoices",  
         on_delete=models.CASCADE
     )
-    invoice_num = models.CharField(max_length=8, unique=True)
+    invoice_num = models.CharField(max_length=20, unique=True)
     due_date = models.DateField()
     payment_status = models.CharField(
         max_length=20,
@@ -81,19 +108,78 @@ class Invoice(models.Model):
 
     invoice_date = models.DateField(auto_now_add=True)
     payment_date = models.DateField(null=True, blank=True)
+    amount_paid = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the bank payments reconciled against this invoice."
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this invoice was last changed, used for conditional GET."
+    )
+    total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of the amounts on this invoice's lines."
+    )
+    line_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of lines on this invoice."
+    )
+    term = models.CharField(
+        max_length=20,
+        blank=True,
+        default="",
+        help_text="The term this invoice covers, or blank for a student's running invoice."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'term'],
+                condition=~models.Q(term=''),
+                name='unique_student_term_invoice'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['payment_status', 'due_date', 'id'], name='invoice_status_due_date'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save the invoice, numbering it if needed and billing any allocated lessons it covers."""
+        from tutorials.invoicing import attach_unbilled_lines, invoice_numbers
+        creating = self._state.adding
+        if not self.invoice_num:
+            self.invoice_num = invoice_numbers.allocate()[0]
+        super().save(*args, **kwargs)
+        if creating:
+            attach_unbilled_lines(self)
 
     def __str__(self):
         return f"Invoice {self.invoice_num} for {self.student.first_name} {self.student.last_name}"
 
-from django.core.exceptions import ValidationError
-from django.db import models
-from django.conf import settings
-from datetime import datetime, date, timedelta
-from django.utils.dateparse import parse_time
+class LessonRequestQuerySet(models.QuerySet):
+    """Queries over lesson requests and the recurring series they describe."""
+
+    def touching(self, start, end):
+        """Requests with at least one lesson between `start` and `end` inclusive, by series bounds."""
+        return self.filter(requested_date__lte=end, recurrence_end__gte=start)
+
 
 class LessonRequest(models.Model):
     """Model for students to make lesson requests."""
 
+    FREQUENCY_DAYS = {"weekly": 7, "fortnightly": 14}
+    DEFAULT_RECURRENCE_COUNT = 10
+
+    STATUS_CHOICES = [
+        ('Unallocated', 'Unallocated'),
+        ('Allocated', 'Allocated'),
+        ('Cancelled', 'Cancelled'),
+    ]
+
     TOPIC_CHOICES = [
         ("python_programming", "Python Programming"),
         ("web_development_with_js", "Web Development with JavaScript"),
@@ -137,11 +223,7 @@ class LessonRequest(models.Model):
 
     status = models.CharField(
         max_length=20,
-        choices=[
-            ('Unallocated', 'Unallocated'),
-            ('Allocated', 'Allocated'),
-            ('Cancelled', 'Cancelled')
-        ],
+        choices=STATUS_CHOICES,
         default='Unallocated',
         help_text="The current status of the lesson request."
     )
@@ -187,45 +269,178 @@ class LessonRequest(models.Model):
         default="",
         help_text="Additional information or requests."
     )
+    end_time = models.TimeField(
+        null=True,
+        editable=False,
+        help_text="When the lesson finishes, kept in step with its time and duration on save."
+    )
+    recurrence_count = models.PositiveSmallIntegerField(
+        default=DEFAULT_RECURRENCE_COUNT,
+        help_text="Number of lessons in the series, starting on requested_date."
+    )
+    recurrence_until = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Optional last date of the series, if before its final counted lesson."
+    )
+    recurrence_exceptions = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="ISO dates of lessons in the series that will not take place."
+    )
+    recurrence_end = models.DateField(
+        null=True,
+        editable=False,
+        help_text="Date of the last lesson in the series, kept in step on save for range queries."
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this lesson request was last changed."
+    )
 
     class Meta:
         verbose_name = "Lesson Request"
         verbose_name_plural = "Lesson Requests"
         ordering = ['-request_date']
+        indexes = [
+            models.Index(
+                fields=['tutor', 'status', 'recurrence_end', 'requested_date'], name='lesson_request_tutor_window'
+            ),
+            models.Index(
+                fields=['student', 'status', 'recurrence_end', 'requested_date'], name='lesson_request_student_window'
+            ),
+            models.Index(fields=['status', 'requested_topic', 'requested_date'], name='lesson_request_facets'),
+        ]
+
+    objects = LessonRequestQuerySet.as_manager()
 
     def clean(self):
         """
-        Validates scheduling conflicts to ensure the tutor is not double-booked.
+        Validates scheduling conflicts to ensure the tutor is not double-booked
+        on any lesson of the request's weekly or fortnightly series.
         """
         if not self.requested_date or not self.requested_time:
             raise ValidationError("Both requested_date and requested_time are required.")
-    
-        start_time = self.requested_time
-        end_time = self.get_end_time()
-    
-        overlapping_lessons = LessonRequest.objects.filter(
-            tutor=self.tutor,  # Filter by the same tutor
-            requested_date=self.requested_date,
-            status="Allocated",
-        ).exclude(id=self.id)
-    
-        for lesson in overlapping_lessons:
-            existing_start = lesson.requested_time
-            existing_end = lesson.get_end_time()
-    
-            if start_time < existing_end and end_time > existing_start:
-                raise ValidationError(
-                    f"The tutor is already booked for {lesson.requested_date} "
-                    f"from {existing_start} to {existing_end}."
-                )
 
+        from tutorials.scheduling import series_clash
+        clash = series_clash(self)
+        if clash:
+            booked = clash[1]
+            raise ValidationError(
+                f"The tutor is already booked for {booked.start.date()} "
+                f"from {booked.start.time()} to {booked.end.time()}."
+            )
+
+    def save(self, *args, **kwargs):
+        """
+        Save the request, post any change in its billable state to the invoice ledger and
+        cancel any generated lessons it no longer holds, all in one transaction.
+        """
+        from tutorials.invoicing import post_to_ledger
+        self.end_time = self.get_end_time()
+        self.recurrence_end = self.last_occurrence()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'end_time', 'recurrence_end'}
+        holder_changed = not self._state.adding and self._holder_changed(update_fields)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            post_to_ledger(self)
+            if holder_changed:
+                from tutorials.scheduling import cancel_stale_lessons
+                cancel_stale_lessons([self.pk])
+        self._remember_holder(update_fields)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Load a request, remembering its status and tutor so save can tell if they changed."""
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if 'status' in loaded and 'tutor_id' in loaded:
+            instance._loaded_holder = (loaded['status'], loaded['tutor_id'])
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        self._remember_holder(fields)
+
+    def _remember_holder(self, fields=None):
+        """Note the status and tutor now stored, after `fields` (all, if None) were saved or loaded."""
+        if fields is None:
+            self._loaded_holder = (self.status, self.tutor_id)
+        elif hasattr(self, '_loaded_holder'):
+            status, tutor_id = self._loaded_holder
+            fields = set(fields)
+            self._loaded_holder = (
+                self.status if 'status' in fields else status,
+                self.tutor_id if {'tutor', 'tutor_id'} & fields else tutor_id,
+            )
+
+    def _holder_changed(self, update_fields=None):
+        """Return whether a save may change who holds the request's lessons: its status or tutor."""
+        if update_fields is not None and not {'status', 'tutor', 'tutor_id'} & set(update_fields):
+            return False
+        return getattr(self, '_loaded_holder', None) != (self.status, self.tutor_id)
+
+    def get_start_time(self):
+        """Return the start time of the lesson, parsing it if it was set as a string."""
+        if isinstance(self.requested_time, str):
+            return parse_time(self.requested_time)
+        return self.requested_time
 
     def get_end_time(self):
-        """Calculate the end time of the lesson."""
-        return (
-            datetime.combine(date.today(), self.requested_time)
-            + timedelta(minutes=self.requested_duration)
-        ).time()
+        """Calculate the end time of the lesson, stopping at midnight for lessons that run over."""
+        start = datetime.combine(date.today(), self.get_start_time())
+        end = start + timedelta(minutes=self.requested_duration)
+        return end.time() if end.date() == start.date() else time.max
+
+    def get_start_date(self):
+        """Return the date of the first lesson, parsing it if it was set as a string."""
+        if isinstance(self.requested_date, str):
+            return parse_date(self.requested_date)
+        return self.requested_date
+
+    @property
+    def recurrence_interval(self):
+        """Days between lessons in the series."""
+        return self.FREQUENCY_DAYS.get((self.requested_frequency or "").lower(), 7)
+
+    def last_occurrence(self):
+        """Return the date of the last lesson in the series, or None without a start date."""
+        start = self.get_start_date()
+        if not start:
+            return None
+        last = start + timedelta(days=self.recurrence_interval * (self.recurrence_count - 1))
+        if self.recurrence_until and self.recurrence_until < last:
+            lessons_until = (self.recurrence_until - start).days // self.recurrence_interval
+            last = start + timedelta(days=self.recurrence_interval * lessons_until)
+        return last
+
+    def occurrence_dates(self, start=None, end=None):
+        """
+        Yield the dates of the series' lessons between `start` and `end` inclusive, skipping exceptions.
+        Jumps straight to the first lesson in the window, so the cost is the lessons it yields.
+        """
+        first, last = self.get_start_date(), self.last_occurrence()
+        if not first or last < first:
+            return
+        interval = timedelta(days=self.recurrence_interval)
+        day = first
+        if start and start > first:
+            day = first + interval * -(-(start - first).days // interval.days)
+        if end and end < last:
+            last = end
+        skipped = set(self.recurrence_exceptions)
+        while day <= last:
+            if day.isoformat() not in skipped:
+                yield day
+            day += interval
+
+    def skip_occurrence(self, day):
+        """Record that the lesson on `day` will not take place."""
+        if day.isoformat() not in self.recurrence_exceptions:
+            self.recurrence_exceptions = [*self.recurrence_exceptions, day.isoformat()]
+            self.save(update_fields=['recurrence_exceptions', 'updated_at'])
 
     def assign_tutor(self, tutor):
         """
@@ -279,6 +494,14 @@ class Lesson(models.Model):
         related_name="tutor_lessons",
         on_delete=models.CASCADE
     )
+    lesson_request = models.ForeignKey(
+        LessonRequest,
+        related_name="lessons",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="The request this lesson was generated from, if any."
+    )
     date = models.DateField()
     time = models.TimeField()
     duration = models.PositiveIntegerField()  
@@ -291,8 +514,10 @@ class Lesson(models.Model):
 
     class Meta:
         constraints = [
+            # Cancelled lessons give their slot up.
             models.UniqueConstraint(
                 fields=['tutor', 'date', 'time'],
+                condition=models.Q(status='Scheduled'),
                 name='unique_tutor_schedule'
             )
         ]
@@ -300,6 +525,244 @@ class Lesson(models.Model):
     def __str__(self):
         return f"Lesson on {self.date} at {self.time} for {self.student.username}"
 
+class TopicQuerySet(models.QuerySet):
+    """Queries over expertise topics."""
+
+    def for_names(self, names):
+        """Return the topics with the given normalised names, creating any that are missing."""
+        if not names:
+            return []
+        existing = {topic.name: topic for topic in self.filter(name__in=names)}
+        self.bulk_create(
+            [Topic(name=name, lesson_topic=Topic.lesson_topic_for(name)) for name in names if name not in existing],
+            ignore_conflicts=True,
+        )
+        if len(existing) < len(names):
+            existing = {topic.name: topic for topic in self.filter(name__in=names)}
+        return [existing[name] for name in names]
+
+    def tutor_counts(self):
+        """Return the number of tutors qualified for each requestable topic, from one grouped query."""
+        counts = dict.fromkeys(Topic.LESSON_TOPIC_KEYWORDS, 0)
+        counts.update(
+            self.filter(lesson_topic__gt='', tutors__role='tutor').order_by()
+            .values_list('lesson_topic').annotate(count=models.Count('tutors', distinct=True))
+        )
+        return counts
+
+
+class Topic(models.Model):
+    """A normalised expertise tag, linked to the lesson topic it qualifies a tutor to teach."""
+
+    LESSON_TOPIC_KEYWORDS = {
+        'python_programming': {'python'},
+        'web_development_with_js': {'javascript', 'js', 'web development'},
+        'ruby_on_rails': {'ruby', 'rails', 'ruby on rails'},
+        'ai_and_ml': {'ai', 'ml', 'machine learning', 'artificial intelligence'},
+    }
+
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="The tag in lower case with its spaces collapsed, such as 'ruby on rails'."
+    )
+    lesson_topic = models.CharField(
+        max_length=50,
+        choices=LessonRequest.TOPIC_CHOICES,
+        blank=True,
+        db_index=True,
+        help_text="The requestable topic this tag qualifies a tutor for, if any."
+    )
+
+    objects = TopicQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['name']
+
+    @staticmethod
+    def normalise(name):
+        return ' '.join(name.split()).lower()[:50]
+
+    @classmethod
+    def parse(cls, expertise):
+        """Return the distinct normalised tags in a comma-separated expertise string, in order."""
+        return list(dict.fromkeys(
+            name for name in (cls.normalise(tag) for tag in (expertise or '').split(',')) if name
+        ))
+
+    @classmethod
+    def lesson_topic_for(cls, name):
+        """Return the requestable topic a normalised tag qualifies a tutor for, or ''."""
+        for lesson_topic, keywords in cls.LESSON_TOPIC_KEYWORDS.items():
+            if name in keywords:
+                return lesson_topic
+        return ''
+
+    def __str__(self):
+        return self.name
+
+
+class Expertise(models.Model):
+    """A topic a tutor teaches, indexed topic-first to find a topic's tutors."""
+
+    tutor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="expertise_entries",
+        on_delete=models.CASCADE
+    )
+    topic = models.ForeignKey(
+        Topic,
+        related_name="expertise_entries",
+        on_delete=models.CASCADE
+    )
+
+    class Meta:
+        verbose_name_plural = "Expertise"
+        constraints = [
+            models.UniqueConstraint(fields=['tutor', 'topic'], name='unique_tutor_topic'),
+        ]
+        indexes = [
+            models.Index(fields=['topic', 'tutor'], name='expertise_topic_tutor'),
+        ]
+
+    def __str__(self):
+        return f"{self.tutor.username} teaches {self.topic.name}"
+
+
+class TutorAvailability(models.Model):
+    """
+    A tutor's weekly availability, one bit per SLOT_MINUTES slot from Monday 00:00.
+    Bit `weekday * SLOTS_PER_DAY + slot` is set if the tutor can teach in that slot,
+    so a whole week fits in 84 bytes and checking a lesson is a mask and a compare.
+    """
+
+    SLOT_MINUTES = 15
+    SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+    WEEK_BYTES = 7 * SLOTS_PER_DAY // 8
+
+    tutor = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        related_name="availability",
+        on_delete=models.CASCADE,
+        help_text="The tutor this availability belongs to."
+    )
+    weekly_slots = models.BinaryField(
+        default=bytes(WEEK_BYTES),
+        help_text="The week's slots as a little-endian bitmask."
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When this availability was last changed."
+    )
+
+    class Meta:
+        verbose_name_plural = "Tutor Availability"
+
+    @property
+    def slots(self):
+        """The week's slots as an integer bitmask."""
+        return int.from_bytes(bytes(self.weekly_slots), 'little')
+
+    @slots.setter
+    def slots(self, mask):
+        self.weekly_slots = mask.to_bytes(self.WEEK_BYTES, 'little')
+
+    def __str__(self):
+        return f"Availability of {self.tutor.username}"
+
+class InvoiceNumberSequence(models.Model):
+    """Counter table from which invoice numbers are reserved in blocks."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(
+        help_text="The first number not yet reserved by any process."
+    )
+
+    def __str__(self):
+        return f"{self.name} sequence at {self.next_value}"
+
+class TutorBookingLock(models.Model):
+    """
+    Lock row per tutor, updated first in every transaction that books them, so bookings
+    of the same tutor are checked and saved one at a time while other tutors' proceed.
+    """
+
+    tutor = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name="booking_lock",
+        on_delete=models.CASCADE,
+        help_text="The tutor whose bookings this row serialises."
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        help_text="How many times the lock has been taken."
+    )
+
+    def __str__(self):
+        return f"Booking lock of {self.tutor_id} at {self.version}"
+
+class InvoiceLine(models.Model):
+    """Model for a priced, allocated lesson request billed on an invoice."""
+
+    invoice = models.ForeignKey(
+        Invoice,
+        related_name="lines",
+        on_delete=models.CASCADE
+    )
+    lesson_request = models.OneToOneField(
+        LessonRequest,
+        related_name="invoice_line",
+        on_delete=models.CASCADE
+    )
+    tutor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="invoice_lines",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    date = models.DateField(null=True, blank=True)
+    duration = models.PositiveIntegerField()
+    hourly_rate = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        help_text="Hourly rate when the line was posted, so later rate changes do not re-price it."
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['invoice', 'date'], name='invoice_line_invoice_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.duration} min on {self.date} for {self.invoice.invoice_num}"
+
+class InvoicePayment(models.Model):
+    """Model for a bank statement payment reconciled against an invoice."""
+
+    invoice = models.ForeignKey(
+        Invoice,
+        related_name="payments",
+        on_delete=models.CASCADE
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['invoice', 'date', 'amount'],
+                name='unique_invoice_payment'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.amount} on {self.date} for {self.invoice.invoice_num}"
+
 class ContactMessage(models.Model):
     ROLES = [
         ('student', 'Student'),
@@ -358,6 +821,7 @@ class LessonBooking(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=['tutor', 'date', 'time'],
+                condition=~models.Q(status='Cancelled'),
                 name='unique_booking_schedule'
             )
         ]
@@ -0,0 +1,153 @@
+"""Reconcile bank statement payments against invoices."""
+import csv
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils.timezone import now
+from tutorials.invoicing import payment_status_for
+from tutorials.models import Invoice, InvoicePayment
+
+RECONCILE_BATCH_SIZE = 1000
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y')
+
+Payment = namedtuple('Payment', ['line', 'reference', 'amount', 'date'])
+Issue = namedtuple('Issue', ['line', 'reference', 'amount', 'reason'])
+
+
+class ReconciliationReport:
+    """Counts of reconciled payments and the statement rows that could not be applied."""
+
+    # Statements carry no transaction id, so a payment is only identified by these.
+    DUPLICATE_NOTE = (
+        "Payments of the same amount to the same invoice on the same day are treated as one, "
+        "so a second same-day instalment of that amount is reported as a duplicate."
+    )
+
+    def __init__(self):
+        self.rows = 0
+        self.matched = 0
+        self.settled = 0
+        self.issues = []
+
+    def flag(self, line, reference, amount, reason):
+        self.issues.append(Issue(line, reference, amount, reason))
+
+    def by_reason(self, reason):
+        return [issue for issue in self.issues if issue.reason == reason]
+
+    @property
+    def unmatched(self):
+        return self.by_reason('unmatched')
+
+    @property
+    def duplicates(self):
+        return self.by_reason('duplicate')
+
+    @property
+    def invalid(self):
+        return self.by_reason('invalid')
+
+
+def parse_date(value):
+    """Parse a statement date in ISO or UK day-first format."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised date: {value}")
+
+
+def read_payments(rows, report):
+    """
+    Yield a Payment for each valid statement row, flagging the rest as invalid.
+    Statements need `reference`, `amount` and `date` columns, in any case. Only finite,
+    positive amounts are payments, so debits and refunds are flagged rather than applied.
+    """
+    reader = csv.DictReader(rows)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    for line, row in enumerate(reader, start=2):
+        report.rows += 1
+        reference = (row.get('reference') or '').strip().upper()
+        amount = (row.get('amount') or '').strip()
+        try:
+            payment = Payment(line, reference, Decimal(amount.lstrip('£')), parse_date(row.get('date') or ''))
+        except (InvalidOperation, ValueError):
+            payment = None
+        if payment is None or not payment.amount.is_finite() or payment.amount <= 0:
+            report.flag(line, reference, amount, 'invalid')
+        else:
+            yield payment
+
+
+def grouped(values):
+    """Invert a mapping of keys to values into one of each value to its keys."""
+    groups = {}
+    for key, value in values.items():
+        groups.setdefault(value, []).append(key)
+    return groups
+
+
+def apply_payments(payments, report):
+    """
+    Apply one batch of payments, matching them to invoices with a single lookup.
+    A payment is a duplicate if the same amount on the same day was already applied to its
+    invoice, earlier in the statement or by an earlier import, or if its invoice is settled.
+    Writes are one UPDATE per distinct amount and payment date rather than per invoice,
+    as a statement repeats the same few lesson prices and days on most of its rows.
+    """
+    invoices = Invoice.objects.in_bulk({payment.reference for payment in payments}, field_name='invoice_num')
+    applied = set(InvoicePayment.objects.filter(
+        invoice__in=[invoice.id for invoice in invoices.values()],
+        date__in={payment.date for payment in payments},
+    ).values_list('invoice_id', 'amount', 'date'))
+    received = {}
+    paid_on = {}
+    recorded = []
+    for payment in payments:
+        invoice = invoices.get(payment.reference)
+        if invoice is None:
+            report.flag(payment.line, payment.reference, payment.amount, 'unmatched')
+            continue
+        identity = (invoice.id, payment.amount, payment.date)
+        if identity in applied or (invoice.amount_paid and invoice.amount_paid >= invoice.total):
+            report.flag(payment.line, payment.reference, payment.amount, 'duplicate')
+            continue
+
+        applied.add(identity)
+        recorded.append(InvoicePayment(invoice=invoice, amount=payment.amount, date=payment.date))
+        invoice.amount_paid += payment.amount
+        received[invoice.id] = received.get(invoice.id, 0) + payment.amount
+        paid_on[invoice.id] = max(paid_on.get(invoice.id, payment.date), payment.date)
+        report.matched += 1
+        report.settled += payment_status_for(invoice.total, invoice.amount_paid) == 'Paid'
+
+    InvoicePayment.objects.bulk_create(recorded)
+    for amount, ids in grouped(received).items():
+        Invoice.objects.filter(id__in=ids).update(amount_paid=F('amount_paid') + amount)
+    for day, ids in grouped(paid_on).items():
+        Invoice.objects.filter(id__in=ids).update(payment_date=day)
+    # Compare in SQL so a line posted to the invoice meanwhile is still owed for.
+    Invoice.objects.filter(id__in=received).update(
+        payment_status=Case(When(total__lte=F('amount_paid'), then=Value('Paid')), default=Value('Unpaid')),
+        updated_at=now(),
+    )
+
+
+@transaction.atomic
+def reconcile_payments(rows, batch_size=RECONCILE_BATCH_SIZE):
+    """
+    Mark invoices paid from a bank statement and return a ReconciliationReport.
+    Rows are streamed and applied a batch at a time, so only one batch is held in memory.
+    Payments accumulate, so an invoice can be settled in instalments; each applied payment
+    is recorded, so repeated rows and re-imported statements are reported as duplicates.
+    - rows: An iterable of CSV lines, such as an open text file.
+    """
+    report = ReconciliationReport()
+    payments = read_payments(rows, report)
+    while batch := list(islice(payments, batch_size)):
+        apply_payments(batch, report)
+    return report
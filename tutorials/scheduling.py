@@ -0,0 +1,136 @@
+"""Conflict checking for recurring lesson series."""
+from collections import namedtuple
+from datetime import datetime
+from operator import attrgetter
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from tutorials.models import Lesson, LessonBooking, LessonRequest
+
+Occurrence = namedtuple('Occurrence', ['start', 'end', 'lesson_request'])
+
+
+def occurrences(lesson_request, start=None, end=None):
+    """Return a request's lessons between `start` and `end` as Occurrences sorted by start."""
+    start_time = lesson_request.get_start_time()
+    end_time = lesson_request.get_end_time()
+    return [
+        Occurrence(datetime.combine(day, start_time), datetime.combine(day, end_time), lesson_request)
+        for day in lesson_request.occurrence_dates(start, end)
+    ]
+
+
+def first_overlap(intervals, others):
+    """
+    Return the first overlapping pair from two lists of intervals sorted by start, or None.
+    Walks both lists once, always advancing whichever interval finishes first.
+    """
+    i = j = 0
+    while i < len(intervals) and j < len(others):
+        interval, other = intervals[i], others[j]
+        if interval.start < other.end and other.start < interval.end:
+            return interval, other
+        if interval.end <= other.end:
+            i += 1
+        else:
+            j += 1
+    return None
+
+
+def series_clash(lesson_request):
+    """
+    Return the first (occurrence, booked occurrence) pair where any lesson of a request's
+    series overlaps one of its tutor's allocated series, or None if the tutor is free.
+    Every series the tutor has that spans the request's dates at an overlapping time of day
+    is fetched in one query, and only expanded over those dates.
+    """
+    if lesson_request.tutor_id is None or not lesson_request.requested_date:
+        return None
+
+    wanted = occurrences(lesson_request)
+    if not wanted:
+        return None
+    first, last = wanted[0].start.date(), wanted[-1].start.date()
+    booked = LessonRequest.objects.touching(first, last).filter(
+        tutor=lesson_request.tutor_id,
+        status='Allocated',
+        requested_time__lt=lesson_request.get_end_time(),
+        end_time__gt=lesson_request.get_start_time(),
+    ).exclude(id=lesson_request.id).only(
+        'requested_date', 'requested_time', 'requested_duration', 'requested_frequency', 'end_time',
+        'recurrence_count', 'recurrence_until', 'recurrence_exceptions',
+    )
+
+    others = sorted(
+        (occurrence for request in booked for occurrence in occurrences(request, first, last)),
+        key=attrgetter('start'),
+    )
+    return first_overlap(wanted, others)
+
+
+def plan_lessons(lesson_requests, start=None, end=None):
+    """Return unsaved Lessons for each occurrence between `start` and `end` of requests with a tutor."""
+    return [
+        Lesson(
+            lesson_request=request,
+            tutor_id=request.tutor_id,
+            student_id=request.student_id,
+            date=day,
+            time=request.get_start_time(),
+            duration=request.requested_duration,
+            topic=request.requested_topic,
+        )
+        for request in lesson_requests
+        if request.tutor_id and request.requested_date
+        for day in request.occurrence_dates(start, end)
+    ]
+
+
+@transaction.atomic
+def generate_lessons(lesson_requests, start=None, end=None):
+    """
+    Create Lesson rows for the occurrences of each request's series, all or none.
+    Series are expanded lazily wherever they are read, so this is only needed where an
+    occurrence must exist as a row of its own; `start` and `end` limit it to a window.
+    Every occurrence is planned and checked against unique_tutor_schedule in memory, using one
+    query for the slots already taken, then the lot is inserted with a single bulk_create.
+    Raises ValidationError naming the clashing slots, without inserting anything, on a clash.
+    - lesson_requests: Allocated lesson requests, as many as needed in one call.
+    """
+    lessons = plan_lessons(lesson_requests, start, end)
+    if not lessons:
+        return []
+
+    taken = set(Lesson.objects.filter(
+        status='Scheduled',
+        tutor__in={lesson.tutor_id for lesson in lessons},
+        date__range=[min(lesson.date for lesson in lessons), max(lesson.date for lesson in lessons)],
+    ).values_list('tutor_id', 'date', 'time'))
+
+    clashes = []
+    for lesson in lessons:
+        slot = (lesson.tutor_id, lesson.date, lesson.time)
+        if slot in taken:
+            clashes.append(f"{lesson.date} at {lesson.time}")
+        taken.add(slot)
+    if clashes:
+        raise ValidationError(f"The tutor already has a lesson on {', '.join(clashes[:5])}.")
+
+    return Lesson.objects.bulk_create(lessons, batch_size=1000)
+
+
+def cancel_stale_lessons(lesson_requests):
+    """
+    Cancel the generated lessons and bookings that requests no longer hold, with one UPDATE per
+    table: all of those of a request that is not allocated, and those of an allocated request
+    taught by anyone but its tutor. Cancelled lessons give their tutor's slot up.
+    Returns the number of lessons cancelled.
+    - lesson_requests: Lesson requests or their ids.
+    """
+    stale = ~Q(lesson_request__status='Allocated') | ~Q(tutor=F('lesson_request__tutor'))
+    LessonBooking.objects.filter(lesson_request__in=lesson_requests, status='Booked').filter(stale).update(
+        status='Cancelled'
+    )
+    return Lesson.objects.filter(lesson_request__in=lesson_requests, status='Scheduled').filter(stale).update(
+        status='Cancelled'
+    )
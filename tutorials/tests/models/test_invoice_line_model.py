@@ -0,0 +1,141 @@
+"""Unit tests for the InvoiceLine ledger."""
+from decimal import Decimal
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from tutorials.models import User, Invoice, InvoiceLine, LessonRequest
+
+
+@override_settings(HOURLY_RATE=10.00)
+class InvoiceLineModelTestCase(TestCase):
+    """Unit tests for lines posted as lesson requests change status."""
+
+    def setUp(self):
+        self.student = User.objects.create_user(
+            username='@student',
+            email='student@example.com',
+            first_name='Stu',
+            last_name='Dent',
+            role='student'
+        )
+        self.tutor = User.objects.create_user(
+            username='@tutor',
+            email='tutor@example.com',
+            first_name='Tu',
+            last_name='Tor',
+            role='tutor'
+        )
+        self.invoice = Invoice.objects.create(
+            student=self.student,
+            invoice_num='INV00001',
+            due_date='2025-01-31',
+            payment_status='Unpaid'
+        )
+        self.lesson_request = LessonRequest.objects.create(
+            student=self.student,
+            requested_date='2024-10-01',
+            requested_time='10:00:00',
+            requested_duration=90,
+        )
+
+    def _assert_invoice_totals(self, total, line_count):
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.total, Decimal(total))
+        self.assertEqual(self.invoice.line_count, line_count)
+
+    def test_unallocated_request_is_not_billed(self):
+        self.assertFalse(InvoiceLine.objects.exists())
+        self._assert_invoice_totals('0', 0)
+
+    def test_allocating_request_posts_line(self):
+        self.lesson_request.assign_tutor(self.tutor)
+        line = InvoiceLine.objects.get(lesson_request=self.lesson_request)
+        self.assertEqual(line.invoice, self.invoice)
+        self.assertEqual(line.amount, Decimal('15.00'))
+        self._assert_invoice_totals('15.00', 1)
+
+    def test_cancelling_request_removes_line(self):
+        self.lesson_request.assign_tutor(self.tutor)
+        self.lesson_request.status = 'Cancelled'
+        self.lesson_request.save()
+        self.assertFalse(InvoiceLine.objects.exists())
+        self._assert_invoice_totals('0', 0)
+
+    def test_saving_unchanged_request_does_not_touch_invoice(self):
+        self.lesson_request.assign_tutor(self.tutor)
+        self.invoice.refresh_from_db()
+        updated_at = self.invoice.updated_at
+        self.lesson_request.additional_notes = 'Bring a laptop'
+        self.lesson_request.save()
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.updated_at, updated_at)
+
+    def test_rate_change_does_not_reprice_posted_line(self):
+        self.lesson_request.assign_tutor(self.tutor)
+        with self.settings(HOURLY_RATE=50.00):
+            self.lesson_request.requested_duration = 60
+            self.lesson_request.save()
+        line = InvoiceLine.objects.get(lesson_request=self.lesson_request)
+        self.assertEqual(line.amount, Decimal('10.00'))
+        self._assert_invoice_totals('10.00', 1)
+
+    def test_new_invoice_bills_existing_allocated_requests(self):
+        other_student = User.objects.create_user(
+            username='@other',
+            email='other@example.com',
+            first_name='Oth',
+            last_name='Er',
+            role='student'
+        )
+        LessonRequest.objects.create(
+            student=other_student,
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date='2024-10-02',
+            requested_duration=120,
+        )
+        invoice = Invoice.objects.create(
+            student=other_student,
+            invoice_num='INV00002',
+            due_date='2025-01-31',
+            payment_status='Unpaid'
+        )
+        self.assertEqual(invoice.total, Decimal('20.00'))
+        self.assertEqual(invoice.line_count, 1)
+
+    def test_rescheduling_into_another_term_moves_line(self):
+        autumn = Invoice.objects.create(
+            student=self.student, invoice_num='INV00003', due_date='2024-12-31',
+            payment_status='Unpaid', term='autumn'
+        )
+        spring = Invoice.objects.create(
+            student=self.student, invoice_num='INV00004', due_date='2025-05-31',
+            payment_status='Unpaid', term='spring'
+        )
+        self.lesson_request.requested_duration = 60
+        self.lesson_request.assign_tutor(self.tutor)
+        self.lesson_request.requested_date = '2025-02-03'
+        self.lesson_request.save()
+        line = InvoiceLine.objects.get(lesson_request=self.lesson_request)
+        self.assertEqual(line.invoice, spring)
+        autumn.refresh_from_db()
+        spring.refresh_from_db()
+        self.assertEqual((autumn.total, autumn.line_count), (Decimal('0'), 0))
+        self.assertEqual((spring.total, spring.line_count), (Decimal('10.00'), 1))
+
+    def test_paid_invoice_gaining_a_line_becomes_unpaid(self):
+        Invoice.objects.filter(id=self.invoice.id).update(payment_status='Paid')
+        self.lesson_request.assign_tutor(self.tutor)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.payment_status, 'Unpaid')
+        self.lesson_request.status = 'Cancelled'
+        self.lesson_request.save()
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.payment_status, 'Paid')
+
+    def test_failed_posting_rolls_back_the_save(self):
+        with patch('tutorials.invoicing.new_line', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.lesson_request.assign_tutor(self.tutor)
+        self.lesson_request.refresh_from_db()
+        self.assertEqual(self.lesson_request.status, 'Unallocated')
+        self.assertFalse(InvoiceLine.objects.exists())
@@ -0,0 +1,151 @@
+"""Unit tests for the LessonRequest model's scheduling checks."""
+from datetime import date, time, timedelta
+from random import Random
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from tutorials.models import User, LessonRequest
+from tutorials.scheduling import series_clash
+
+
+class LessonRequestModelTestCase(TestCase):
+    """Unit tests for stored end times and tutor double-booking across series."""
+
+    def setUp(self):
+        self.student = User.objects.create_user(
+            username='@student',
+            email='student@example.com',
+            role='student'
+        )
+        self.tutor = User.objects.create_user(
+            username='@tutor',
+            email='tutor@example.com',
+            role='tutor'
+        )
+        self.booked = LessonRequest.objects.create(
+            student=self.student,
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date='2024-12-20',
+            requested_time='10:00:00',
+            requested_duration=90,
+        )
+
+    def _request(self, requested_time, requested_duration=60):
+        return LessonRequest(
+            student=self.student,
+            tutor=self.tutor,
+            requested_date='2024-12-20',
+            requested_time=requested_time,
+            requested_duration=requested_duration,
+        )
+
+    def test_end_time_is_stored(self):
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.end_time, time(11, 30))
+
+    def test_end_time_follows_duration_changes(self):
+        self.booked.requested_duration = 30
+        self.booked.save(update_fields=['requested_duration'])
+        self.booked.refresh_from_db()
+        self.assertEqual(self.booked.end_time, time(10, 30))
+
+    def test_end_time_stops_at_midnight(self):
+        late = self._request('23:30:00', 120)
+        late.save()
+        self.assertEqual(late.end_time, time.max)
+
+    def test_overlapping_request_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            self._request('11:00:00').clean()
+
+    def test_adjacent_request_is_accepted(self):
+        self._request('11:30:00').clean()
+        self._request('09:00:00').clean()
+
+    def test_request_does_not_clash_with_itself(self):
+        self.booked.clean()
+
+    def test_clash_with_a_later_lesson_of_the_series_is_rejected(self):
+        clashing = self._request('10:30:00')
+        clashing.requested_date = '2025-01-17'
+        with self.assertRaises(ValidationError):
+            clashing.clean()
+
+    def test_clash_with_an_earlier_series_is_rejected(self):
+        clashing = self._request('10:30:00')
+        clashing.requested_date = '2024-12-06'
+        clashing.requested_frequency = 'fortnightly'
+        with self.assertRaises(ValidationError):
+            clashing.clean()
+
+    def test_series_on_other_weeks_is_accepted(self):
+        alternate = self._request('10:30:00')
+        alternate.requested_date = '2024-12-27'
+        alternate.requested_frequency = 'fortnightly'
+        self.booked.requested_frequency = 'fortnightly'
+        self.booked.save()
+        alternate.clean()
+
+    def test_series_check_is_one_query(self):
+        clashing = self._request('10:30:00')
+        clashing.requested_date = '2025-01-17'
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(series_clash(clashing))
+
+    def test_series_check_agrees_with_every_occurrence(self):
+        rng = Random(0)
+
+        def random_request():
+            return LessonRequest(
+                student=self.student,
+                tutor=self.tutor,
+                requested_date=date(2025, 1, 6) + timedelta(days=rng.randrange(90)),
+                requested_time=time(rng.randrange(8, 20), rng.choice([0, 30])),
+                requested_duration=rng.choice([30, 60, 90, 120]),
+                requested_frequency=rng.choice(list(LessonRequest.FREQUENCY_DAYS)),
+            )
+
+        schedule = []
+        for _ in range(40):
+            request = random_request()
+            request.status = 'Allocated'
+            request.end_time = request.get_end_time()
+            request.recurrence_end = request.last_occurrence()
+            schedule.append(request)
+        LessonRequest.objects.bulk_create(schedule)
+        schedule.append(self.booked)
+
+        clashes = 0
+        for candidate in (random_request() for _ in range(20)):
+            days = set(candidate.occurrence_dates())
+            expected = any(
+                candidate.get_start_time() < other.end_time
+                and other.get_start_time() < candidate.get_end_time()
+                and days & set(other.occurrence_dates())
+                for other in schedule
+            )
+            with self.assertNumQueries(1):
+                self.assertEqual(series_clash(candidate) is not None, expected)
+            clashes += expected
+        self.assertGreater(clashes, 0)
+        self.assertLess(clashes, 20)
+
+    def test_series_is_expanded_only_over_the_requested_window(self):
+        self.assertEqual(
+            [str(day) for day in self.booked.occurrence_dates(date(2025, 1, 1), date(2025, 1, 20))],
+            ['2025-01-03', '2025-01-10', '2025-01-17'],
+        )
+        self.assertEqual(len(list(self.booked.occurrence_dates())), 10)
+        self.assertEqual(self.booked.recurrence_end, date(2025, 2, 21))
+
+    def test_series_stops_at_until_and_skips_exceptions(self):
+        self.booked.recurrence_until = date(2025, 1, 5)
+        self.booked.save()
+        self.booked.skip_occurrence(date(2024, 12, 27))
+        self.booked.refresh_from_db()
+        self.assertEqual([str(day) for day in self.booked.occurrence_dates()], ['2024-12-20', '2025-01-03'])
+        self.assertEqual(self.booked.recurrence_end, date(2025, 1, 3))
+
+    def test_touching_finds_series_by_their_bounds(self):
+        self.assertTrue(LessonRequest.objects.touching(date(2025, 2, 1), date(2025, 2, 28)).exists())
+        self.assertFalse(LessonRequest.objects.touching(date(2025, 3, 1), date(2025, 3, 31)).exists())
@@ -0,0 +1,45 @@
+"""Unit tests for the Topic and Expertise models."""
+from django.test import TestCase
+from tutorials.models import Expertise, Topic, User
+
+class TopicModelTestCase(TestCase):
+    """Unit tests for expertise topics."""
+
+    def setUp(self):
+        self.tutor = User.objects.create_user(
+            username='@tutor', email='tutor@example.com', role='tutor', expertise='Python,  Ruby on  Rails, python'
+        )
+
+    def test_parse_normalises_tags(self):
+        self.assertEqual(Topic.parse(' Python, JavaScript ,,java script'), ['python', 'javascript', 'java script'])
+        self.assertEqual(Topic.parse(None), [])
+
+    def test_saving_expertise_creates_topics(self):
+        topics = {topic.name: topic.lesson_topic for topic in self.tutor.topics.all()}
+        self.assertEqual(topics, {'python': 'python_programming', 'ruby on rails': 'ruby_on_rails'})
+
+    def test_changing_expertise_replaces_topics(self):
+        self.tutor.expertise = 'Ruby on Rails, Haskell'
+        self.tutor.save()
+        self.assertEqual(sorted(self.tutor.topics.values_list('name', flat=True)), ['haskell', 'ruby on rails'])
+        self.assertEqual(Topic.objects.get(name='haskell').lesson_topic, '')
+        self.assertEqual(Topic.objects.count(), 3)
+
+    def test_saving_other_fields_leaves_topics_alone(self):
+        with self.assertNumQueries(1):
+            self.tutor.save(update_fields=['last_login'])
+
+    def test_tutor_counts(self):
+        other = User.objects.create_user(username='@other', email='other@example.com', role='tutor', expertise='JS, python')
+        User.objects.create_user(username='@student', email='student@example.com', role='student', expertise='Python')
+        self.assertEqual(Topic.objects.tutor_counts(), {
+            'python_programming': 2,
+            'web_development_with_js': 1,
+            'ruby_on_rails': 1,
+            'ai_and_ml': 0,
+        })
+        self.assertEqual(
+            set(User.objects.filter(topics__lesson_topic='web_development_with_js')),
+            {other},
+        )
+        self.assertEqual(Expertise.objects.filter(tutor=other).count(), 2)
@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, time
+from decimal import Decimal
+from threading import Event
+from unittest.mock import patch
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from tutorials import allocation
+from tutorials.models import Invoice, InvoiceLine, LessonRequest, TutorBookingLock, User
+
+class AllocationTests(TestCase):
+    """Test suite for the race-safe booking service."""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='@student', email='student@example.com', role='student')
+        self.tutor = User.objects.create_user(username='@tutor', email='tutor@example.com', role='tutor')
+
+    def request(self, hour=10, **kwargs):
+        return LessonRequest.objects.create(
+            student=self.student,
+            requested_date=date(2025, 1, 6),
+            requested_time=time(hour),
+            requested_duration=60,
+            **kwargs,
+        )
+
+    def test_allocate_books_the_tutor_and_takes_the_lock(self):
+        lesson_request = self.request()
+        allocation.allocate(lesson_request, self.tutor)
+        lesson_request.refresh_from_db()
+        self.assertEqual((lesson_request.tutor, lesson_request.status), (self.tutor, 'Allocated'))
+        self.assertEqual(TutorBookingLock.objects.get(tutor=self.tutor).version, 1)
+
+    def test_clash_is_rejected_and_leaves_the_request_unchanged(self):
+        self.request(tutor=self.tutor, status='Allocated')
+        lesson_request = self.request()
+        with self.assertRaises(ValidationError):
+            allocation.allocate(lesson_request, self.tutor)
+        self.assertEqual((lesson_request.tutor_id, lesson_request.status), (None, 'Unallocated'))
+        lesson_request.refresh_from_db()
+        self.assertEqual((lesson_request.tutor_id, lesson_request.status), (None, 'Unallocated'))
+
+    def test_contention_is_retried(self):
+        lesson_request = self.request()
+        with patch('tutorials.allocation.sleep') as sleep, patch(
+            'tutorials.allocation.lock_tutors',
+            side_effect=[OperationalError('database is locked'), None],
+        ):
+            allocation.allocate(lesson_request, self.tutor)
+        self.assertEqual(sleep.call_count, 1)
+        lesson_request.refresh_from_db()
+        self.assertEqual(lesson_request.status, 'Allocated')
+
+    def test_lock_tutors_creates_missing_rows(self):
+        other = User.objects.create_user(username='@other', email='other@example.com', role='tutor')
+        allocation.lock_tutors([self.tutor.id])
+        allocation.lock_tutors([self.tutor.id, other.id])
+        self.assertEqual(
+            dict(TutorBookingLock.objects.values_list('tutor', 'version')),
+            {self.tutor.id: 3, other.id: 1},
+        )
+
+
+
+@override_settings(HOURLY_RATE=10.00)
+class BatchAllocationTests(TestCase):
+    """Test suite for assigning, unassigning and cancelling lesson requests in batches."""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='@student', email='student@example.com', role='student')
+        self.tutor = User.objects.create_user(username='@tutor', email='tutor@example.com', role='tutor')
+        self.other = User.objects.create_user(username='@other', email='other@example.com', role='tutor')
+        self.invoice = Invoice.objects.create(
+            student=self.student, invoice_num='INV00001', due_date='2025-01-31', payment_status='Unpaid'
+        )
+
+    def request(self, hour=10, **kwargs):
+        return LessonRequest.objects.create(
+            student=self.student,
+            requested_date=date(2025, 1, 6),
+            requested_time=time(hour),
+            requested_duration=60,
+            **kwargs,
+        )
+
+    def test_assign_requests_allocates_and_bills_the_batch(self):
+        Invoice.objects.filter(id=self.invoice.id).update(payment_status='Paid')
+        first, second = self.request(10), self.request(12)
+        changed = allocation.assign_requests({first.id: self.tutor.id, second.id: self.tutor.id})
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            set(LessonRequest.objects.values_list('tutor', 'status')), {(self.tutor.id, 'Allocated')}
+        )
+        self.invoice.refresh_from_db()
+        self.assertEqual((self.invoice.line_count, self.invoice.total), (2, Decimal('20.00')))
+        self.assertEqual(self.invoice.payment_status, 'Unpaid')
+
+    def test_batch_queries_follow_tutors_not_requests(self):
+        allocation.lock_tutors([self.tutor.id])
+
+        def queries(hours):
+            lesson_requests = [self.request(hour) for hour in hours]
+            with CaptureQueriesContext(connection) as captured:
+                allocation.assign_requests({r.id: self.tutor.id for r in lesson_requests})
+            with CaptureQueriesContext(connection) as released:
+                allocation.release_requests([r.id for r in lesson_requests], 'Cancelled')
+            return len(captured), len(released)
+
+        self.assertEqual(queries([9, 11]), queries(range(8, 20)))
+
+    def test_clashes_within_the_batch_or_with_bookings_change_nothing(self):
+        self.request(10, tutor=self.tutor, status='Allocated')
+        booked_clash, batch_first, batch_clash = self.request(10), self.request(14), self.request(14)
+
+        with self.assertRaises(ValidationError) as raised:
+            allocation.assign_requests({
+                booked_clash.id: self.tutor.id, batch_first.id: self.other.id, batch_clash.id: self.other.id,
+            })
+
+        self.assertEqual(len(raised.exception.messages), 2)
+        self.assertEqual(LessonRequest.objects.filter(status='Allocated').count(), 1)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.line_count, 1)
+
+    def test_reassigning_moves_the_line_to_the_new_tutor(self):
+        lesson_request = self.request(10, tutor=self.tutor, status='Allocated')
+        allocation.assign_requests({lesson_request.id: self.other.id})
+
+        line = InvoiceLine.objects.get(lesson_request=lesson_request)
+        self.assertEqual(line.tutor, self.other)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.line_count, 1)
+
+    def test_cancelled_requests_cannot_be_assigned(self):
+        lesson_request = self.request(status='Cancelled')
+        with self.assertRaises(ValidationError):
+            allocation.assign_requests({lesson_request.id: self.tutor.id})
+
+    def test_release_requests_unassigns_and_removes_lines(self):
+        allocated = [self.request(hour, tutor=self.tutor, status='Allocated') for hour in (9, 11, 13)]
+        unallocated = self.request(15)
+
+        changed = allocation.release_requests([r.id for r in allocated] + [unallocated.id])
+
+        self.assertEqual(changed, 3)
+        self.assertFalse(LessonRequest.objects.filter(status='Allocated').exists())
+        self.invoice.refresh_from_db()
+        self.assertEqual((self.invoice.line_count, self.invoice.total), (0, Decimal('0.00')))
+        self.assertEqual(self.invoice.payment_status, 'Paid')
+
+    def test_release_requests_cancels(self):
+        allocated, unallocated = self.request(9, tutor=self.tutor, status='Allocated'), self.request(11)
+        with self.assertNumQueries(11):
+            changed = allocation.release_requests([allocated.id, unallocated.id], 'Cancelled')
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            set(LessonRequest.objects.values_list('tutor', 'status')), {(None, 'Cancelled')}
+        )
+        self.assertFalse(InvoiceLine.objects.exists())
+
+class AllocationStressTests(TransactionTestCase):
+    """
+    Book the same tutors from many threads at once, each with its own connection.
+    SQLite serialises every write, so only the test showing the double booking the lock rows
+    prevent is limited to databases with row locks.
+    """
+
+    THREADS = 16
+    TUTORS = 5
+    HOURS = 4
+    SUBMISSIONS = 200
+
+    def setUp(self):
+        student = User.objects.create_user(username='@student', email='student@example.com', role='student')
+        self.tutors = [
+            User.objects.create_user(username=f'@tutor{i}', email=f'tutor{i}@example.com', role='tutor')
+            for i in range(self.TUTORS)
+        ]
+        # Every (tutor, hour) pair is wanted by SUBMISSIONS / (TUTORS * HOURS) requests at once.
+        self.requests = [
+            LessonRequest.objects.create(
+                student=student,
+                requested_date=date(2025, 1, 6),
+                requested_time=time(9 + i % self.HOURS),
+                requested_duration=60,
+            )
+            for i in range(self.SUBMISSIONS)
+        ]
+
+    def _submit(self, index):
+        try:
+            allocation.allocate(self.requests[index], self.tutors[index % self.TUTORS])
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def _book(self, lesson_request):
+        try:
+            allocation.allocate(lesson_request, self.tutors[0])
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def _race(self):
+        """Book one slot twice, pausing the first booking between its clash check and its save."""
+        first, second = self.requests[0], self.requests[self.TUTORS * self.HOURS]
+        checked, proceed = Event(), Event()
+        clean = LessonRequest.clean
+
+        def paused_clean(lesson_request):
+            clean(lesson_request)
+            if lesson_request.pk == first.pk:
+                checked.set()
+                proceed.wait(5)
+
+        with patch.object(LessonRequest, 'clean', paused_clean), ThreadPoolExecutor(max_workers=2) as pool:
+            booked_first = pool.submit(self._book, first)
+            checked.wait(5)
+            booked_second = pool.submit(self._book, second)
+            wait([booked_second], timeout=0.5)
+            proceed.set()
+            return booked_first.result(), booked_second.result()
+
+    def test_lock_holds_the_second_booking_until_the_first_is_saved(self):
+        self.assertEqual(self._race(), (True, False))
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_without_the_lock_the_slot_is_double_booked(self):
+        with patch('tutorials.allocation.lock_tutors'):
+            self.assertEqual(self._race(), (True, True))
+
+    def test_concurrent_submissions_never_double_book(self):
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            booked = list(pool.map(self._submit, range(self.SUBMISSIONS)))
+
+        self.assertEqual(sum(booked), self.TUTORS * self.HOURS)
+        slots = list(
+            LessonRequest.objects.filter(status='Allocated').values_list('tutor', 'requested_time')
+        )
+        self.assertEqual(len(slots), len(set(slots)))
+        self.assertEqual(len(slots), self.TUTORS * self.HOURS)
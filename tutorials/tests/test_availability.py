@@ -0,0 +1,94 @@
+from datetime import date, time
+from django.test import TestCase
+from tutorials.availability import FreeBusy, day_mask, slot_ranges, week_mask
+from tutorials.models import User, LessonRequest, TutorAvailability
+
+class SlotMaskTests(TestCase):
+    """Test suite for the availability slot bitmasks."""
+
+    def test_partly_covered_slots_are_taken(self):
+        self.assertEqual(day_mask(time(10, 0), 60), 0b1111 << 40)
+        self.assertEqual(day_mask(time(10, 5), 20), 0b11 << 40)
+        self.assertEqual(day_mask(time(23, 30), 90), 0b11 << 94)
+
+    def test_week_mask_round_trips_through_ranges(self):
+        mask = week_mask(2, time(9), time(12)) | week_mask(2, time(13, 30), time.max)
+        self.assertEqual(
+            list(slot_ranges(mask, 2)),
+            [(time(9), time(12)), (time(13, 30), time.max)],
+        )
+        self.assertEqual(list(slot_ranges(mask, 1)), [])
+
+    def test_slots_are_stored_as_bytes(self):
+        tutor = User.objects.create_user(username='@tutor', email='tutor@example.com', role='tutor')
+        availability = TutorAvailability.objects.create(tutor=tutor, slots=week_mask(6, time(9), time(17)))
+        availability.refresh_from_db()
+        self.assertEqual(len(bytes(availability.weekly_slots)), TutorAvailability.WEEK_BYTES)
+        self.assertEqual(list(slot_ranges(availability.slots, 6)), [(time(9), time(17))])
+
+
+class FreeBusyTests(TestCase):
+    """Test suite for FreeBusy."""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='@student', email='student@example.com', role='student')
+        self.tutor = User.objects.create_user(username='@tutor', email='tutor@example.com', role='tutor')
+        self.other_tutor = User.objects.create_user(username='@other', email='other@example.com', role='tutor')
+        # Mondays 09:00-17:00 for both, with the first tutor teaching weekly at 10:00.
+        for tutor in (self.tutor, self.other_tutor):
+            TutorAvailability.objects.create(tutor=tutor, slots=week_mask(0, time(9), time(17)))
+        LessonRequest.objects.create(
+            student=self.student,
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date=date(2025, 1, 6),
+            requested_time=time(10),
+            requested_duration=60,
+            recurrence_count=3,
+        )
+        with self.assertNumQueries(2):
+            self.free_busy = FreeBusy(date(2025, 1, 1), date(2025, 3, 31))
+
+    def test_is_free_checks_availability_and_bookings(self):
+        self.assertFalse(self.free_busy.is_free(self.tutor.id, date(2025, 1, 13), time(10, 30), 60))
+        self.assertTrue(self.free_busy.is_free(self.tutor.id, date(2025, 1, 13), time(11), 60))
+        self.assertTrue(self.free_busy.is_free(self.tutor.id, date(2025, 1, 27), time(10), 60))
+        self.assertFalse(self.free_busy.is_free(self.tutor.id, date(2025, 1, 13), time(16, 30), 60))
+        self.assertFalse(self.free_busy.is_free(self.tutor.id, date(2025, 1, 14), time(11), 60))
+
+    def test_free_tutors(self):
+        self.assertEqual(self.free_busy.free_tutors(date(2025, 1, 6), time(10), 30), [self.other_tutor.id])
+        self.assertEqual(
+            sorted(self.free_busy.free_tutors(date(2025, 1, 6), time(12), 30)),
+            sorted([self.tutor.id, self.other_tutor.id]),
+        )
+
+    def test_series_and_in_memory_bookings(self):
+        request = LessonRequest(
+            student=self.student, requested_date=date(2025, 1, 20), requested_time=time(10, 45),
+            requested_duration=30, recurrence_count=4,
+        )
+        self.assertFalse(self.free_busy.is_free_for(self.tutor.id, request))
+        self.assertEqual(self.free_busy.free_tutors_for(request), [self.other_tutor.id])
+
+        self.free_busy.book(self.other_tutor.id, request)
+        self.assertEqual(self.free_busy.free_tutors_for(request), [])
+
+    def test_loading_stays_two_queries_and_keeps_to_the_window(self):
+        for number in range(10):
+            tutor = User.objects.create_user(
+                username=f'@tutor{number}', email=f'tutor{number}@example.com', role='tutor'
+            )
+            TutorAvailability.objects.create(tutor=tutor, slots=week_mask(0, time(9), time(17)))
+            LessonRequest.objects.create(
+                student=self.student, tutor=tutor, status='Allocated', requested_date=date(2025, 1, 6),
+                requested_time=time(9 + number % 8), requested_duration=60, recurrence_count=10,
+            )
+        with self.assertNumQueries(2):
+            free_busy = FreeBusy(date(2025, 1, 13), date(2025, 1, 31), tutors=[self.tutor.id, tutor.id])
+
+        self.assertEqual(set(free_busy.available), {self.tutor.id, tutor.id})
+        self.assertEqual(
+            sorted(day for tutor_id, day in free_busy.booked if tutor_id == tutor.id),
+            [date(2025, 1, 13), date(2025, 1, 20), date(2025, 1, 27)],
+        )
@@ -0,0 +1,10 @@
+from django.test import TestCase
+from tutorials.management.commands.benchmark_calendar_feed import run_benchmark
+
+class BenchmarkCalendarFeedTests(TestCase):
+    """Test suite for the benchmark_calendar_feed command."""
+
+    def test_feed_and_poll_are_served_in_fixed_queries(self):
+        (_, full_queries), (_, poll_queries, status) = run_benchmark(40, 10, 2)
+        self.assertEqual((full_queries, poll_queries), (3, 2))
+        self.assertEqual(status, 304)
@@ -0,0 +1,37 @@
+from calendar import SUNDAY
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from tutorials.timetables import month_grid, month_navigation, month_skeleton
+
+class MonthGridTests(SimpleTestCase):
+    """Test suite for the cached month skeletons and the benchmark_month_grid command."""
+
+    def test_skeleton_is_cached_and_shared(self):
+        month_skeleton.cache_clear()
+        self.assertIs(month_skeleton(2025, 2), month_skeleton(2025, 2))
+        self.assertIsNot(month_skeleton(2025, 2), month_skeleton(2025, 2, SUNDAY))
+        self.assertEqual(month_skeleton.cache_info().hits, 2)
+
+    def test_grid_fills_days_without_changing_the_skeleton(self):
+        skeleton = month_skeleton(2025, 2)
+        lessons = [{'notes': 'Python'}]
+        grid = month_grid(2025, 2, {date(2025, 2, 3): lessons})
+        self.assertEqual(grid[1][0], {'date': date(2025, 2, 3), 'lessons': lessons})
+        self.assertEqual(grid[0][0], {'date': None, 'lessons': ()})
+        self.assertEqual(month_skeleton(2025, 2), skeleton)
+        self.assertIsNone(skeleton[0][0])
+
+    def test_navigation_is_read_only(self):
+        navigation = month_navigation(2024, 12)
+        self.assertEqual((navigation['next_month'], navigation['next_year']), (1, 2025))
+        with self.assertRaises(TypeError):
+            navigation['month'] = 1
+
+    def test_benchmark_reports_both_timings(self):
+        out, err = StringIO(), StringIO()
+        call_command('benchmark_month_grid', '--requests', '50', stdout=out, stderr=err)
+        self.assertEqual(err.getvalue(), '')
+        self.assertIn('Uncached:', out.getvalue())
+        self.assertIn('24 skeletons cached', out.getvalue())
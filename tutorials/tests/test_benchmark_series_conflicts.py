@@ -0,0 +1,10 @@
+from django.test import TestCase
+from tutorials.management.commands.benchmark_series_conflicts import run_benchmark
+
+class BenchmarkSeriesConflictsTests(TestCase):
+    """Test suite for the benchmark_series_conflicts command."""
+
+    def test_checks_agree_and_batched_is_one_query(self):
+        (_, batched_queries, clashes), (_, _, naive_clashes) = run_benchmark(40, 20)
+        self.assertEqual(clashes, naive_clashes)
+        self.assertEqual(batched_queries, 1)
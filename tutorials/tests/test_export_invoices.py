@@ -0,0 +1,30 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from tutorials.models import User, Invoice
+
+class ExportInvoicesTests(TestCase):
+    """Test suite for the export_invoices command."""
+
+    def setUp(self):
+        for i, status in enumerate(['Paid', 'Unpaid', 'Unpaid']):
+            student = User.objects.create_user(
+                username=f'@student{i}', email=f'student{i}@example.com', role='student'
+            )
+            Invoice.objects.create(
+                student=student, invoice_num=f'INV00{i}', due_date='2024-12-31', payment_status=status
+            )
+
+    def test_exports_csv_to_stdout(self):
+        out = StringIO()
+        call_command('export_invoices', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('invoice_num,'))
+        self.assertEqual(len(lines), 4)
+
+    def test_exports_filtered_jsonl(self):
+        out = StringIO()
+        call_command('export_invoices', '--format', 'jsonl', '--status', 'Unpaid', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['invoice_num'] for row in rows], ['INV001', 'INV002'])
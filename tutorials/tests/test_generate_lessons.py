@@ -0,0 +1,142 @@
+from datetime import date, time
+from unittest.mock import patch
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from tutorials import allocation
+from tutorials.models import User, Lesson, LessonBooking, LessonRequest
+from tutorials.scheduling import generate_lessons
+
+class GenerateLessonsTests(TestCase):
+    """Test suite for expanding lesson requests into dated lessons."""
+
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='@tutor', email='tutor@example.com', role='tutor')
+        self.students = [
+            User.objects.create_user(username=f'@student{i}', email=f'student{i}@example.com', role='student')
+            for i in range(3)
+        ]
+
+    def _request(self, student, requested_time='10:00:00', frequency='weekly'):
+        return LessonRequest.objects.create(
+            student=student,
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date='2025-01-06',
+            requested_time=requested_time,
+            requested_frequency=frequency,
+            requested_duration=60,
+        )
+
+    def test_series_follow_each_requests_frequency(self):
+        weekly = self._request(self.students[0])
+        fortnightly = self._request(self.students[1], '12:00:00', 'fortnightly')
+        lessons = generate_lessons([weekly, fortnightly])
+        self.assertEqual(len(lessons), 20)
+        self.assertEqual(
+            list(Lesson.objects.filter(student=self.students[1]).order_by('date').values_list('date', flat=True))[:2],
+            [date(2025, 1, 6), date(2025, 1, 20)],
+        )
+        self.assertEqual(Lesson.objects.filter(student=self.students[0]).last().time, time(10, 0))
+
+    def test_many_requests_take_a_fixed_number_of_queries(self):
+        requests = [self._request(student, f'{9 + i}:00:00') for i, student in enumerate(self.students)]
+        # existing slots, insert, and the savepoint around them
+        with self.assertNumQueries(4):
+            generate_lessons(requests)
+        self.assertEqual(Lesson.objects.count(), 30)
+
+    def test_clash_with_existing_lesson_inserts_nothing(self):
+        Lesson.objects.create(
+            student=self.students[2], tutor=self.tutor, date='2025-01-27', time='10:00:00', duration=60, topic='Python'
+        )
+        with self.assertRaises(ValidationError):
+            generate_lessons([self._request(self.students[0]), self._request(self.students[1], '12:00:00')])
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_clash_within_the_batch_inserts_nothing(self):
+        with self.assertRaises(ValidationError):
+            generate_lessons([self._request(self.students[0]), self._request(self.students[1])])
+        self.assertFalse(Lesson.objects.exists())
+
+    def test_requests_without_a_tutor_are_skipped(self):
+        request = self._request(self.students[0])
+        request.tutor = None
+        self.assertEqual(generate_lessons([request]), [])
+
+
+class CancelStaleLessonsTests(TestCase):
+    """Test suite for cancelling the lessons of requests that are cancelled, unassigned or moved."""
+
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='@tutor', email='tutor@example.com', role='tutor')
+        self.other = User.objects.create_user(username='@other', email='other@example.com', role='tutor')
+        self.student = User.objects.create_user(username='@student', email='student@example.com', role='student')
+        self.request = LessonRequest.objects.create(
+            student=self.student,
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date='2025-01-06',
+            requested_time='10:00:00',
+            requested_duration=60,
+        )
+        generate_lessons([self.request])
+
+    def statuses(self):
+        return set(self.request.lessons.values_list('status', flat=True))
+
+    def test_lessons_are_linked_to_their_request(self):
+        self.assertEqual(self.request.lessons.count(), 10)
+
+    def test_cancelling_the_request_cancels_its_lessons_and_bookings(self):
+        lesson = self.request.lessons.first()
+        booking = LessonBooking.objects.create(
+            student=self.student, tutor=self.tutor, lesson_request=self.request,
+            date=lesson.date, time=lesson.time, duration=lesson.duration,
+        )
+        self.request.status = 'Cancelled'
+        self.request.tutor = None
+        self.request.save()
+
+        self.assertEqual(self.statuses(), {'Cancelled'})
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'Cancelled')
+
+    def test_cancelled_lessons_free_the_tutors_slots(self):
+        allocation.release_requests([self.request.id])
+        self.assertEqual(self.statuses(), {'Cancelled'})
+
+        rebooked = LessonRequest.objects.create(
+            student=self.student,
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date='2025-01-06',
+            requested_time='10:00:00',
+            requested_duration=60,
+        )
+        self.assertEqual(len(generate_lessons([rebooked])), 10)
+
+    def test_only_lessons_with_a_previous_tutor_are_cancelled_on_reassignment(self):
+        allocation.assign_requests({self.request.id: self.other.id})
+        self.assertEqual(self.statuses(), {'Cancelled'})
+
+        self.request.refresh_from_db()
+        generate_lessons([self.request])
+        self.request.save()
+        self.assertEqual(
+            set(self.request.lessons.values_list('tutor', 'status')),
+            {(self.tutor.id, 'Cancelled'), (self.other.id, 'Scheduled')},
+        )
+
+    def test_only_status_or_tutor_changes_look_for_stale_lessons(self):
+        lesson_request = LessonRequest.objects.get(id=self.request.id)
+        with patch('tutorials.scheduling.cancel_stale_lessons') as cancel_stale_lessons:
+            lesson_request.additional_notes = 'Bring a laptop'
+            lesson_request.requested_duration = 90
+            lesson_request.save()
+            lesson_request.status = 'Cancelled'
+            lesson_request.save(update_fields=['additional_notes'])
+            self.assertFalse(cancel_stale_lessons.called)
+
+            lesson_request.save()
+            lesson_request.save()
+        cancel_stale_lessons.assert_called_once_with([lesson_request.pk])
@@ -0,0 +1,115 @@
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from tutorials import invoicing
+from tutorials.models import User, Invoice, InvoiceLine, LessonRequest
+
+@override_settings(HOURLY_RATE=10.00)
+class GenerateTermInvoicesTests(TestCase):
+    """Test suite for the generate_term_invoices command."""
+
+    def setUp(self):
+        self.tutor = User.objects.create_user(
+            username='@tutor', email='tutor@example.com', role='tutor'
+        )
+        self.students = [
+            User.objects.create_user(
+                username=f'@student{i}', email=f'student{i}@example.com', role='student'
+            )
+            for i in range(5)
+        ]
+        for student in self.students:
+            LessonRequest.objects.create(
+                student=student,
+                tutor=self.tutor,
+                status='Allocated',
+                requested_date='2024-10-01',
+                requested_duration=60,
+            )
+        LessonRequest.objects.create(
+            student=self.students[0],
+            tutor=self.tutor,
+            status='Allocated',
+            requested_date='2025-02-01',
+            requested_duration=60,
+        )
+
+    def _generate(self, *args):
+        out = StringIO()
+        call_command('generate_term_invoices', *args, stdout=out)
+        return out.getvalue()
+
+    def test_creates_one_invoice_per_student(self):
+        self._generate('autumn', '--batch-size', '2')
+        invoices = Invoice.objects.filter(term='autumn')
+        self.assertEqual(invoices.count(), 5)
+        self.assertEqual(invoices.values('invoice_num').distinct().count(), 5)
+
+    def test_bills_only_lessons_in_the_term(self):
+        self._generate('autumn')
+        invoice = Invoice.objects.get(term='autumn', student=self.students[0])
+        self.assertEqual(invoice.line_count, 1)
+        self.assertEqual(invoice.total, Decimal('10.00'))
+        self.assertEqual(invoice.payment_status, 'Unpaid')
+        self.assertEqual(InvoiceLine.objects.count(), 5)
+
+    def test_rerunning_is_idempotent(self):
+        self._generate('autumn', '--batch-size', '2')
+        output = self._generate('autumn', '--batch-size', '2')
+        self.assertEqual(Invoice.objects.filter(term='autumn').count(), 5)
+        self.assertEqual(InvoiceLine.objects.count(), 5)
+        self.assertIn('0 invoices created, 0 lines posted', output)
+
+    def test_rerun_bills_newly_allocated_lessons(self):
+        self._generate('autumn')
+        LessonRequest.objects.create(
+            student=self.students[1],
+            requested_date='2024-11-01',
+            requested_duration=90,
+        ).assign_tutor(self.tutor)
+        self._generate('autumn')
+        invoice = Invoice.objects.get(term='autumn', student=self.students[1])
+        self.assertEqual(invoice.line_count, 2)
+        self.assertEqual(invoice.total, Decimal('25.00'))
+
+    def test_rerun_keeps_postings_made_while_it_runs(self):
+        self._generate('autumn')
+        invoice = Invoice.objects.get(term='autumn', student=self.students[1])
+        LessonRequest.objects.bulk_create([LessonRequest(
+            student=self.students[1], tutor=self.tutor, status='Allocated',
+            requested_date='2024-11-01', requested_duration=90,
+        )])
+        new_line = invoicing.new_line
+
+        def posted_meanwhile(*args):
+            # Another request is billed to the invoice after invoice_term has read it.
+            invoicing.adjust_invoice_totals(invoice.id, Decimal('5.00'), 1)
+            return new_line(*args)
+
+        with patch('tutorials.invoicing.new_line', side_effect=posted_meanwhile):
+            self._generate('autumn')
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.total, invoice.line_count), (Decimal('30.00'), 3))
+        self.assertEqual(invoice.payment_status, 'Unpaid')
+
+    def test_moves_term_lines_off_the_running_invoice(self):
+        running = Invoice.objects.create(
+            student=self.students[0], invoice_num='INV00001', due_date='2025-08-31', payment_status='Unpaid'
+        )
+        self.assertEqual((running.total, running.line_count), (Decimal('20.00'), 2))
+        self._generate('autumn')
+        invoice = Invoice.objects.get(term='autumn', student=self.students[0])
+        self.assertEqual((invoice.total, invoice.line_count), (Decimal('10.00'), 1))
+        self.assertEqual(invoice.payment_status, 'Unpaid')
+        self.assertEqual(invoicing.invoice_lines(invoice).count(), 1)
+        running.refresh_from_db()
+        self.assertEqual((running.total, running.line_count), (Decimal('10.00'), 1))
+        self.assertEqual(InvoiceLine.objects.filter(invoice=running).get().date.isoformat(), '2025-02-01')
+        self.assertEqual(InvoiceLine.objects.count(), 6)
+
+    def test_reports_throughput(self):
+        output = self._generate('autumn')
+        self.assertIn('students/s', output)
+        self.assertIn('Invoiced 5 students for the autumn term', output)
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from tutorials.invoicing import InvoiceNumberAllocator
+from tutorials.models import User, Invoice, InvoiceNumberSequence
+
+class InvoiceNumberAllocatorTests(TestCase):
+    """Test suite for the invoice number allocator."""
+
+    def test_numbers_are_sequential_within_a_block(self):
+        allocator = InvoiceNumberAllocator(block_size=10)
+        self.assertEqual(allocator.allocate(3), ['INV1000000', 'INV1000001', 'INV1000002'])
+
+    def test_block_is_reserved_with_one_update(self):
+        allocator = InvoiceNumberAllocator(block_size=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            allocator.allocate()
+        with self.assertNumQueries(0):
+            allocator.allocate(9)
+        self.assertEqual(InvoiceNumberSequence.objects.get(name='invoice').next_value, 1000010)
+
+    def test_large_request_reserves_one_block_of_that_size(self):
+        allocator = InvoiceNumberAllocator(block_size=10)
+        numbers = allocator.allocate(250)
+        self.assertEqual(len(set(numbers)), 250)
+        self.assertEqual(InvoiceNumberSequence.objects.get(name='invoice').next_value, 1000250)
+
+    def test_separate_allocators_never_overlap(self):
+        first = InvoiceNumberAllocator(block_size=10)
+        second = InvoiceNumberAllocator(block_size=10)
+        numbers = first.allocate(5) + second.allocate(5) + first.allocate(10)
+        self.assertEqual(len(set(numbers)), 20)
+
+    def test_rolled_back_block_is_not_reused(self):
+        allocator = InvoiceNumberAllocator(block_size=10)
+        try:
+            with transaction.atomic():
+                allocator.allocate()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        other = InvoiceNumberAllocator(block_size=10)
+        self.assertEqual(set(allocator.allocate(10)) & set(other.allocate(10)), set())
+
+    def test_invoice_is_numbered_on_save(self):
+        student = User.objects.create_user(
+            username='@student', email='student@example.com', role='student'
+        )
+        invoice = Invoice.objects.create(student=student, due_date='2025-01-31', payment_status='Unpaid')
+        self.assertTrue(invoice.invoice_num.startswith('INV'))
+
+
+class InvoiceNumberAllocatorStressTests(TransactionTestCase):
+    """Allocate numbers from many threads, each with its own allocator and connection."""
+
+    THREADS = 16
+    ROUNDS = 25
+
+    def _allocate(self, index):
+        allocator = InvoiceNumberAllocator(block_size=7)
+        numbers = []
+        try:
+            for round in range(self.ROUNDS):
+                numbers += allocator.allocate(1 + (index + round) % 5)
+        finally:
+            connection.close()
+        return numbers
+
+    def test_concurrent_allocation_never_collides(self):
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            results = list(pool.map(self._allocate, range(self.THREADS)))
+        numbers = [number for result in results for number in result]
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+    def test_shared_allocator_never_collides(self):
+        allocator = InvoiceNumberAllocator(block_size=3)
+
+        def allocate(index):
+            try:
+                return [number for _ in range(self.ROUNDS) for number in allocator.allocate(2)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            results = list(pool.map(allocate, range(self.THREADS)))
+        numbers = [number for result in results for number in result]
+        self.assertEqual(len(numbers), self.THREADS * self.ROUNDS * 2)
+        self.assertEqual(len(numbers), len(set(numbers)))
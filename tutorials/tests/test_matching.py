@@ -0,0 +1,151 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from random import Random
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from tutorials.availability import week_mask
+from tutorials.matching import match_requests
+from tutorials.models import Invoice, InvoiceLine, LessonRequest, TutorAvailability, TutorBookingLock, User
+
+@override_settings(HOURLY_RATE=10.00)
+class MatchRequestsTests(TestCase):
+    """Test suite for the tutor matching engine."""
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='@student', email='student@example.com', role='student')
+        self.python_tutor = self.tutor('@python', 'Python', week_mask(0, time(9), time(17)))
+        self.generalist = self.tutor('@general', 'Python, Ruby on Rails', week_mask(0, time(9), time(17)))
+
+    def tutor(self, username, expertise, slots):
+        tutor = User.objects.create_user(
+            username=username, email=f'{username[1:]}@example.com', role='tutor', expertise=expertise
+        )
+        TutorAvailability.objects.create(tutor=tutor, slots=slots)
+        return tutor
+
+    def request(self, topic='python_programming', hour=10, **kwargs):
+        return LessonRequest.objects.create(
+            student=self.student,
+            requested_topic=topic,
+            requested_date=date(2025, 1, 6),
+            requested_time=time(hour),
+            requested_duration=60,
+            **kwargs,
+        )
+
+    def test_tutors_need_a_topic_for_the_request(self):
+        self.python_tutor.expertise = 'Rails'
+        self.python_tutor.save()
+        lesson_request = self.request()
+        match_requests()
+        lesson_request.refresh_from_db()
+        self.assertEqual(lesson_request.tutor, self.generalist)
+
+    def test_tutors_without_availability_are_reported_not_matched(self):
+        unavailable = User.objects.create_user(
+            username='@unavailable', email='unavailable@example.com', role='tutor', expertise='Ruby on Rails'
+        )
+        lesson_request = self.request('ruby_on_rails', hour=18)
+        report = match_requests()
+        self.assertEqual(report.unavailable, [unavailable.id])
+        self.assertEqual(report.unmatched, [lesson_request])
+
+    def test_only_qualified_tutors_are_locked(self):
+        self.tutor('@evenings', 'Python', week_mask(0, time(17), time(22)))
+        self.tutor('@rails', 'Ruby on Rails', week_mask(0, time(9), time(17)))
+        self.request()
+        match_requests()
+        self.assertEqual(
+            set(TutorBookingLock.objects.values_list('tutor', flat=True)), {self.python_tutor.id, self.generalist.id}
+        )
+
+    def test_requests_go_to_free_qualified_tutors_without_overlaps(self):
+        ruby = self.request('ruby_on_rails', hour=12)
+        first, second = self.request(), self.request()
+        evening = self.request(hour=18)
+
+        report = match_requests()
+
+        self.assertEqual(report.matched, 3)
+        self.assertEqual(report.unmatched, [evening])
+        ruby.refresh_from_db()
+        self.assertEqual((ruby.status, ruby.tutor), ('Allocated', self.generalist))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual({first.tutor, second.tutor}, {self.python_tutor, self.generalist})
+        evening.refresh_from_db()
+        self.assertEqual((evening.status, evening.tutor), ('Unallocated', None))
+
+    def test_existing_bookings_and_load_are_respected(self):
+        self.request(status='Allocated', tutor=self.python_tutor)
+        self.request(hour=14, status='Allocated', tutor=self.generalist)
+        self.request(hour=15, status='Allocated', tutor=self.generalist)
+        clashing, free = self.request(), self.request(hour=16)
+
+        match_requests()
+
+        clashing.refresh_from_db()
+        free.refresh_from_db()
+        self.assertEqual(clashing.tutor, self.generalist)
+        self.assertEqual(free.tutor, self.python_tutor)
+
+    def test_generated_backlog_never_double_books(self):
+        rng = Random(0)
+        for _ in range(40):
+            LessonRequest.objects.create(
+                student=self.student,
+                requested_topic='python_programming',
+                requested_date=date(2025, 1, 6) + timedelta(weeks=rng.randrange(4)),
+                requested_time=time(rng.randrange(9, 16), rng.choice([0, 30])),
+                requested_duration=rng.choice([30, 60, 90]),
+                requested_frequency=rng.choice(list(LessonRequest.FREQUENCY_DAYS)),
+                recurrence_count=3,
+            )
+
+        report = match_requests()
+
+        self.assertGreater(report.matched, 0)
+        self.assertEqual(report.matched + len(report.unmatched), 40)
+        taken = {}
+        for request in LessonRequest.objects.filter(status='Allocated'):
+            start, end = request.get_start_time(), request.get_end_time()
+            for day in request.occurrence_dates():
+                for other_start, other_end in taken.get((request.tutor_id, day), []):
+                    self.assertFalse(start < other_end and other_start < end)
+                taken.setdefault((request.tutor_id, day), []).append((start, end))
+
+    def test_max_load(self):
+        self.request(hour=14, status='Allocated', tutor=self.python_tutor)
+        self.request(hour=15, status='Allocated', tutor=self.generalist)
+        self.request()
+        report = match_requests(max_load=1)
+        self.assertEqual(report.matched, 0)
+
+    def test_dry_run_saves_nothing(self):
+        lesson_request = self.request()
+        report = match_requests(commit=False)
+        self.assertEqual(report.matched, 1)
+        lesson_request.refresh_from_db()
+        self.assertEqual(lesson_request.status, 'Unallocated')
+
+    def test_matches_are_billed(self):
+        invoice = Invoice.objects.create(
+            student=self.student, invoice_num='INV001', due_date=date(2025, 5, 31), payment_status='Unpaid'
+        )
+        lesson_request = self.request(recurrence_count=1)
+        match_requests()
+        line = InvoiceLine.objects.get(lesson_request=lesson_request)
+        self.assertEqual((line.invoice, line.amount), (invoice, Decimal('10.00')))
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.total, invoice.line_count), (Decimal('10.00'), 1))
+
+    def test_command_reports_matches(self):
+        self.request()
+        self.request(hour=18)
+        out = StringIO()
+        call_command('match_tutors', stdout=out)
+        self.assertIn('Allocated 1 requests', out.getvalue())
+        self.assertIn('1 left without a free tutor', out.getvalue())
+        self.assertNotIn('no availability', out.getvalue())
+        self.assertEqual(LessonRequest.objects.filter(status='Allocated').count(), 1)
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from tutorials.models import User, Invoice
+from tutorials.invoicing import sync_payment_status
+from tutorials.reconciliation import ReconciliationReport, reconcile_payments
+
+class ReconcilePaymentsTests(TestCase):
+    """Test suite for reconciling bank statements against invoices."""
+
+    def setUp(self):
+        self.invoices = []
+        for i in range(3):
+            student = User.objects.create_user(
+                username=f'@student{i}', email=f'student{i}@example.com', role='student'
+            )
+            invoice = Invoice.objects.create(
+                student=student, invoice_num=f'INV00{i}', due_date='2024-12-31', payment_status='Unpaid'
+            )
+            Invoice.objects.filter(id=invoice.id).update(total=Decimal('30.00'))
+            self.invoices.append(invoice)
+
+    def _reconcile(self, *rows, batch_size=2):
+        return reconcile_payments(['Reference,Amount,Date\n', *rows], batch_size=batch_size)
+
+    def test_matched_payments_settle_invoices(self):
+        report = self._reconcile('INV000,30.00,2024-11-01\n', 'inv001,£30.00,02/11/2024\n')
+        self.assertEqual((report.rows, report.matched, report.settled), (2, 2, 2))
+        invoice = Invoice.objects.get(invoice_num='INV001')
+        self.assertEqual(invoice.payment_status, 'Paid')
+        self.assertEqual(str(invoice.payment_date), '2024-11-02')
+        self.assertEqual(invoice.amount_paid, Decimal('30.00'))
+
+    def test_part_payments_accumulate(self):
+        report = self._reconcile('INV000,10.00,2024-11-01\n', 'INV000,20.00,2024-11-05\n', batch_size=1)
+        self.assertEqual((report.matched, report.settled), (2, 1))
+        invoice = Invoice.objects.get(invoice_num='INV000')
+        self.assertEqual(invoice.payment_status, 'Paid')
+        self.assertEqual(str(invoice.payment_date), '2024-11-05')
+
+    def test_unmatched_duplicate_and_invalid_rows_are_reported(self):
+        report = self._reconcile(
+            'INV000,30.00,2024-11-01\n',
+            'INV000,30.00,2024-11-01\n',
+            'INV999,30.00,2024-11-01\n',
+            'INV002,thirty,2024-11-01\n',
+        )
+        self.assertEqual(report.matched, 1)
+        self.assertEqual([issue.line for issue in report.duplicates], [3])
+        self.assertEqual([issue.reference for issue in report.unmatched], ['INV999'])
+        self.assertEqual([issue.line for issue in report.invalid], [5])
+        self.assertEqual(Invoice.objects.get(invoice_num='INV002').payment_status, 'Unpaid')
+
+    def test_non_positive_and_non_finite_amounts_are_invalid(self):
+        report = self._reconcile(
+            'INV000,-50.00,2024-11-01\n',
+            'INV000,0,2024-11-01\n',
+            'INV001,NaN,2024-11-01\n',
+            'INV002,Infinity,2024-11-01\n',
+        )
+        self.assertEqual(report.matched, 0)
+        self.assertEqual([issue.line for issue in report.invalid], [2, 3, 4, 5])
+        self.assertFalse(Invoice.objects.exclude(amount_paid=0).exists())
+
+    def test_reimporting_a_statement_changes_nothing(self):
+        self._reconcile('INV000,30.00,2024-11-01\n')
+        report = self._reconcile('INV000,30.00,2024-11-01\n')
+        self.assertEqual(report.matched, 0)
+        self.assertEqual(len(report.duplicates), 1)
+        self.assertEqual(Invoice.objects.get(invoice_num='INV000').amount_paid, Decimal('30.00'))
+
+    def test_reimporting_a_part_payment_changes_nothing(self):
+        statement = ('INV000,10.00,2024-11-01\n', 'INV001,10.00,2024-11-01\n', 'INV001,10.00,2024-11-01\n')
+        first = self._reconcile(*statement)
+        second = self._reconcile(*statement)
+        self.assertEqual((first.matched, len(first.duplicates)), (2, 1))
+        self.assertEqual((second.matched, len(second.duplicates)), (0, 3))
+        self.assertEqual(
+            list(Invoice.objects.order_by('invoice_num').values_list('amount_paid', 'payment_status')),
+            [(Decimal('10.00'), 'Unpaid'), (Decimal('10.00'), 'Unpaid'), (Decimal('0.00'), 'Unpaid')],
+        )
+
+    def test_paid_invoice_stays_paid_when_viewed(self):
+        self._reconcile('INV000,30.00,2024-11-01\n')
+        invoice = Invoice.objects.get(invoice_num='INV000')
+        sync_payment_status(invoice, invoice.total)
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.payment_status, 'Paid')
+
+    def test_command_prints_report(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as statement:
+            statement.write('reference,amount,date\nINV000,30.00,2024-11-01\nINV999,5.00,2024-11-01\n')
+        self.addCleanup(os.remove, statement.name)
+        out = StringIO()
+        call_command('reconcile_payments', statement.name, stdout=out)
+        output = out.getvalue()
+        self.assertIn("Line 3: unmatched payment of 5.00 for 'INV999'", output)
+        self.assertIn("1 matched, 1 invoices settled, 1 unmatched", output)
+        self.assertNotIn(ReconciliationReport.DUPLICATE_NOTE, output)
+
+    def test_command_notes_how_duplicates_are_identified(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as statement:
+            statement.write('reference,amount,date\nINV000,10.00,2024-11-01\nINV000,10.00,2024-11-01\n')
+        self.addCleanup(os.remove, statement.name)
+        out = StringIO()
+        call_command('reconcile_payments', statement.name, stdout=out)
+        self.assertIn(ReconciliationReport.DUPLICATE_NOTE, out.getvalue())
@@ -68,3 +68,19 @@ class AdminInvoiceViewTest(TestCase):
         invalid_url = reverse('admin_invoice_view', kwargs={'invoice_num': 'INVALID'})
         response = self.client.get(invalid_url)
         self.assertEqual(response.status_code, 404)  # Not found
+
+    def test_not_modified_for_matching_etag(self):
+        """Test that a repeat view with a matching ETag returns 304."""
+        self.client.login(username='admin', password='password')
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_after_lesson_request_changes(self):
+        """Test that changing a lesson request invalidates the ETag."""
+        self.client.login(username='admin', password='password')
+        etag = self.client.get(self.url)['ETag']
+        self.lesson_request1.status = 'Allocated'
+        self.lesson_request1.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from tutorials.models import LessonRequest
+from tutorials.models import Invoice, LessonRequest
 
 User = get_user_model()
 
@@ -84,3 +84,37 @@ class AssignTutorViewTestCase(TestCase):
         url = reverse("assign_tutor", args=[999])  
         response = self.client.post(url, {"tutor_id": self.tutor_user.id})
         self.assertEqual(response.status_code, 404)  
+
+    def test_assign_tutor_posts_invoice_line(self):
+        """Test that assigning a tutor bills the request on the student's invoice."""
+        invoice = Invoice.objects.create(
+            student=self.student_user,
+            invoice_num="INV00001",
+            due_date="2024-01-31",
+            payment_status="Unpaid",
+        )
+        self.client.login(username="admin1", password="Password123")
+        self.client.post(self.url, {"tutor_id": self.tutor_user.id})
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.line_count, 1)
+        self.assertEqual(invoice.lines.get().lesson_request, self.lesson_request)
+
+    def test_assign_tutor_rejects_a_clash(self):
+        """Test that a tutor already booked for the slot is not assigned again."""
+        LessonRequest.objects.create(
+            student=self.student_user,
+            tutor=self.tutor_user,
+            status="Allocated",
+            requested_date="2024-01-01",
+            requested_time="10:30:00",
+            requested_duration=60,
+        )
+        self.client.login(username="admin1", password="Password123")
+        response = self.client.post(self.url, {"tutor_id": self.tutor_user.id}, follow=True)
+        self.assertRedirects(response, reverse("student_requests"))
+        self.assertContains(response, "The tutor is already booked")
+
+        self.lesson_request.refresh_from_db()
+        self.assertIsNone(self.lesson_request.tutor)
+        self.assertEqual(self.lesson_request.status, "Unallocated")
@@ -0,0 +1,83 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from tutorials.models import LessonRequest
+
+User = get_user_model()
+
+class BulkRequestActionViewTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username="@admin", email="admin@example.com", role="admin")
+        self.tutor_user = User.objects.create_user(username="@tutor", email="tutor@example.com", role="tutor")
+        self.other_tutor = User.objects.create_user(username="@other", email="other@example.com", role="tutor")
+        self.student_user = User.objects.create_user(username="@student", email="student@example.com", role="student")
+        self.lesson_requests = [
+            LessonRequest.objects.create(
+                student=self.student_user,
+                requested_date="2025-01-06",
+                requested_time=f"{hour}:00:00",
+                requested_duration=60,
+            )
+            for hour in (9, 11, 13)
+        ]
+        self.ids = [lesson_request.id for lesson_request in self.lesson_requests]
+        self.url = reverse('bulk_request_action')
+
+    def statuses(self):
+        return list(LessonRequest.objects.order_by('id').values_list('tutor', 'status'))
+
+    def test_assign_with_one_tutor_and_per_request_tutors(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.post(self.url, {
+            'action': 'assign',
+            'request_ids': self.ids,
+            'tutor': self.tutor_user.id,
+            f'tutor_{self.ids[2]}': self.other_tutor.id,
+        }, follow=True)
+        self.assertRedirects(response, reverse('student_requests'))
+        self.assertContains(response, "3 of 3 requests updated.")
+        self.assertEqual(self.statuses(), [
+            (self.tutor_user.id, 'Allocated'), (self.tutor_user.id, 'Allocated'), (self.other_tutor.id, 'Allocated'),
+        ])
+
+    def test_assign_without_a_tutor_changes_nothing(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.post(self.url, {'action': 'assign', 'request_ids': self.ids}, follow=True)
+        self.assertContains(response, "Choose a tutor for every request.")
+        self.assertEqual(self.statuses(), [(None, 'Unallocated')] * 3)
+
+    def test_clash_changes_nothing(self):
+        LessonRequest.objects.create(
+            student=self.student_user,
+            tutor=self.tutor_user,
+            status='Allocated',
+            requested_date="2025-01-06",
+            requested_time="13:30:00",
+            requested_duration=60,
+        )
+        self.client.force_login(self.admin_user)
+        response = self.client.post(
+            self.url, {'action': 'assign', 'request_ids': self.ids, 'tutor': self.tutor_user.id}, follow=True
+        )
+        self.assertContains(response, "the tutor is already booked")
+        self.assertContains(response, "1 problems found, so nothing was changed.")
+        self.assertEqual(LessonRequest.objects.filter(status='Allocated').count(), 1)
+
+    def test_unassign_and_cancel(self):
+        LessonRequest.objects.filter(id__in=self.ids).update(tutor=self.tutor_user, status='Allocated')
+        self.client.force_login(self.admin_user)
+        self.client.post(self.url, {'action': 'unassign', 'request_ids': self.ids[:2]})
+        self.client.post(self.url, {'action': 'cancel', 'request_ids': self.ids[1:]})
+        self.assertEqual(self.statuses(), [(None, 'Unallocated'), (None, 'Cancelled'), (None, 'Cancelled')])
+
+    def test_invalid_ids_are_rejected(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.post(self.url, {'action': 'cancel', 'request_ids': ['one']}, follow=True)
+        self.assertContains(response, "Enter a list of ids.")
+        self.assertEqual(self.statuses(), [(None, 'Unallocated')] * 3)
+
+    def test_non_admin_is_redirected(self):
+        self.client.force_login(self.student_user)
+        response = self.client.post(self.url, {'action': 'cancel', 'request_ids': self.ids})
+        self.assertRedirects(response, reverse('log_in'), fetch_redirect_response=False)
+        self.assertEqual(self.statuses(), [(None, 'Unallocated')] * 3)
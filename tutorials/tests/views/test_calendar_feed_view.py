@@ -0,0 +1,108 @@
+from datetime import date, time
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from tutorials.feeds import feed_token
+from tutorials.models import LessonRequest
+
+User = get_user_model()
+
+class CalendarFeedViewTest(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(
+            username="@tutor", email="tutor@example.com", first_name="Tu", last_name="Tor", role="tutor"
+        )
+        self.student = User.objects.create_user(
+            username="@student", email="student@example.com", first_name="Stu", last_name="Dent", role="student"
+        )
+        self.lesson_request = LessonRequest.objects.create(
+            student=self.student,
+            tutor=self.tutor,
+            status="Allocated",
+            requested_date=date(2025, 1, 6),
+            requested_time=time(10, 30),
+            requested_duration=90,
+            requested_frequency="fortnightly",
+            recurrence_count=3,
+            recurrence_exceptions=["2025-01-20"],
+        )
+        LessonRequest.objects.create(
+            student=self.student, status="Unallocated", requested_date=date(2025, 1, 7), requested_topic="ruby_on_rails"
+        )
+        self.url = reverse('calendar_feed', args=[feed_token(self.tutor)])
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_feed_lists_allocated_series_as_recurring_events(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        content = self._content(response)
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+        self.assertIn('DTSTART:20250106T103000\r\n', content)
+        self.assertIn('DURATION:PT90M\r\n', content)
+        self.assertIn('RRULE:FREQ=DAILY;INTERVAL=14;UNTIL=20250203T103000\r\n', content)
+        self.assertIn('EXDATE:20250120T103000\r\n', content)
+        self.assertIn('SUMMARY:Python Programming with Stu Dent\r\n', content)
+
+    def test_requests_without_a_date_are_left_off(self):
+        LessonRequest.objects.create(student=self.student, tutor=self.tutor, status="Allocated")
+        content = self._content(self.client.get(self.url))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 1)
+        self.assertTrue(content.endswith('END:VCALENDAR\r\n'))
+
+    def test_student_feed_names_the_tutor(self):
+        response = self.client.get(reverse('calendar_feed', args=[feed_token(self.student)]))
+        self.assertIn('SUMMARY:Python Programming with Tu Tor\r\n', self._content(response))
+
+    def test_invalid_token_is_not_found(self):
+        token = feed_token(self.tutor)
+        response = self.client.get(reverse('calendar_feed', args=[token[:-1] + ('A' if token[-1] != 'A' else 'B')]))
+        self.assertEqual(response.status_code, 404)
+        admin = User.objects.create_user(username="@admin", email="admin@example.com", role="admin")
+        response = self.client.get(reverse('calendar_feed', args=[feed_token(admin)]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_queries_do_not_grow_with_lessons(self):
+        LessonRequest.objects.bulk_create([
+            LessonRequest(
+                student=self.student, tutor=self.tutor, status="Allocated",
+                requested_date=date(2025, 3, 3 + day), recurrence_end=date(2025, 3, 3 + day),
+                requested_time=time(9), end_time=time(10),
+            )
+            for day in range(20)
+        ])
+        with self.assertNumQueries(3):
+            content = self._content(self.client.get(self.url))
+        self.assertEqual(content.count('BEGIN:VEVENT'), 21)
+
+    def test_matching_etag_returns_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(2):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_etag_changes_when_a_lesson_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.lesson_request.skip_occurrence(date(2025, 2, 3))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_a_lesson_is_cancelled(self):
+        etag = self.client.get(self.url)['ETag']
+        self.lesson_request.status = 'Cancelled'
+        self.lesson_request.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('BEGIN:VEVENT', self._content(response))
+
+    def test_timetable_links_to_feed(self):
+        self.client.force_login(self.tutor)
+        response = self.client.get(reverse('tutor_timetable'), {'year': 2025, 'month': 1})
+        self.assertContains(response, self.url)
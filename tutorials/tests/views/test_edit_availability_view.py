@@ -0,0 +1,44 @@
+from datetime import time
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from tutorials.availability import slot_ranges, week_mask
+from tutorials.models import TutorAvailability
+
+User = get_user_model()
+
+class EditAvailabilityViewTest(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(username="@tutor", email="tutor@example.com", role="tutor")
+        self.url = reverse('edit_availability')
+        self.client.force_login(self.tutor)
+
+    def test_form_shows_current_ranges(self):
+        TutorAvailability.objects.create(
+            tutor=self.tutor, slots=week_mask(0, time(9), time(12)) | week_mask(0, time(13), time.max)
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'edit_availability.html')
+        self.assertEqual(response.context['form']['monday'].initial, '09:00-12:00, 13:00-24:00')
+
+    def test_post_stores_ranges(self):
+        response = self.client.post(self.url, {'tuesday': '09:00-10:30, 14:00-15:00', 'sunday': '18:00-24:00'})
+        self.assertRedirects(response, self.url)
+        slots = TutorAvailability.objects.get(tutor=self.tutor).slots
+        self.assertEqual(list(slot_ranges(slots, 1)), [(time(9), time(10, 30)), (time(14), time(15))])
+        self.assertEqual(list(slot_ranges(slots, 6)), [(time(18), time.max)])
+        self.assertEqual(list(slot_ranges(slots, 0)), [])
+
+    def test_invalid_ranges_are_rejected(self):
+        response = self.client.post(self.url, {'monday': '9am-5pm', 'friday': '12:00-11:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('monday'))
+        self.assertTrue(response.context['form'].has_error('friday'))
+        self.assertEqual(TutorAvailability.objects.get(tutor=self.tutor).slots, 0)
+
+    def test_students_are_redirected(self):
+        student = User.objects.create_user(username="@student", email="student@example.com", role="student")
+        self.client.force_login(student)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
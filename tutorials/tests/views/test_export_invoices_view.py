@@ -0,0 +1,75 @@
+import csv
+import json
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tutorials.models import Invoice, LessonRequest
+
+User = get_user_model()
+
+@override_settings(HOURLY_RATE=10.00)
+class ExportInvoicesViewTest(TestCase):
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username="staff", email="staff@example.com", password="password", is_staff=True
+        )
+        self.non_staff_user = User.objects.create_user(
+            username="nonstaff", email="nonstaff@example.com", password="password"
+        )
+        self.student = User.objects.create_user(
+            username="student", email="student@example.com", first_name="Stu", last_name="Dent"
+        )
+        self.invoice = Invoice.objects.create(
+            student=self.student, invoice_num="INV001", due_date="2024-12-31", payment_status="Unpaid"
+        )
+        for requested_date in ("2024-10-01", "2025-02-01"):
+            LessonRequest.objects.create(
+                student=self.student,
+                status="Allocated",
+                requested_date=requested_date,
+                requested_duration=60,
+            )
+        Invoice.objects.create(
+            student=self.non_staff_user, invoice_num="INV002", due_date="2024-12-31", payment_status="Paid"
+        )
+        self.url = reverse('export_invoices')
+
+    def _rows(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return list(csv.DictReader(StringIO(content)))
+
+    def test_non_staff_user_forbidden(self):
+        self.client.login(username="nonstaff", password="password")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_csv_export_streams_one_row_per_line(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = self._rows(response)
+        self.assertEqual([row['invoice_num'] for row in rows], ["INV001", "INV001", "INV002"])
+        self.assertEqual(rows[0]['invoice_total'], '20.00')
+        self.assertEqual(rows[0]['line_amount'], '10.00')
+        self.assertEqual(rows[2]['line_amount'], '')
+
+    def test_jsonl_export(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(self.url, {'format': 'jsonl'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['student_last_name'], "Dent")
+
+    def test_filters_by_status_and_term(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(self.url, {'status': 'Unpaid', 'term': 'autumn'})
+        rows = self._rows(response)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['line_date'], '2024-10-01')
+
+    def test_unknown_format_rejected(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(self.url, {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
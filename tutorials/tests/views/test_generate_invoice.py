@@ -3,6 +3,7 @@ from datetime import date, datetime
 from django.utils import timezone
 from tutorials.models import Invoice, LessonRequest, User  # Use custom User model
 from django.conf import settings
+from tutorials.invoicing import sync_payment_status
 from tutorials.views import generate_invoice
 
 
@@ -106,10 +107,17 @@ class GenerateInvoiceTestCase(TestCase):
         # No lesson requests should be found
         self.assertEqual(len(lesson_requests), 0)
 
-        # Ensure the total is 0 and the payment status is 'Paid'
+        # Ensure the total is 0 and the payment status, synced by the pages, is 'Paid'
         self.assertEqual(total, 0)
+        sync_payment_status(new_invoice, new_invoice.total)
         self.assertEqual(new_invoice.payment_status, 'Paid')
 
+    def test_generate_invoice_only_reads(self):
+        """Test generate_invoice reads the lines without writing to the invoice."""
+        with self.assertNumQueries(1):
+            lesson_requests, total = generate_invoice(self.invoice)
+        self.assertEqual(total, 0)
+
     def test_generate_invoice_multiple_lessons(self):
         """Test generate_invoice with multiple lessons within a term."""
         term_start = timezone.make_aware(datetime.combine(date(2024, 9, 1), datetime.min.time()))
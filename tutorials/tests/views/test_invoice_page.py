@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from unittest.mock import patch
 from tutorials.models import User, Invoice, LessonRequest
@@ -51,3 +53,49 @@ class InvoicePageTests(TestCase):
         lesson_requests, total = generate_invoice(self.invoice, date(2024, 9, 1), date(2024, 12, 31))
         self.assertEqual(len(lesson_requests), 1)
         self.assertEqual(total, 20.00)  # Assuming £10/hour rate
+
+    def test_invoice_page_sends_validators(self):
+        response = self.client.get(reverse('invoice_page_term', args=["autumn"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_invoice_page_not_modified_for_matching_etag(self):
+        url = reverse('invoice_page_term', args=["autumn"])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invoice_page_etag_changes_with_lesson_data(self):
+        url = reverse('invoice_page_term', args=["autumn"])
+        etag = self.client.get(url)['ETag']
+        LessonRequest.objects.create(
+            student=self.student,
+            requested_date=date(2024, 10, 10),
+            requested_duration=60,
+            status="Allocated"
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invoice_page_does_not_write_when_status_unchanged(self):
+        LessonRequest.objects.create(
+            student=self.student,
+            requested_date=date(2024, 10, 10),
+            requested_duration=60,
+            status="Allocated"
+        )
+        url = reverse('invoice_page_term', args=["autumn"])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        writes = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "tutorials_invoice"')]
+        self.assertEqual(writes, [])
+
+    def test_invoice_page_outside_every_term_shows_latest_term(self):
+        response = self.client.get(reverse('invoice_page'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_invoice_page_unknown_term_is_not_found(self):
+        response = self.client.get(reverse('invoice_page_term', args=["winter"]))
+        self.assertEqual(response.status_code, 404)
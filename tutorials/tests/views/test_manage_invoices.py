@@ -1,3 +1,5 @@
+from unittest.mock import patch
+from django.conf import settings
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -74,7 +76,8 @@ class ManageInvoicesViewTest(TestCase):
             student=self.admin_user,  # Another student
             invoice_num="INV002",
             due_date="2024-11-30",
-            payment_status="Paid"
+            payment_status="Paid",
+            amount_paid=2 * settings.HOURLY_RATE  # Covers the lesson billed to it below
         )
 
         # Create associated LessonRequest data
@@ -142,3 +145,143 @@ class ManageInvoicesViewTest(TestCase):
         
         # Check that the response status is OK
         self.assertEqual(response.status_code, 200)
+
+    def test_invoice_totals_computed_for_each_invoice(self):
+        """
+        Test that each unpaid invoice is listed with its own total and line count.
+        """
+        self.client.login(username="staff", password="password")
+        Invoice.objects.create(
+            student=self.staff_user,
+            invoice_num="INV003",
+            due_date="2024-12-31",
+            payment_status="Unpaid"
+        )
+        for duration in (60, 90):
+            LessonRequest.objects.create(
+                student=self.staff_user,
+                requested_date="2024-12-20",
+                requested_duration=duration,
+                status="Allocated"
+            )
+        LessonRequest.objects.create(
+            student=self.staff_user,
+            requested_date="2024-12-21",
+            requested_duration=120,
+            status="Cancelled"
+        )
+
+        response = self.client.get(self.url)
+
+        data = response.context['invoice_data'][0]
+        self.assertEqual(data['line_count'], 2)
+        self.assertEqual(data['total'], 2.5 * settings.HOURLY_RATE)
+
+    def test_query_count_does_not_grow_with_invoices(self):
+        """
+        Test that the page runs a fixed number of queries regardless of invoice count.
+        """
+        self.client.login(username="staff", password="password")
+        for i in range(5):
+            student = get_user_model().objects.create_user(
+                username=f"student{i}",
+                email=f"student{i}@example.com",
+                password="password"
+            )
+            Invoice.objects.create(
+                student=student,
+                invoice_num=f"INV1{i:02d}",
+                due_date="2024-12-31",
+                payment_status="Unpaid"
+            )
+            LessonRequest.objects.create(
+                student=student,
+                requested_date="2024-12-20",
+                requested_duration=60,
+                status="Allocated"
+            )
+
+        # session, user, invoices with totals
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['invoice_data']), 5)
+
+    def _create_invoices(self, count):
+        invoices = []
+        for i in range(count):
+            student = get_user_model().objects.create_user(
+                username=f"pupil{i}",
+                email=f"pupil{i}@example.com",
+                first_name=f"Pupil{i}",
+                last_name="Smith" if i % 2 else "Jones",
+            )
+            invoices.append(Invoice.objects.create(
+                student=student,
+                invoice_num=f"INV2{i:02d}",
+                due_date=f"2024-12-{10 + i // 2:02d}",
+                payment_status="Unpaid"
+            ))
+            Invoice.objects.filter(id=invoices[-1].id).update(total=10 * (i + 1))
+        return invoices
+
+    def _invoice_nums(self, response):
+        return [data['invoice'].invoice_num for data in response.context['invoice_data']]
+
+    @patch('tutorials.views.admin.INVOICES_PER_PAGE', 2)
+    def test_pages_follow_due_date_then_id(self):
+        """
+        Test that following the next and previous links walks the invoices in order.
+        """
+        self.client.login(username="staff", password="password")
+        self._create_invoices(5)
+
+        response = self.client.get(self.url)
+        self.assertEqual(self._invoice_nums(response), ["INV200", "INV201"])
+        self.assertIsNone(response.context['previous_url'])
+
+        response = self.client.get(self.url + response.context['next_url'])
+        self.assertEqual(self._invoice_nums(response), ["INV202", "INV203"])
+
+        last = self.client.get(self.url + response.context['next_url'])
+        self.assertEqual(self._invoice_nums(last), ["INV204"])
+        self.assertIsNone(last.context['next_url'])
+
+        response = self.client.get(self.url + last.context['previous_url'])
+        self.assertEqual(self._invoice_nums(response), ["INV202", "INV203"])
+
+    @patch('tutorials.views.admin.INVOICES_PER_PAGE', 2)
+    def test_latest_due_first_sort(self):
+        self.client.login(username="staff", password="password")
+        self._create_invoices(5)
+        response = self.client.get(self.url, {'sort': '-due_date'})
+        self.assertEqual(self._invoice_nums(response), ["INV204", "INV203"])
+        self.assertIn('sort=-due_date', response.context['next_url'])
+        response = self.client.get(self.url + response.context['next_url'])
+        self.assertEqual(self._invoice_nums(response), ["INV202", "INV201"])
+
+    def test_filters_by_name_amount_and_overdue(self):
+        self.client.login(username="staff", password="password")
+        self._create_invoices(5)
+        Invoice.objects.filter(invoice_num="INV200").update(due_date="2999-01-01")
+
+        response = self.client.get(self.url, {'student': 'smith'})
+        self.assertEqual(self._invoice_nums(response), ["INV201", "INV203"])
+        response = self.client.get(self.url, {'min_total': '20', 'max_total': '40'})
+        self.assertEqual(self._invoice_nums(response), ["INV201", "INV202", "INV203"])
+        response = self.client.get(self.url, {'overdue': 'on'})
+        self.assertNotIn("INV200", self._invoice_nums(response))
+
+    def test_invalid_cursor_shows_first_page(self):
+        self.client.login(username="staff", password="password")
+        self._create_invoices(2)
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._invoice_nums(response), ["INV200", "INV201"])
+
+    @patch('tutorials.views.admin.INVOICES_PER_PAGE', 2)
+    def test_later_pages_run_the_same_queries(self):
+        self.client.login(username="staff", password="password")
+        self._create_invoices(6)
+        response = self.client.get(self.url)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url + response.context['next_url'])
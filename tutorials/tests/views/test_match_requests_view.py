@@ -0,0 +1,66 @@
+from datetime import time
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from tutorials.availability import week_mask
+from tutorials.models import LessonRequest, TutorAvailability
+
+User = get_user_model()
+
+class MatchRequestsViewTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username="@admin", email="admin@example.com", role="admin")
+        self.tutor_user = User.objects.create_user(
+            username="@tutor", email="tutor@example.com", role="tutor", expertise="Python"
+        )
+        TutorAvailability.objects.create(tutor=self.tutor_user, slots=week_mask(0, time(9), time(17)))
+        self.student_user = User.objects.create_user(username="@student", email="student@example.com", role="student")
+        self.lesson_request = LessonRequest.objects.create(
+            student=self.student_user,
+            requested_date="2025-01-06",
+            requested_time="10:00:00",
+            requested_duration=60,
+        )
+        self.url = reverse('match_requests')
+
+    def test_admin_post_allocates_requests(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.post(self.url, follow=True)
+        self.assertRedirects(response, reverse('student_requests'))
+        self.assertContains(response, "1 requests allocated, 0 left without a free tutor.")
+        self.lesson_request.refresh_from_db()
+        self.assertEqual((self.lesson_request.status, self.lesson_request.tutor), ('Allocated', self.tutor_user))
+
+    def test_tutors_without_availability_are_reported(self):
+        User.objects.create_user(username="@unavailable", email="unavailable@example.com", role="tutor", expertise="Python")
+        self.client.force_login(self.admin_user)
+        response = self.client.post(self.url, follow=True)
+        self.assertContains(response, "1 tutors skipped: no availability recorded.")
+
+    def test_tutors_without_availability_can_be_assumed_free(self):
+        TutorAvailability.objects.all().delete()
+        LessonRequest.objects.create(
+            student=self.student_user, tutor=self.tutor_user, status='Allocated',
+            requested_date="2025-01-06", requested_time="10:00:00", requested_duration=60,
+        )
+        LessonRequest.objects.create(
+            student=self.student_user, requested_date="2025-01-06", requested_time="12:00:00", requested_duration=60,
+        )
+        self.client.force_login(self.admin_user)
+        response = self.client.post(self.url, {'assume_available': 'on'}, follow=True)
+        self.assertContains(response, "1 requests allocated, 1 left without a free tutor.")
+        self.assertNotContains(response, "tutors skipped")
+
+    def test_get_changes_nothing(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('student_requests'))
+        self.lesson_request.refresh_from_db()
+        self.assertEqual(self.lesson_request.status, 'Unallocated')
+
+    def test_non_admin_is_redirected(self):
+        self.client.force_login(self.student_user)
+        response = self.client.post(self.url)
+        self.assertRedirects(response, reverse('log_in'), fetch_redirect_response=False)
+        self.lesson_request.refresh_from_db()
+        self.assertEqual(self.lesson_request.status, 'Unallocated')
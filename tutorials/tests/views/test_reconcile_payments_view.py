@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from tutorials.models import Invoice
+
+User = get_user_model()
+
+class ReconcilePaymentsViewTest(TestCase):
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username="staff", email="staff@example.com", password="password", is_staff=True
+        )
+        self.non_staff_user = User.objects.create_user(
+            username="nonstaff", email="nonstaff@example.com", password="password"
+        )
+        Invoice.objects.create(
+            student=self.non_staff_user, invoice_num="INV001", due_date="2024-12-31", payment_status="Unpaid"
+        )
+        Invoice.objects.filter(invoice_num="INV001").update(total=25)
+        self.url = reverse('reconcile_payments')
+
+    def _statement(self):
+        return SimpleUploadedFile(
+            "statement.csv",
+            b"Reference,Amount,Date\nINV001,25.00,2024-11-01\nINV404,10.00,2024-11-01\n",
+            content_type="text/csv",
+        )
+
+    def test_non_staff_user_forbidden(self):
+        self.client.login(username="nonstaff", password="password")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_get_shows_upload_form(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'reconcile_payments.html')
+        self.assertIsNone(response.context['report'])
+
+    def test_upload_reconciles_and_reports(self):
+        self.client.login(username="staff", password="password")
+        response = self.client.post(self.url, {'statement': self._statement()})
+        report = response.context['report']
+        self.assertEqual(report.matched, 1)
+        self.assertEqual([issue.reference for issue in report.unmatched], ["INV404"])
+        self.assertContains(response, "INV404")
+        self.assertEqual(Invoice.objects.get(invoice_num="INV001").payment_status, "Paid")
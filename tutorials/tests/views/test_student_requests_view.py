@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -60,9 +61,9 @@ class StudentRequestsViewTestCase(TestCase):
         self.assertIn(self.student_user, students_with_requests)
         self.assertEqual(len(students_with_requests[self.student_user]), 1)  # One request
 
-        # Check the tutors context
-        tutors = response.context["tutors"]
-        self.assertIn(self.tutor_user, tutors)
+        # Tutors are searched for on demand rather than listed on the page
+        self.assertNotIn("tutors", response.context)
+        self.assertNotContains(response, f'<option value="{self.tutor_user.id}"')
 
     def test_no_lesson_requests(self):
         """Test that the view handles the case where there are no lesson requests."""
@@ -74,3 +75,88 @@ class StudentRequestsViewTestCase(TestCase):
 
         students_with_requests = response.context["students_with_requests"]
         self.assertEqual(len(students_with_requests), 0)  # No students with requests
+
+    def test_topic_tutor_counts(self):
+        """Test that the page counts the tutors qualified for each topic."""
+        self.tutor_user.expertise = "Python, Rails"
+        self.tutor_user.save()
+        self.client.login(username="admin1", password="Password123")
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["topic_tutor_counts"], [
+            ("Python Programming", 1),
+            ("Web Development with JavaScript", 0),
+            ("Ruby on Rails", 1),
+            ("AI and Machine Learning", 0),
+        ])
+
+    def _create_students(self, count):
+        """Create students with one request each, named so their usernames sort in order."""
+        students = []
+        for i in range(count):
+            students.append(User.objects.create_user(
+                username=f"student{i + 2}", email=f"student{i + 2}@example.com", role="student",
+            ))
+            LessonRequest.objects.create(
+                student=students[-1],
+                status="Cancelled" if i % 2 else "Unallocated",
+                requested_topic="ruby_on_rails" if i % 2 else "python_programming",
+                requested_date=f"2024-02-{i + 1:02d}",
+                requested_time="10:00:00",
+                requested_duration=60,
+            )
+        return students
+
+    def _usernames(self, response):
+        return [student.username for student in response.context["students_with_requests"]]
+
+    @patch('tutorials.views.admin.STUDENTS_PER_PAGE', 2)
+    def test_pages_by_student(self):
+        """Test that following the next and previous links walks the students in username order."""
+        self._create_students(3)
+        self.client.login(username="admin1", password="Password123")
+
+        response = self.client.get(self.url)
+        self.assertEqual(self._usernames(response), ["student1", "student2"])
+        self.assertIsNone(response.context["previous_url"])
+
+        last = self.client.get(self.url + response.context["next_url"])
+        self.assertEqual(self._usernames(last), ["student3", "student4"])
+        self.assertIsNone(last.context["next_url"])
+
+        response = self.client.get(self.url + last.context["previous_url"])
+        self.assertEqual(self._usernames(response), ["student1", "student2"])
+
+    def test_filters_by_status_topic_and_date(self):
+        """Test that filters keep only matching requests and the students who have them."""
+        self._create_students(3)
+        self.client.login(username="admin1", password="Password123")
+
+        response = self.client.get(self.url, {"status": "Cancelled"})
+        self.assertEqual(self._usernames(response), ["student3"])
+        response = self.client.get(self.url, {"topic": "python_programming"})
+        self.assertEqual(self._usernames(response), ["student2", "student4"])
+        response = self.client.get(self.url, {"date_from": "2024-02-02", "date_to": "2024-02-03"})
+        self.assertEqual(self._usernames(response), ["student3", "student4"])
+
+    def test_facets_count_under_the_other_filters(self):
+        """Test that each facet counts requests under every filter but its own."""
+        self._create_students(3)
+        self.client.login(username="admin1", password="Password123")
+        response = self.client.get(self.url, {"status": "Cancelled"})
+
+        status_counts = {label: count for label, count, _, _ in response.context["status_facets"]}
+        self.assertEqual(status_counts, {"Unallocated": 3, "Allocated": 0, "Cancelled": 1})
+        topic_counts = {label: count for label, count, _, _ in response.context["topic_facets"]}
+        self.assertEqual(topic_counts["Ruby on Rails"], 1)
+        self.assertEqual(topic_counts["Python Programming"], 0)
+
+    @patch('tutorials.views.admin.STUDENTS_PER_PAGE', 2)
+    def test_later_pages_run_the_same_queries(self):
+        """Test that a page's queries do not grow with the students before it."""
+        self._create_students(6)
+        self.client.login(username="admin1", password="Password123")
+        first = self.client.get(self.url)
+        with self.assertNumQueries(6):
+            self.client.get(self.url)
+        with self.assertNumQueries(6):
+            self.client.get(self.url + first.context["next_url"])
@@ -0,0 +1,87 @@
+from datetime import date, time
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from tutorials.models import LessonRequest
+
+User = get_user_model()
+
+class TimetableLessonsViewTest(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(
+            username="@tutor", email="tutor@example.com", first_name="Tu", last_name="Tor", role="tutor"
+        )
+        self.student = User.objects.create_user(
+            username="@student", email="student@example.com", first_name="Stu", last_name="Dent", role="student"
+        )
+        self.lesson_request = LessonRequest.objects.create(
+            student=self.student,
+            tutor=self.tutor,
+            status="Allocated",
+            requested_date=date(2025, 1, 6),
+            requested_time=time(10, 30),
+            requested_duration=90,
+            recurrence_count=4,
+        )
+        self.url = reverse('timetable_lessons')
+        self.client.force_login(self.tutor)
+
+    def test_range_is_half_open(self):
+        response = self.client.get(self.url, {'start': '2025-01-06', 'end': '2025-01-20'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'start': '2025-01-06',
+            'end': '2025-01-20',
+            'fields': ['date', 'start', 'end', 'topic', 'with'],
+            'lessons': [
+                ['2025-01-06', '10:30', '12:00', 'python_programming', 'Stu Dent'],
+                ['2025-01-13', '10:30', '12:00', 'python_programming', 'Stu Dent'],
+            ],
+        })
+
+    def test_fields_select_columns(self):
+        response = self.client.get(self.url, {'start': '2025-01-20', 'end': '2025-02-01', 'fields': 'date,start'})
+        self.assertEqual(response.json()['lessons'], [['2025-01-20', '10:30'], ['2025-01-27', '10:30']])
+
+    def test_student_sees_their_tutor(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, {'start': '2025-01-06', 'end': '2025-01-07', 'fields': 'with'})
+        self.assertEqual(response.json()['lessons'], [['Tu Tor']])
+
+    def test_invalid_ranges_and_fields_are_rejected(self):
+        for params in (
+            {'start': '2025-01-06'},
+            {'start': '2025-01-06', 'end': '2025-01-06'},
+            {'start': '2025-01-01', 'end': '2025-12-31'},
+            {'start': '2025-01-06', 'end': '2025-01-20', 'fields': 'date,price'},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('errors', response.json())
+
+    def test_admin_is_forbidden(self):
+        admin = User.objects.create_user(username="@admin", email="admin@example.com", role="admin")
+        self.client.force_login(admin)
+        response = self.client.get(self.url, {'start': '2025-01-06', 'end': '2025-01-20'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_unchanged_range_is_not_modified(self):
+        params = {'start': '2025-01-06', 'end': '2025-01-20'}
+        etag = self.client.get(self.url, params)['ETag']
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        other_fields = self.client.get(self.url, {**params, 'fields': 'date'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other_fields.status_code, 200)
+
+        self.lesson_request.skip_occurrence(date(2025, 1, 13))
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['lessons']), 1)
+
+    def test_ranges_without_lessons_ignore_unrelated_changes(self):
+        params = {'start': '2025-03-03', 'end': '2025-03-10'}
+        etag = self.client.get(self.url, params)['ETag']
+        self.lesson_request.skip_occurrence(date(2025, 1, 13))
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -1,8 +1,10 @@
 from datetime import date, time, timedelta
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from tutorials.models import LessonRequest
+from tutorials.models import Lesson, LessonRequest
+from tutorials.timetables import bucket_lessons_by_day
+from tutorials.views import timetable_view
 
 User = get_user_model()
 
@@ -74,4 +76,95 @@ class TutorTimetableTestCase(TestCase):
                     self.assertEqual(lesson['notes'], "Math Lesson")
                     self.assertEqual(lesson['student'], f"{self.student_user.first_name} {self.student_user.last_name}")
 
-        self.assertTrue(found_today)
\ No newline at end of file
+        self.assertTrue(found_today)
+
+class RecurringTimetableTestCase(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(
+            username='@tutor', email='tutor@example.com', password='Password123', role='tutor',
+            first_name='Tu', last_name='Tor'
+        )
+        self.student = User.objects.create_user(
+            username='@student', email='student@example.com', password='Password123', role='student',
+            first_name='Stu', last_name='Dent'
+        )
+        LessonRequest.objects.create(
+            tutor=self.tutor,
+            student=self.student,
+            requested_date=date(2025, 1, 27),
+            requested_time=time(10, 0),
+            requested_duration=60,
+            requested_frequency='fortnightly',
+            status='Allocated'
+        )
+
+    def _lesson_days(self, response):
+        return [day['date'] for week in response.context['month_days'] for day in week if day.get('lessons')]
+
+    def test_tutor_sees_each_lesson_of_the_series_in_a_later_month(self):
+        self.client.login(username='@tutor', password='Password123')
+        response = self.client.get(reverse('tutor_timetable'), {'year': 2025, 'month': 3})
+        self.assertEqual(self._lesson_days(response), [date(2025, 3, 10), date(2025, 3, 24)])
+
+    def test_student_sees_nothing_after_the_series_ends(self):
+        self.client.login(username='@student', password='Password123')
+        response = self.client.get(reverse('student_timetable'), {'year': 2025, 'month': 7})
+        self.assertEqual(self._lesson_days(response), [])
+        response = self.client.get(reverse('student_timetable'), {'year': 2025, 'month': 2})
+        self.assertEqual(len(self._lesson_days(response)), 2)
+
+    def test_month_query_count_does_not_grow_with_history(self):
+        for weeks_ago in range(1, 30):
+            LessonRequest.objects.create(
+                tutor=self.tutor,
+                student=self.student,
+                requested_date=date(2024, 1, 1) + timedelta(weeks=weeks_ago),
+                requested_time=time(15, 0),
+                recurrence_count=1,
+                status='Allocated'
+            )
+        self.client.login(username='@tutor', password='Password123')
+        # session, user, the month's series
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tutor_timetable'), {'year': 2025, 'month': 3})
+        self.assertEqual(self._lesson_days(response), [date(2025, 3, 10), date(2025, 3, 24)])
+
+
+class LessonTimetableViewTestCase(TestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(
+            username='@tutor', email='tutor@example.com', role='tutor', first_name='Tu', last_name='Tor'
+        )
+        self.student = User.objects.create_user(
+            username='@student', email='student@example.com', role='student', first_name='Stu', last_name='Dent'
+        )
+        for day, hour in [(3, 14), (3, 9), (17, 10), (28, 11)]:
+            Lesson.objects.create(
+                tutor=self.tutor, student=self.student, date=date(2025, 3, day), time=time(hour, 0),
+                duration=60, topic='Python'
+            )
+        Lesson.objects.create(
+            tutor=self.tutor, student=self.student, date=date(2025, 4, 1), time=time(9, 0),
+            duration=60, topic='Python'
+        )
+        self.factory = RequestFactory()
+
+    def _get(self, user):
+        request = self.factory.get('/timetable/', {'year': 2025, 'month': 3})
+        request.user = user
+        return timetable_view(request)
+
+    def test_month_renders_in_one_query(self):
+        for user in (self.tutor, self.student):
+            with self.assertNumQueries(1):
+                response = self._get(user)
+            self.assertEqual(response.status_code, 200)
+
+    def test_lessons_are_bucketed_by_day_in_time_order(self):
+        lessons = Lesson.objects.filter(date__month=3).select_related('student', 'tutor').order_by('date', 'time')
+        days = bucket_lessons_by_day(lessons)
+        self.assertEqual(sorted(days), [date(2025, 3, 3), date(2025, 3, 17), date(2025, 3, 28)])
+        self.assertEqual([lesson['start_time'] for lesson in days[date(2025, 3, 3)]], [time(9, 0), time(14, 0)])
+        self.assertEqual(days[date(2025, 3, 3)][0]['end_time'], time(10, 0))
+        self.assertContains(self._get(self.student), 'Python', count=4)
+
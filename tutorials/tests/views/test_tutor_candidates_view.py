@@ -0,0 +1,113 @@
+from datetime import time
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from tutorials import matching
+from tutorials.availability import FreeBusy, week_mask
+from tutorials.models import LessonRequest, TutorAvailability
+
+User = get_user_model()
+
+class TutorCandidatesViewTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username="@admin", email="admin@example.com", role="admin")
+        self.student_user = User.objects.create_user(username="@student", email="student@example.com", role="student")
+        self.free_tutor = self.tutor("@free", "Free", "Python", week_mask(0, time(9), time(17)))
+        self.busy_tutor = self.tutor("@busy", "Busy", "Python", week_mask(0, time(9), time(17)))
+        self.ruby_tutor = self.tutor("@ruby", "Ruby", "Ruby on Rails", week_mask(0, time(9), time(17)))
+        LessonRequest.objects.create(
+            student=self.student_user,
+            tutor=self.busy_tutor,
+            status='Allocated',
+            requested_date="2025-01-06",
+            requested_time="10:00:00",
+            requested_duration=60,
+        )
+        self.lesson_request = LessonRequest.objects.create(
+            student=self.student_user,
+            requested_topic='python_programming',
+            requested_date="2025-01-06",
+            requested_time="10:00:00",
+            requested_duration=60,
+        )
+        self.url = reverse('tutor_candidates', args=[self.lesson_request.id])
+
+    def tutor(self, username, first_name, expertise, slots):
+        tutor = User.objects.create_user(
+            username=username, email=f"{username[1:]}@example.com", role="tutor",
+            first_name=first_name, last_name="Tutor", expertise=expertise,
+        )
+        TutorAvailability.objects.create(tutor=tutor, slots=slots)
+        return tutor
+
+    def test_qualified_tutors_are_ranked_free_first(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['candidates'], [
+            {'id': self.free_tutor.id, 'name': "Free Tutor", 'qualified': True, 'free': True, 'load': 0},
+            {'id': self.busy_tutor.id, 'name': "Busy Tutor", 'qualified': True, 'free': False, 'load': 1},
+        ])
+
+    def test_tutors_without_availability_are_not_reported_busy(self):
+        self.client.force_login(self.admin_user)
+        unset = User.objects.create_user(
+            username="@unset", email="unset@example.com", role="tutor",
+            first_name="Unset", last_name="Tutor", expertise="Python",
+        )
+        response = self.client.get(self.url)
+        self.assertEqual([(c['id'], c['free']) for c in response.json()['candidates']], [
+            (self.free_tutor.id, True), (unset.id, None), (self.busy_tutor.id, False),
+        ])
+
+    def test_search_finds_tutors_outside_the_topic(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(self.url, {'q': 'ruby'})
+        self.assertEqual(response.json()['candidates'], [
+            {'id': self.ruby_tutor.id, 'name': "Ruby Tutor", 'qualified': False, 'free': True, 'load': 0},
+        ])
+
+    def test_limit_caps_the_candidates(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(self.url, {'q': 'tutor', 'limit': 1})
+        self.assertEqual([candidate['id'] for candidate in response.json()['candidates']], [self.free_tutor.id])
+
+    def test_search_reads_bookings_of_a_bounded_pool(self):
+        self.client.force_login(self.admin_user)
+        for i in range(10):
+            self.tutor(f"@extra{i}", f"Extra{i}", "Python", week_mask(0, time(9), time(17)))
+        with patch('tutorials.matching.FreeBusy', wraps=FreeBusy) as free_busy:
+            response = self.client.get(self.url, {'q': 'e', 'limit': 1})
+        [candidate] = response.json()['candidates']
+        self.assertTrue(candidate['qualified'] and candidate['free'])
+        self.assertEqual(len(free_busy.call_args.kwargs['tutors']), matching.CANDIDATE_POOL_FACTOR)
+
+    def test_search_without_a_request_ranks_all_tutors_by_load(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse('tutor_search'), {'q': 'tutor', 'limit': 2})
+        self.assertEqual(response.json()['candidates'], [
+            {'id': self.free_tutor.id, 'name': "Free Tutor", 'qualified': None, 'free': None, 'load': 0},
+            {'id': self.ruby_tutor.id, 'name': "Ruby Tutor", 'qualified': None, 'free': None, 'load': 0},
+        ])
+
+    def test_search_without_a_request_is_one_query(self):
+        self.client.force_login(self.admin_user)
+        self.tutor("@extra", "Extra", "Python", 0)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('tutor_search'))
+
+    def test_invalid_limit_is_rejected(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(self.url, {'limit': 'many'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_admin_is_forbidden(self):
+        self.client.force_login(self.student_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_request_is_not_found(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse('tutor_candidates', args=[0]))
+        self.assertEqual(response.status_code, 404)
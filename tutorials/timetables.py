@@ -0,0 +1,149 @@
+"""Month grids shared by the tutor and student timetables."""
+from calendar import Calendar, MONDAY, monthrange
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from hashlib import md5
+from operator import itemgetter
+from types import MappingProxyType
+from django.db.models import Count, Max
+from tutorials.models import LessonRequest
+
+MONTH_CACHE_SIZE = 256
+NO_LESSONS = ()
+TIMETABLE_FIELDS = ('date', 'start', 'end', 'topic', 'with')
+
+
+def month_bounds(year, month):
+    """Return the first and last dates of a month."""
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+@lru_cache(maxsize=MONTH_CACHE_SIZE)
+def month_skeleton(year, month, firstweekday=MONDAY):
+    """
+    Return a month as a tuple of weeks, each a tuple of seven dates, with None for the days
+    padding the first and last weeks. Skeletons never change, so they are cached per
+    (year, month, firstweekday) and shared between requests.
+    """
+    return tuple(
+        tuple(day if day.month == month else None for day in week)
+        for week in Calendar(firstweekday).monthdatescalendar(year, month)
+    )
+
+
+def month_grid(year, month, lessons_by_day, firstweekday=MONDAY):
+    """
+    Return a month as a list of weeks, each a list of seven {'date', 'lessons'} days.
+    Lessons are looked up on the cached skeleton, which is read but never copied or changed.
+    - lessons_by_day: A mapping of dates to the lessons to show on them.
+    """
+    return [
+        [{'date': day, 'lessons': lessons_by_day.get(day, NO_LESSONS)} for day in week]
+        for week in month_skeleton(year, month, firstweekday)
+    ]
+
+
+@lru_cache(maxsize=MONTH_CACHE_SIZE)
+def month_navigation(year, month):
+    """Return the template context naming a month and linking to the months either side."""
+    prev_month = month - 1 or 12
+    next_month = month % 12 + 1
+    return MappingProxyType({
+        'month_name': date(year, month, 1).strftime('%B'),
+        'year': year,
+        'month': month,
+        'prev_month': prev_month,
+        'prev_year': year - 1 if prev_month == 12 else year,
+        'next_month': next_month,
+        'next_year': year + 1 if next_month == 1 else year,
+    })
+
+
+def bucket_lessons_by_day(lessons):
+    """
+    Bucket Lesson rows by date into the dicts the timetable templates show.
+    The lessons should come from one ranged query with their tutor and student selected.
+    """
+    days = {}
+    for lesson in lessons:
+        end = datetime.combine(lesson.date, lesson.time) + timedelta(minutes=lesson.duration)
+        days.setdefault(lesson.date, []).append({
+            'notes': lesson.topic,
+            'start_time': lesson.time,
+            'end_time': end.time(),
+            'tutor': f"{lesson.tutor.first_name} {lesson.tutor.last_name}",
+            'student': f"{lesson.student.first_name} {lesson.student.last_name}",
+        })
+    return days
+
+
+def allocated_requests(user, role=None):
+    """Return the allocated lesson requests a tutor or student has, as `role` or else their own role."""
+    return LessonRequest.objects.filter(**{role or user.role: user}, status='Allocated', tutor__isnull=False)
+
+
+def timetable_validators(requests, user, *variant):
+    """
+    Return an (etag, last_modified) pair for a page of `requests` from one aggregate query.
+    Every change to a request touches its `updated_at`, and a request leaving the page changes
+    the count, so a poll can be answered without the lessons being read.
+    - variant: Anything else the page depends on, such as its date range or layout.
+    """
+    summary = requests.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_modified = summary['last_modified'] or user.date_joined
+    parts = [user.pk, user.role, summary['count'], last_modified.isoformat(), *variant]
+    etag = md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return etag, last_modified
+
+
+def allocated_lessons_by_day(user, role, start, end):
+    """
+    Return a tutor's or student's allocated lessons between `start` and `end`, bucketed by date.
+    Only series reaching into the window are fetched, in one query that skips series which ended
+    before it on the user/status/recurrence_end index, and each is expanded over the window
+    alone, so the cost follows what is on screen rather than the user's history.
+    - role: 'tutor' or 'student', the side of the lessons `user` is on.
+    """
+    counterpart = 'student' if role == 'tutor' else 'tutor'
+    requests = allocated_requests(user, role).touching(start, end).select_related(counterpart).only(
+        'requested_topic', 'requested_date', 'requested_time', 'requested_duration', 'requested_frequency',
+        'end_time', 'recurrence_count', 'recurrence_until', 'recurrence_exceptions', 'recurrence_end',
+        f'{counterpart}__first_name', f'{counterpart}__last_name',
+    ).order_by()
+
+    days = {}
+    for lesson in requests:
+        other = getattr(lesson, counterpart)
+        for day in lesson.occurrence_dates(start, end):
+            days.setdefault(day, []).append({
+                'notes': lesson.requested_topic,
+                'start_time': lesson.requested_time,
+                'end_time': lesson.end_time,
+                counterpart: f"{other.first_name} {other.last_name}",
+            })
+    for lessons in days.values():
+        lessons.sort(key=itemgetter('start_time'))
+    return days
+
+
+def lesson_rows(user, start, end, fields=TIMETABLE_FIELDS):
+    """
+    Return a user's allocated lessons in the half-open range [start, end) as compact rows,
+    each a list of the values of `fields` in order, sorted by date and start time.
+    - fields: Names from TIMETABLE_FIELDS; 'with' is the tutor's or student's counterpart.
+    """
+    counterpart = 'student' if user.role == 'tutor' else 'tutor'
+    days = allocated_lessons_by_day(user, user.role, start, end - timedelta(days=1))
+    values = {
+        'date': lambda day, lesson: day.isoformat(),
+        'start': lambda day, lesson: lesson['start_time'].isoformat(timespec='minutes'),
+        'end': lambda day, lesson: lesson['end_time'].isoformat(timespec='minutes'),
+        'topic': lambda day, lesson: lesson['notes'],
+        'with': lambda day, lesson: lesson[counterpart],
+    }
+    getters = [values[field] for field in fields]
+    return [
+        [value(day, lesson) for value in getters]
+        for day in sorted(days)
+        for lesson in days[day]
+    ]
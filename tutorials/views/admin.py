@@ -1,3 +1,5 @@
+from io import TextIOWrapper
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect, render
@@ -5,15 +7,25 @@ from django.shortcuts import render
 from django.shortcuts import render
 from tutorials.models import User, Invoice
 
-from tutorials.models import LessonRequest
+from tutorials.models import LessonRequest, Topic
 from django.shortcuts import get_object_or_404, redirect
 from tutorials.models import ContactMessage
-from tutorials.forms import AdminReplyBack
+from tutorials.forms import AdminReplyBack, BankStatementForm, BulkRequestActionForm, InvoiceFilterForm, StudentRequestFilterForm
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef
 from django.utils.timezone import now
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 
+from tutorials.exports import EXPORT_FORMATS, export_lines, export_rows
+from tutorials.helpers import not_modified_response, add_validators, keyset_page
+from tutorials import allocation, matching, reconciliation
+from tutorials.invoicing import payment_status_for, invoice_validators, sync_payment_status
 from .common import generate_invoice
 
+INVOICES_PER_PAGE = 50
+STUDENTS_PER_PAGE = 20
+BULK_ERRORS_SHOWN = 10
+
 @login_required
 def admin_dashboard(request):
     """Admin-specific dashboard."""
@@ -24,7 +36,13 @@ def admin_invoice_view(request, invoice_num):
     if not request.user.is_staff:
         return HttpResponseForbidden("You are not authorized to access this page.")
 
-    invoice = get_object_or_404(Invoice, invoice_num=invoice_num)
+    invoice = get_object_or_404(Invoice.objects.select_related('student'), invoice_num=invoice_num)
+
+    sync_payment_status(invoice, invoice.total)
+    etag, last_modified = invoice_validators(invoice, request.user.role)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
 
     lesson_requests, total = generate_invoice(invoice)
 
@@ -35,13 +53,14 @@ def admin_invoice_view(request, invoice_num):
 
     base_template = 'dashboard_base_admin.html' if request.user.role == 'admin' else 'dashboard_base_student.html'
 
-    return render(request, 'invoice_page.html', {
+    response = render(request, 'invoice_page.html', {
         'invoice': invoice,
         'lesson_requests': lesson_requests,
         'total': total,
         'is_admin': True,  
         'base_template' : base_template,
     })
+    return add_validators(response, etag, last_modified)
 
 @login_required
 def assign_tutor(request, lesson_request_id):
@@ -51,12 +70,86 @@ def assign_tutor(request, lesson_request_id):
 
         if tutor_id:
             tutor = get_object_or_404(User, id=tutor_id, role='tutor')
-            lesson_request.tutor = tutor
-            lesson_request.status = 'Allocated'
-            lesson_request.save()
+            try:
+                allocation.allocate(lesson_request, tutor)
+            except ValidationError as e:
+                messages.error(request, ' '.join(e.messages))
 
         return redirect('student_requests') 
     
+@login_required
+def match_requests(request):
+    """Allocate every unallocated request to the best free, qualified tutor in one go."""
+    if request.user.role != 'admin':
+        return redirect('log_in')
+    if request.method == 'POST':
+        report = matching.match_requests(assume_available=bool(request.POST.get('assume_available')))
+        messages.success(
+            request,
+            f"{report.matched} requests allocated, {len(report.unmatched)} left without a free tutor.",
+        )
+        if report.unavailable:
+            messages.warning(
+                request,
+                f"{len(report.unavailable)} tutors skipped: no availability recorded. Ask them to set their "
+                f"availability, or match again treating tutors without it as free.",
+            )
+    return redirect('student_requests')
+
+@login_required
+def bulk_request_action(request):
+    """Assign tutors to, unassign or cancel many lesson requests in one transaction."""
+    if request.user.role != 'admin':
+        return redirect('log_in')
+    if request.method != 'POST':
+        return redirect('student_requests')
+
+    form = BulkRequestActionForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('student_requests')
+
+    action = form.cleaned_data['action']
+    request_ids = form.cleaned_data['request_ids']
+    try:
+        if action == 'assign':
+            changed = allocation.assign_requests(form.cleaned_data['assignments'])
+        else:
+            changed = allocation.release_requests(request_ids, 'Cancelled' if action == 'cancel' else 'Unallocated')
+    except ValidationError as e:
+        for error in e.messages[:BULK_ERRORS_SHOWN]:
+            messages.error(request, error)
+        messages.error(request, f"{len(e.messages)} problems found, so nothing was changed.")
+        return redirect('student_requests')
+
+    messages.success(request, f"{changed} of {len(request_ids)} requests updated.")
+    return redirect('student_requests')
+
+@login_required
+def tutor_candidates(request, lesson_request_id=None):
+    """
+    Return a short, ranked list of tutors as JSON, optionally searched by name: candidates for a
+    lesson request, or the least loaded tutors of all when no request is given.
+    """
+    if request.user.role != 'admin':
+        return JsonResponse({'error': "Only admins can assign tutors."}, status=403)
+    lesson_request = None
+    if lesson_request_id is not None:
+        lesson_request = get_object_or_404(LessonRequest, id=lesson_request_id)
+    try:
+        limit = min(max(int(request.GET.get('limit', matching.CANDIDATE_LIMIT)), 1), 50)
+    except ValueError:
+        return JsonResponse({'error': "The limit must be a number."}, status=400)
+
+    search = request.GET.get('q', '').strip()
+    if lesson_request is None:
+        candidates = matching.search_tutors(search, limit)
+    else:
+        candidates = matching.tutor_candidates(lesson_request, search, limit)
+    return JsonResponse({'candidates': [candidate._asdict() for candidate in candidates]})
+
 @login_required
 def unassign_tutor(request, lesson_request_id):
     if request.method == 'POST':
@@ -142,23 +235,56 @@ def admin_reply(request, message_id):
 
 @login_required
 def student_requests(request):
+    """
+    Show the admin's queue of lesson requests, a page of students at a time.
+    Students are paged by username with a keyset cursor and requests are filtered in SQL,
+    so only the page's requests are read however much history has built up.
+    """
     if request.user.role != 'admin':  
         return redirect('log_in')  
-    lesson_requests = LessonRequest.objects.select_related('student').order_by('student')
-    students_with_requests = {}
-    for req in lesson_requests:
-        if req.student not in students_with_requests:
-            students_with_requests[req.student] = []
+    form = StudentRequestFilterForm(request.GET)
+    filters = form.cleaned_data if form.is_valid() else {}
+    lesson_requests = form.filter(LessonRequest.objects.all())
+
+    students = User.objects.filter(Exists(lesson_requests.filter(student=OuterRef('pk'))))
+    page, previous_cursor, next_cursor = keyset_page(
+        students,
+        'username',
+        after=filters.get('after'),
+        before=filters.get('before'),
+        per_page=STUDENTS_PER_PAGE,
+    )
+    students_with_requests = {student: [] for student in page}
+    by_id = {student.id: student for student in page}
+    for req in lesson_requests.filter(student__in=page).select_related('tutor').order_by('id'):
+        req.student = by_id[req.student_id]
         students_with_requests[req.student].append(req)
 
-    tutors = User.objects.filter(role='tutor')  
+    tutor_counts = Topic.objects.tutor_counts()
+    facets = form.facets(LessonRequest.objects.all())
 
     context = {
         'students_with_requests': students_with_requests,
-        'tutors': tutors,
+        'topic_tutor_counts': [(label, tutor_counts[topic]) for topic, label in LessonRequest.TOPIC_CHOICES],
+        'form': form,
+        'status_facets': _facet_links(request, 'status', LessonRequest.STATUS_CHOICES, facets['status']),
+        'topic_facets': _facet_links(request, 'topic', LessonRequest.TOPIC_CHOICES, facets['topic']),
+        'previous_url': _page_url(request, 'before', previous_cursor),
+        'next_url': _page_url(request, 'after', next_cursor),
     }
     return render(request, 'student_requests.html', context)
 
+def _facet_links(request, name, choices, counts):
+    """Return (label, count, query string, selected) for each value of a facet, keeping the other filters."""
+    links = []
+    for value, label in choices:
+        params = request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[name] = value
+        links.append((label, counts[value], '?' + params.urlencode(), request.GET.get(name) == value))
+    return links
+
 @login_required
 def admin_profile(request):
     """Display the admin's profile."""
@@ -179,19 +305,85 @@ def manage_invoices(request):
         return HttpResponseForbidden("You are not authorized to access this page.")
 
     invoices = Invoice.objects.filter(payment_status='Unpaid')
+    form = InvoiceFilterForm(request.GET)
+    filters = {}
+    if form.is_valid():
+        filters = form.cleaned_data
+        invoices = form.filter(invoices)
+    page, previous_cursor, next_cursor = keyset_page(
+        invoices.select_related('student'),
+        'due_date',
+        after=filters.get('after'),
+        before=filters.get('before'),
+        descending=filters.get('sort') == '-due_date',
+        per_page=INVOICES_PER_PAGE,
+    )
     invoice_data = []
+    settled_ids = []
 
-    for invoice in invoices:
-        lesson_requests, total = generate_invoice(invoice)
+    for invoice in page:
         invoice.standardised_due_date = invoice.due_date.strftime("%d/%m/%Y")
+        if payment_status_for(invoice.total, invoice.amount_paid) != invoice.payment_status:
+            settled_ids.append(invoice.id)
 
         invoice_data.append({
             'invoice' : invoice,
-            'lesson_requests' : lesson_requests,
-            'total' : total,
+            'total' : invoice.total,
+            'line_count' : invoice.line_count,
         })
 
-    return render(request, 'manage_invoices.html', {'invoice_data' : invoice_data})
+    if settled_ids:
+        Invoice.objects.filter(id__in=settled_ids).update(payment_status='Paid', updated_at=now())
+
+    return render(request, 'manage_invoices.html', {
+        'invoice_data' : invoice_data,
+        'form' : form,
+        'previous_url' : _page_url(request, 'before', previous_cursor),
+        'next_url' : _page_url(request, 'after', next_cursor),
+    })
+
+def _page_url(request, name, cursor):
+    """Return the query string for the page at `cursor`, keeping the current filters."""
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[name] = '%s.%s' % cursor
+    return '?' + params.urlencode()
+
+@login_required
+def export_invoices(request):
+    """Stream invoices and their lines as CSV or JSONL for accounting."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You are not authorized to access this page.")
+
+    export_format = request.GET.get('format', 'csv')
+    term = request.GET.get('term') or None
+    payment_status = request.GET.get('status') or None
+    if export_format not in EXPORT_FORMATS or (term and term not in settings.TERMS):
+        return HttpResponseBadRequest("Unknown export format or term.")
+
+    rows = export_rows(term=term, payment_status=payment_status)
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(export_lines(export_format, rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="invoices.{export_format}"'
+    return response
+
+@login_required
+def reconcile_payments(request):
+    """Upload a bank statement CSV and mark the invoices it pays."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You are not authorized to access this page.")
+
+    report = None
+    form = BankStatementForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        statement = TextIOWrapper(form.cleaned_data['statement'].file, encoding='utf-8-sig', newline='')
+        report = reconciliation.reconcile_payments(statement)
+        messages.success(request, f"{report.matched} payments matched, {report.settled} invoices settled.")
+
+    return render(request, 'reconcile_payments.html', {'form': form, 'report': report})
 
 @login_required
 def edit_tutor_profile(request, tutor_id):
@@ -10,15 +10,18 @@ from datetime import date
 from django.shortcuts import render
 from django.views import View
 from django.views.generic.edit import FormView, UpdateView
-from tutorials.forms import LogInForm, PasswordForm, UserForm, SignUpForm
-from tutorials.helpers import login_prohibited
+from tutorials.forms import LogInForm, PasswordForm, UserForm, SignUpForm, TimetableRangeForm
+from tutorials.helpers import login_prohibited, not_modified_response, add_validators
+from tutorials.feeds import feed_lines, feed_validators, user_for_feed_token
+from tutorials.timetables import allocated_requests, lesson_rows, timetable_validators
+from tutorials.invoicing import term_for, invoice_lines, invoice_validators, sync_payment_status
 from datetime import timedelta, date
 from django.shortcuts import render
 from datetime import timedelta
-from tutorials.models import User, Invoice, LessonRequest, Lesson
+from tutorials.models import User, Invoice
 from tutorials.forms import ContactMessages
 from django.shortcuts import redirect
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 import logging
 
 @login_required
@@ -49,57 +52,44 @@ def available_courses(request):
     return render(request, 'available_courses.html')
 
 def generate_invoice(invoice, term_start=None, term_end=None):
-    total = 0
-
-    if term_start and term_end:
-        lesson_requests = LessonRequest.objects.filter(
-            student=invoice.student, 
-            requested_date__range=[term_start, term_end], 
-            status='Allocated')
-    else:
-        lesson_requests = LessonRequest.objects.filter(
-            student=invoice.student, 
-            status='Allocated')
-
-    for booking in lesson_requests:
-        booking.lesson_price = (booking.requested_duration / 60) * settings.HOURLY_RATE
-        total += booking.lesson_price 
-
-    if total == 0:
-        invoice.payment_status = 'Paid' 
-    else:
-        invoice.payment_status = 'Unpaid'
-
-    invoice.save()
-
+    """
+    Return the lesson requests billed on an invoice and the sum of their prices.
+    The total always covers the lines returned, so it is the invoice's stored total unless
+    term bounds leave some of its lines out. Pages sync the payment status before this.
+    """
+    lesson_requests = invoice_lines(invoice, term_start, term_end)
+    total = sum(booking.lesson_price for booking in lesson_requests)
     return lesson_requests, total
 
 
 @login_required
 def invoice_page(request, term_name = None):
     """Display user invoice."""
-    terms = {
-        'autumn': (date(2024, 9, 1), date(2024, 12, 31)),
-        'spring': (date(2025, 1, 1), date (2025, 5, 31)),
-        'summer': (date(2025, 6, 1), date(2025, 8, 31)),
-    }
+    terms = settings.TERMS
 
     if term_name is None:
-        today = date.today()
-
-        for term, (start, end) in terms.items():
-            if start <= today <= end:
-                term_name = term 
-                break 
+        # Between or beyond the configured terms, show the latest one.
+        term_name = term_for(date.today()) or list(terms)[-1]
 
     term_dates = terms.get(term_name)
+    if term_dates is None:
+        raise Http404("No such term.")
     term_start, term_end = term_dates
 
-    invoice = Invoice.objects.filter(student=request.user).first()
+    invoice = Invoice.objects.filter(
+        student=request.user,
+        term__in=[term_name, ''],
+    ).select_related('student').order_by('-term', 'id').first()
 
     if not invoice:
         return HttpResponse("No invoice found", status=404)    
 
+    sync_payment_status(invoice, invoice.total)
+    etag, last_modified = invoice_validators(invoice, term_name, request.user.role)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+
     term_keys = list(terms.keys())
     current_term_index = term_keys.index(term_name)
 
@@ -113,7 +103,7 @@ def invoice_page(request, term_name = None):
 
     base_template = 'dashboard_base_admin.html' if request.user.role == 'admin' else 'dashboard_base_student.html'
 
-    return render(request, 'invoice_page.html', {
+    response = render(request, 'invoice_page.html', {
         'invoice': invoice, 
         'lesson_requests': lesson_requests,
         'total': total, 
@@ -122,6 +112,55 @@ def invoice_page(request, term_name = None):
         'next_term': next_term,
         'base_template' : base_template,
         })
+    return add_validators(response, etag, last_modified)
+
+def calendar_feed(request, token):
+    """
+    Stream a tutor's or student's allocated lessons as an iCalendar feed.
+    The signed token in the URL stands in for a login, as calendar apps poll without cookies,
+    and polls that already have the current feed get a 304 without it being regenerated.
+    """
+    user = user_for_feed_token(token)
+    if user is None:
+        raise Http404("No calendar found")
+
+    etag, last_modified = feed_validators(user)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    response = StreamingHttpResponse(feed_lines(user), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="lessons.ics"'
+    return add_validators(response, etag, last_modified)
+
+@login_required
+def timetable_lessons(request):
+    """
+    Return the current tutor's or student's lessons in a [start, end) range as JSON, so a
+    calendar front end can load and prefetch ranges without re-rendering the page.
+    Rows list the values of the requested `fields` in order, and an unchanged range gets a 304.
+    """
+    if request.user.role not in ('tutor', 'student'):
+        return JsonResponse({'errors': {'__all__': ["Only tutors and students have a timetable."]}}, status=403)
+
+    form = TimetableRangeForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    start, end, fields = form.cleaned_data['start'], form.cleaned_data['end'], form.cleaned_data['fields']
+
+    requests = allocated_requests(request.user).touching(start, end - timedelta(days=1))
+    etag, last_modified = timetable_validators(requests, request.user, start, end, *fields)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    response = JsonResponse({
+        'start': start,
+        'end': end,
+        'fields': fields,
+        'lessons': lesson_rows(request.user, start, end, fields),
+    })
+    return add_validators(response, etag, last_modified)
 
 class LoginProhibitedMixin:
     """Mixin that redirects when a user is logged in."""
@@ -263,30 +302,6 @@ def contact_admin(request):
         base_template = 'dashboard.html'  
     return render(request, 'contact_admin.html', {'base_template': base_template})
 
-def generate_lessons(lesson_request, num_lessons=10):
-    """
-    Generate individual lessons from a lesson request.
-    - lesson_request: The LessonRequest instance.
-    - num_lessons: Number of lessons to generate (default 10).
-    """
-    start_date = lesson_request.requested_date
-    frequency = 7 if lesson_request.requested_frequency == "weekly" else 14
-    duration = lesson_request.requested_duration
-
-    lessons = []
-    for i in range(num_lessons):  
-        lesson_date = start_date + timedelta(days=frequency * i)
-        lesson = Lesson.objects.create(
-            tutor=lesson_request.tutor,
-            student=lesson_request.student,
-            date=lesson_date,
-            time=lesson_request.requested_time,
-            duration=duration,
-            topic=lesson_request.requested_topic
-        )
-        lessons.append(lesson)
-    return lessons
-
 @login_required
 def lesson_request_success(request):
     dashboard_url = reverse('log_in')
@@ -2,17 +2,18 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.shortcuts import redirect, render
-from calendar import monthrange, SUNDAY
+from django.urls import reverse
+from calendar import SUNDAY
 from datetime import date
-from calendar import Calendar, monthrange
 from django.shortcuts import render
-from calendar import monthrange
-from datetime import datetime, timedelta, date
+from datetime import date
 from django.shortcuts import render
-from datetime import timedelta
 from tutorials.models import User, LessonRequest, ContactMessage, Lesson
 from django.shortcuts import get_object_or_404, redirect
 from tutorials.forms import LessonBookingForm
+from tutorials import allocation
+from tutorials.feeds import feed_token
+from tutorials.timetables import allocated_lessons_by_day, bucket_lessons_by_day, month_bounds, month_grid, month_navigation
 import logging
 
 
@@ -36,8 +37,7 @@ def request_lesson(request):
 
             try:
 
-                lesson_request.full_clean()
-                lesson_request.save()
+                allocation.save_request(lesson_request, full_clean=True)
                 messages.success(request, "Your lesson request has been successfully submitted!")
                 return redirect('lesson_request_success')
             except ValidationError as e:
@@ -83,67 +83,14 @@ def see_my_student_timetable(request):
     today = date.today()
     year = int(request.GET.get('year', today.year))
     month = int(request.GET.get('month', today.month))
+    first_day_of_month, last_day_of_month = month_bounds(year, month)
 
-    allocated_lessons = LessonRequest.objects.filter(
-        student=request.user,
-        tutor__isnull=False,
-        status='Allocated'
-    ).values(
-        'requested_time',
-        'requested_date',
-        'requested_duration',
-        'tutor__first_name',
-        'tutor__last_name',
-        'requested_topic'
-    )
-
-    num_days = monthrange(year, month)[1]
-    first_day_of_month = date(year, month, 1)
-    start_day = first_day_of_month.weekday()  
-    days = []
-    week = []
-    lessons_by_day = {}
-
-    for lesson in allocated_lessons:
-        lesson_date = lesson['requested_date']
-        if lesson_date not in lessons_by_day:
-            lessons_by_day[lesson_date] = []
-        lessons_by_day[lesson_date].append({
-            'notes': lesson['requested_topic'],
-            'start_time': lesson['requested_time'],
-            'end_time': (datetime.combine(date.today(), lesson['requested_time']) + timedelta(
-                minutes=lesson['requested_duration']
-            )).time(),
-            'tutor': f"{lesson['tutor__first_name']} {lesson['tutor__last_name']}"
-        })
-
-    current_date = first_day_of_month
-    for _ in range(start_day):
-        week.append({'date': None})  
-
-    for day in range(1, num_days + 1):
-        current_date = date(year, month, day)
-        day_data = {'date': current_date, 'lessons': lessons_by_day.get(current_date, [])}
-        week.append(day_data)
-        if len(week) == 7:
-            days.append(week)
-            week = []
-    if week:  
-        days.append(week)
-
-    prev_month = month - 1 or 12
-    prev_year = year - 1 if prev_month == 12 else year
-    next_month = month + 1 if month < 12 else 1
-    next_year = year + 1 if next_month == 1 else year
+    lessons_by_day = allocated_lessons_by_day(request.user, 'student', first_day_of_month, last_day_of_month)
 
     context = {
-        'month_name': first_day_of_month.strftime('%B'),
-        'year': year,
-        'month_days': days,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
+        'month_days': month_grid(year, month, lessons_by_day),
+        **month_navigation(year, month),
+        'feed_url': request.build_absolute_uri(reverse('calendar_feed', args=[feed_token(request.user)])),
     }
     return render(request, 'student_timetable.html', context)
 
@@ -211,40 +158,19 @@ def timetable_view(request):
         return redirect('log_in')
 
     user = request.user
+    first_day, last_day = month_bounds(selected_year, selected_month)
 
-    cal = Calendar(SUNDAY)
-    month_days = cal.monthdayscalendar(selected_year, selected_month)
-
-    structured_month_days = []
-    for week in month_days:
-        week_data = []
-        for day in week:
-            if day == 0:  
-                week_data.append({'date': None, 'lessons': None})
-            else:
-                day_date = date(selected_year, selected_month, day)
-                lessons = []
-                if user.role == 'student':
-                    lessons = Lesson.objects.filter(student=user, date=day_date)
-                elif user.role == 'tutor':
-                    lessons = Lesson.objects.filter(tutor=user, date=day_date).order_by('start_time')
-                week_data.append({'date': day_date, 'lessons': lessons})
-        structured_month_days.append(week_data)
-
-    prev_month = selected_month - 1 if selected_month > 1 else 12
-    prev_year = selected_year - 1 if prev_month == 12 else selected_year
-    next_month = selected_month + 1 if selected_month < 12 else 1
-    next_year = selected_year + 1 if next_month == 1 else selected_year
+    lessons = Lesson.objects.none()
+    if user.role in ('student', 'tutor'):
+        lessons = Lesson.objects.filter(
+            **{user.role: user},
+            status='Scheduled',
+            date__range=[first_day, last_day],
+        ).select_related('student', 'tutor').order_by('date', 'time')
 
     context = {
-        'month_days': structured_month_days,
-        'year': selected_year,
-        'month': selected_month,
-        'month_name': date(selected_year, selected_month, 1).strftime('%B'),
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
+        'month_days': month_grid(selected_year, selected_month, bucket_lessons_by_day(lessons), SUNDAY),
+        **month_navigation(selected_year, selected_month),
     }
 
     return render(request, 'student_timetable.html', context)
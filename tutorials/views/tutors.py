@@ -1,16 +1,16 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect, render
-from calendar import monthrange
+from django.urls import reverse
 from datetime import date
-from calendar import monthrange
 from django.shortcuts import render
-from calendar import monthrange
-from datetime import datetime, timedelta, date
+from datetime import date
 from django.shortcuts import render
-from datetime import timedelta
-from tutorials.models import User, LessonRequest, ContactMessage, Lesson
+from tutorials.models import User, ContactMessage, TutorAvailability
+from tutorials.forms import TutorAvailabilityForm
 from django.shortcuts import redirect
+from tutorials.feeds import feed_token
+from tutorials.timetables import allocated_lessons_by_day, month_bounds, month_grid, month_navigation
 
 @login_required
 def tutor_dashboard(request):
@@ -18,30 +18,6 @@ def tutor_dashboard(request):
     return render(request, 'tutor_dashboard.html')
 
 
-def generate_lessons(lesson_request, num_lessons=10):
-    """
-    Generate individual lessons from a lesson request.
-    - lesson_request: The LessonRequest instance.
-    - num_lessons: Number of lessons to generate (default 10).
-    """
-    start_date = lesson_request.requested_date
-    frequency = 7 if lesson_request.requested_frequency == "weekly" else 14
-    duration = lesson_request.requested_duration
-
-    lessons = []
-    for i in range(num_lessons):  
-        lesson_date = start_date + timedelta(days=frequency * i)
-        lesson = Lesson.objects.create(
-            tutor=lesson_request.tutor,
-            student=lesson_request.student,
-            date=lesson_date,
-            time=lesson_request.requested_time,
-            duration=duration,
-            topic=lesson_request.requested_topic
-        )
-        lessons.append(lesson)
-    return lessons
-
 def see_my_tutor_timetable(request):
     if not request.user.is_authenticated or request.user.role != 'tutor':
         return redirect('log_in')
@@ -49,65 +25,14 @@ def see_my_tutor_timetable(request):
     today = date.today()
     year = int(request.GET.get('year', today.year))
     month = int(request.GET.get('month', today.month))
+    first_day_of_month, last_day_of_month = month_bounds(year, month)
 
-    allocated_lessons = LessonRequest.objects.filter(
-        tutor=request.user,
-        status='Allocated'
-    ).values(
-        'requested_time',
-        'requested_date',
-        'requested_duration',
-        'student__first_name',
-        'student__last_name',
-        'requested_topic'
-    )
-
-    lessons_by_day = {}
-    for lesson in allocated_lessons:
-        lesson_date = lesson['requested_date']
-        if lesson_date not in lessons_by_day:
-            lessons_by_day[lesson_date] = []
-        lessons_by_day[lesson_date].append({
-            'notes': lesson['requested_topic'],
-            'start_time': lesson['requested_time'],
-            'end_time': (datetime.combine(date.today(), lesson['requested_time']) + timedelta(
-                minutes=lesson['requested_duration']
-            )).time(),
-            'student': f"{lesson['student__first_name']} {lesson['student__last_name']}"
-        })
-
-    num_days = monthrange(year, month)[1]
-    first_day_of_month = date(year, month, 1)
-    start_day = first_day_of_month.weekday()
-    days = []
-    week = []
-
-    for _ in range(start_day):
-        week.append({'date': None})
-
-    for day in range(1, num_days + 1):
-        current_date = date(year, month, day)
-        day_data = {'date': current_date, 'lessons': lessons_by_day.get(current_date, [])}
-        week.append(day_data)
-        if len(week) == 7:
-            days.append(week)
-            week = []
-    if week:
-        days.append(week)
-
-    prev_month = month - 1 or 12
-    prev_year = year - 1 if prev_month == 12 else year
-    next_month = month + 1 if month < 12 else 1
-    next_year = year + 1 if next_month == 1 else year
+    lessons_by_day = allocated_lessons_by_day(request.user, 'tutor', first_day_of_month, last_day_of_month)
 
     context = {
-        'month_name': first_day_of_month.strftime('%B'),
-        'year': year,
-        'month_days': days,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
+        'month_days': month_grid(year, month, lessons_by_day),
+        **month_navigation(year, month),
+        'feed_url': request.build_absolute_uri(reverse('calendar_feed', args=[feed_token(request.user)])),
     }
 
     return render(request, 'tutor_timetable.html', context)
@@ -145,4 +70,20 @@ def tutor_profile(request):
     context = {
         'tutor': tutor,
     }
-    return render(request, 'tutor_profile.html', context)
\ No newline at end of file
+    return render(request, 'tutor_profile.html', context)
+
+@login_required
+def edit_availability(request):
+    """Let a tutor record the hours of the week they are available to teach."""
+    if request.user.role != 'tutor':
+        messages.error(request, "Access denied. Only tutors can set availability.")
+        return redirect('dashboard')
+
+    availability, _ = TutorAvailability.objects.get_or_create(tutor=request.user)
+    form = TutorAvailabilityForm(request.POST or None, instance=availability)
+    if request.method == "POST" and form.is_valid():
+        form.save()
+        messages.success(request, "Your availability has been updated.")
+        return redirect('edit_availability')
+
+    return render(request, 'edit_availability.html', {'form': form})